@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def normalize_text(text: str) -> str:
+    """Normalization used for cache keys: NFC + collapsed whitespace, so trivially different copies share a key"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize("NFC", text or "")).strip()
+
+
+def make_cache_key(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process LRU in front of an optional Mongo collection.
+
+    Mongo documents are {_id: "<namespace>:<key>", namespace, value, created_at};
+    expiry is handled by a TTL index on created_at (see database.mongo).
+    With compress=True the Mongo copy is stored as zlib-compressed JSON in `value_z` instead of `value`
+    (large values such as extracted document text); the LRU keeps the plain value.
+    Mongo errors are logged and treated as misses so the cache never fails a request.
+    """
+
+    def __init__(self, namespace: str, collection=None, max_entries: int = 512, compress: bool = False):
+        self.namespace = namespace
+        self.collection = collection
+        self.max_entries = max_entries
+        self.compress = compress
+        self._lru: OrderedDict = OrderedDict()
+        self.counters = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _remember(self, key: str, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return self._lru[key]
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": f"{self.namespace}:{key}"})
+            except Exception as e:
+                print(f"DEBUG: Cache read error ({self.namespace}): {e}")
+                self.counters["errors"] += 1
+                doc = None
+            if doc:
+                self.counters["mongo_hits"] += 1
+                value = json.loads(zlib.decompress(doc["value_z"])) if "value_z" in doc else doc["value"]
+                self._remember(key, value)
+                return value
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value):
+        self._remember(key, value)
+        self.counters["writes"] += 1
+        if self.collection is None:
+            return
+        if self.compress:
+            stored = {"value_z": zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)}
+        else:
+            stored = {"value": value}
+        try:
+            await self.collection.replace_one(
+                {"_id": f"{self.namespace}:{key}"},
+                {"namespace": self.namespace, **stored, "created_at": datetime.now(timezone.utc)},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"DEBUG: Cache write error ({self.namespace}): {e}")
+            self.counters["errors"] += 1
+
+    def stats(self) -> dict:
+        lookups = self.counters["memory_hits"] + self.counters["mongo_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._lru),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
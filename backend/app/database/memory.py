@@ -0,0 +1,310 @@
+"""
+In-memory stand-in for the Motor client, selected with MONGO_DETAILS=memory://
+
+Only the subset of the Motor API used by this app is implemented. It is meant for
+load testing and local runs without a MongoDB server, not for production data.
+"""
+import copy
+import re
+from datetime import datetime, timezone
+from bson import ObjectId
+
+
+def _to_bson(value):
+    """
+    Store values the way BSON does: datetimes become naive UTC with millisecond precision,
+    so documents written with datetime.utcnow() and datetime.now(timezone.utc) sort and compare together.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {k: _to_bson(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_bson(v) for v in value]
+    return value
+
+
+def _get_field(doc: dict, key: str):
+    value = doc
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if op == "$regex":
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if value is None:
+        return False
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    raise ValueError(f"Unsupported query operator: {op}")
+
+
+def _matches(doc: dict, query: dict | None) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            value = _get_field(doc, key)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif _get_field(doc, key) != condition:
+            return False
+    return True
+
+
+def _project(doc: dict, projection: dict | None) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = {k for k, v in projection.items() if v and k != "_id"}
+    if included:
+        result = {k: doc[k] for k in included if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            doc.update(_to_bson(copy.deepcopy(fields)))
+        elif op == "$unset":
+            for key in fields:
+                doc.pop(key, None)
+        elif op == "$inc":
+            for key, amount in fields.items():
+                doc[key] = doc.get(key, 0) + amount
+        elif op == "$push":
+            for key, value in fields.items():
+                doc.setdefault(key, []).append(_to_bson(copy.deepcopy(value)))
+        elif op != "$setOnInsert":
+            raise ValueError(f"Unsupported update operator: {op}")
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class MemoryCursor:
+    def __init__(self, docs: list[dict], projection: dict | None = None):
+        self._docs = docs
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self) -> list[dict]:
+        docs = list(self._docs)
+        # Stable sorts applied from the least significant key
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: (_get_field(d, key) is not None, _get_field(d, key)), reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: dict = {}
+        self._indexes: dict = {}
+
+    def _find(self, query: dict | None) -> list[dict]:
+        query = _to_bson(query or {})
+        return [d for d in self._docs.values() if _matches(d, query)]
+
+    def _check_unique(self, doc: dict):
+        for keys, options in self._indexes.items():
+            if not options.get("unique"):
+                continue
+            values = tuple(_get_field(doc, k) for k, _ in keys)
+            for other in self._docs.values():
+                if other["_id"] != doc["_id"] and tuple(_get_field(other, k) for k, _ in keys) == values:
+                    raise ValueError(f"E11000 duplicate key error collection: {self.name}")
+
+    async def create_index(self, keys, **options) -> str:
+        keys = tuple(keys) if isinstance(keys, list) else ((keys, 1),)
+        self._indexes[keys] = options
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        doc = _to_bson(copy.deepcopy(document))
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        # Motor mutates the caller's dict with the generated _id
+        document["_id"] = doc["_id"]
+        return InsertOneResult(doc["_id"])
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True) -> InsertManyResult:
+        ids = []
+        for document in documents:
+            ids.append((await self.insert_one(document)).inserted_id)
+        return InsertManyResult(ids)
+
+    async def find_one(self, query: dict | None = None, projection: dict | None = None):
+        for doc in self._find(query)[:1]:
+            return _project(doc, projection)
+        return None
+
+    def find(self, query: dict | None = None, projection: dict | None = None) -> MemoryCursor:
+        return MemoryCursor(self._find(query), projection)
+
+    async def count_documents(self, query: dict | None = None) -> int:
+        return len(self._find(query))
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        matches = self._find(query)
+        if matches:
+            before = copy.deepcopy(matches[0])
+            _apply_update(matches[0], update)
+            return UpdateResult(1, int(before != matches[0]))
+        if not upsert:
+            return UpdateResult(0, 0)
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        _apply_update(doc, update, inserting=True)
+        result = await self.insert_one(doc)
+        return UpdateResult(0, 0, result.inserted_id)
+
+    async def update_many(self, query: dict, update: dict) -> UpdateResult:
+        matches = self._find(query)
+        for doc in matches:
+            _apply_update(doc, update)
+        return UpdateResult(len(matches), len(matches))
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False) -> UpdateResult:
+        matches = self._find(query)
+        if matches:
+            doc = _to_bson(copy.deepcopy(replacement))
+            doc["_id"] = matches[0]["_id"]
+            self._docs[doc["_id"]] = doc
+            return UpdateResult(1, 1)
+        if not upsert:
+            return UpdateResult(0, 0)
+        doc = copy.deepcopy(replacement)
+        for k, v in query.items():
+            if not k.startswith("$") and not isinstance(v, dict):
+                doc.setdefault(k, v)
+        result = await self.insert_one(doc)
+        return UpdateResult(0, 0, result.inserted_id)
+
+    async def delete_one(self, query: dict) -> DeleteResult:
+        for doc in self._find(query)[:1]:
+            del self._docs[doc["_id"]]
+            return DeleteResult(1)
+        return DeleteResult(0)
+
+    async def delete_many(self, query: dict) -> DeleteResult:
+        matches = self._find(query)
+        for doc in matches:
+            del self._docs[doc["_id"]]
+        return DeleteResult(len(matches))
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+
+class _MemoryAdmin:
+    async def command(self, name: str, *args, **kwargs) -> dict:
+        return {"ok": 1.0}
+
+
+class MemoryClient:
+    def __init__(self):
+        self.admin = _MemoryAdmin()
+        self._databases: dict[str, MemoryDatabase] = {}
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_database(name)
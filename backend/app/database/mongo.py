@@ -4,8 +4,12 @@ from decouple import config
 import certifi
 MONGO_DETAILS = config("MONGO_DETAILS", default="mongodb://localhost:27017")
 
+# memory:// selects the in-process stand-in (load testing / running without a MongoDB server)
+if MONGO_DETAILS.startswith("memory://"):
+    from .memory import MemoryClient
+    client = MemoryClient()
 # Use certifi for SSL only if connecting to Cloud (Atlas), skip for Localhost to avoid SSL Error
-if "localhost" in MONGO_DETAILS or "127.0.0.1" in MONGO_DETAILS:
+elif "localhost" in MONGO_DETAILS or "127.0.0.1" in MONGO_DETAILS:
     client = AsyncIOMotorClient(MONGO_DETAILS, serverSelectionTimeoutMS=5000)
 else:
     client = AsyncIOMotorClient(MONGO_DETAILS, tlsCAFile=certifi.where(), serverSelectionTimeoutMS=5000)
@@ -13,8 +17,18 @@ db = client.artificer_summarizer # Export 'db' as well for flexible usage
 database = db # Alias for existing code
 user_collection = database.get_collection("users")
 history_collection = database.get_collection("history")
+job_collection = database.get_collection("jobs")
+cache_collection = database.get_collection("cache")
+
+# Finished jobs are removed by Mongo after this many seconds
+JOB_TTL_SECONDS = config("JOB_TTL_SECONDS", default=86400, cast=int)
+# Cached summaries expire after this many seconds
+CACHE_TTL_SECONDS = config("CACHE_TTL_SECONDS", default=7 * 86400, cast=int)
 
 # Add index for unique email
 async def create_unique_index():
     await user_collection.create_index("email", unique=True)
-    await history_collection.create_index("user_id") # Index for faster history queries
\ No newline at end of file
+    # History listing: filter by user, newest first, keyset on (created_at, _id) -> served entirely by this index
+    await history_collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    await job_collection.create_index("created_at", expireAfterSeconds=JOB_TTL_SECONDS)
+    await cache_collection.create_index("created_at", expireAfterSeconds=CACHE_TTL_SECONDS)
\ No newline at end of file
@@ -0,0 +1,198 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+# handler(job_id, payload, report) -> result dict
+# report(stage, **details) persists stage-level progress on the job document
+ProgressReporter = Callable[..., Awaitable[None]]
+JobHandler = Callable[[str, dict, ProgressReporter], Awaitable[dict]]
+
+FINISHED_STATES = ("done", "error", "cancelled")
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue with state persisted in a Mongo collection.
+
+    Payloads (e.g. uploaded file bytes) only live in memory; the collection holds
+    status, stage, progress details and the final result so any request can poll it.
+    Workers are tasks of the API process, so jobs need a long-lived server (uvicorn, Docker).
+    A serverless function is frozen once its response is sent and would never run them;
+    vercel.json therefore does not route /jobs to the API.
+
+    Several processes may share the collection (e.g. uvicorn workers). Each
+    queue tags its jobs with its `instance_id` and keeps renewing a lease on them; a job whose
+    lease ran out belongs to a process that is gone and is marked as failed by whichever queue
+    notices first. Jobs of other live processes are never touched.
+    """
+
+    def __init__(self, collection, handler: JobHandler, workers: int = 2, max_queued: int = 100,
+                 lease_seconds: float = 60):
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.instance_id = uuid.uuid4().hex
+        self._queue: asyncio.Queue | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._heartbeat_task: asyncio.Task | None = None
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+        # Slots taken by submits still writing their job document (counted against max_queued)
+        self._reserved = 0
+
+    async def start(self):
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        await self.expire_abandoned()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    def _lease_until(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+
+    async def renew_leases(self):
+        """Extend the lease of every unfinished job held by this instance"""
+        await self.collection.update_many(
+            {"instance_id": self.instance_id, "status": {"$in": list(ACTIVE_STATES)}},
+            {"$set": {"lease_until": self._lease_until()}},
+        )
+
+    async def expire_abandoned(self) -> int:
+        """
+        Fail unfinished jobs whose lease has run out: the process holding their payload stopped,
+        so they can never finish. Jobs written before leases existed have none and count as expired.
+        """
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_many(
+            {
+                "status": {"$in": list(ACTIVE_STATES)},
+                "$or": [{"lease_until": {"$lt": now}}, {"lease_until": {"$exists": False}}],
+            },
+            {"$set": {"status": "error", "error": "Interrupted by server restart", "updated_at": now}},
+        )
+        return result.modified_count
+
+    async def _heartbeat(self):
+        # ต่ออายุ lease บ่อยกว่าอายุของมัน 3 เท่า (ทนการหน่วงของ Mongo ได้หนึ่งสองรอบ)
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.renew_leases()
+                await self.expire_abandoned()
+            except Exception as e:
+                print(f"DEBUG: Job lease heartbeat failed: {e}")
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for task in self._worker_tasks:
+            task.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        self._worker_tasks = []
+
+    async def submit(self, payload: dict, user_id: str | None = None, meta: dict | None = None) -> str:
+        if self._queue is None:
+            await self.start()
+        # จองที่ในคิวก่อน await การเขียน Mongo: submit พร้อมกันหลายคำขอจะไม่ผ่านการตรวจพร้อมกันจนคิวล้น
+        if self._queue.qsize() + self._reserved >= self.max_queued:
+            raise JobQueueFull("Job queue is full")
+        self._reserved += 1
+        try:
+            job_id = uuid.uuid4().hex
+            now = datetime.now(timezone.utc)
+            await self.collection.insert_one({
+                "_id": job_id,
+                "user_id": user_id,
+                "status": "queued",
+                "stage": "queued",
+                "progress": {},
+                "meta": meta or {},
+                "result": None,
+                "error": None,
+                "instance_id": self.instance_id,
+                "lease_until": self._lease_until(),
+                "created_at": now,
+                "updated_at": now,
+            })
+        finally:
+            self._reserved -= 1
+        self._queue.put_nowait((job_id, payload))
+        return job_id
+
+    async def get(self, job_id: str) -> dict | None:
+        return await self.collection.find_one({"_id": job_id})
+
+    async def cancel(self, job_id: str) -> bool:
+        job = await self.get(job_id)
+        if not job or job["status"] in FINISHED_STATES:
+            return False
+        self._cancelled.add(job_id)
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        return await self._update(job_id, {"$nin": list(FINISHED_STATES)}, status="cancelled", stage="cancelled")
+
+    def stats(self) -> dict:
+        return {
+            "instance_id": self.instance_id,
+            "workers": len(self._worker_tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": len(self._running),
+        }
+
+    async def _update(self, job_id: str, expected_status=None, **fields) -> bool:
+        """
+        Set fields on the job; with `expected_status` (a status or a query condition) only while the
+        job is still in that state. Returns whether the job was updated.
+        """
+        fields["updated_at"] = datetime.now(timezone.utc)
+        query = {"_id": job_id}
+        if expected_status is not None:
+            query["status"] = expected_status
+        result = await self.collection.update_one(query, {"$set": fields})
+        return result.matched_count > 0
+
+    async def _worker(self):
+        while True:
+            job_id, payload = await self._queue.get()
+            try:
+                if job_id in self._cancelled:
+                    continue
+                await self._run(job_id, payload)
+            finally:
+                self._cancelled.discard(job_id)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, payload: dict):
+        async def report(stage: str, **details):
+            await self._update(job_id, "running", stage=stage, progress=details)
+
+        # queued -> running only if nobody cancelled the job after it was dequeued
+        if not await self._update(job_id, "queued", status="running", stage="starting") or job_id in self._cancelled:
+            return
+        task = asyncio.create_task(self.handler(job_id, payload, report))
+        self._running[job_id] = task
+        try:
+            result = await task
+            await self._update(job_id, "running", status="done", stage="done", result=result)
+        except asyncio.CancelledError:
+            # cancel() already stored the cancelled state
+            if job_id not in self._cancelled:
+                raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"DEBUG: Job {job_id} failed: {detail}")
+            await self._update(job_id, "running", status="error", error=detail)
+        finally:
+            self._running.pop(job_id, None)
@@ -0,0 +1,285 @@
+import asyncio
+import io
+from abc import ABC, abstractmethod
+import json
+import random
+import time
+import uuid
+from decouple import config
+
+from ..workers.executors import WorkloadExecutor, run_blocking
+
+try:
+    import google.generativeai as genai
+    HAS_GENAI = True
+except ImportError:
+    HAS_GENAI = False
+
+
+class LLMBackend(ABC):
+    """
+    Interface of the LLM provider used by the AI engine (summary, evaluation, OCR).
+    A backend only knows how to run one generation call against one model;
+    fallback order and retry policy stay in the callers.
+    Subclasses must implement generate_content and upload_document (instantiation fails otherwise).
+    """
+
+    name = "base"
+    # Pool for blocking provider calls (sync SDK calls, File API uploads); None = asyncio's default pool
+    executor: WorkloadExecutor | None = None
+
+    def is_available(self) -> bool:
+        return False
+
+    @abstractmethod
+    def generate_content(self, model_name: str, contents, task: str = "summary") -> str:
+        """
+        Run a single generation call.
+
+        Args:
+            model_name: Provider model name (e.g. "gemini-2.0-flash")
+            contents: Prompt string or list of parts (inline data dicts and strings)
+            task: "summary", "evaluate" or "ocr"
+
+        Returns:
+            str: Generated text (may be empty if the response was blocked)
+
+        Raises:
+            Exception: Provider errors, with the provider's message (404/429/quota...)
+        """
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        """Async variant of generate_content. Backends without a native async API run the sync call in a thread."""
+        return await run_blocking(self.executor, self.generate_content, model_name, contents, task)
+
+    @abstractmethod
+    def upload_document(self, data: bytes, mime_type: str, display_name: str | None = None) -> tuple[str, dict]:
+        """
+        Store a document with the provider once so later calls can reference it instead of resending the bytes.
+        Only called when supports_documents() is True; other backends should raise.
+
+        Returns:
+            tuple: (provider file name used for delete_document, content part to put in `contents`)
+        """
+
+    def delete_document(self, name: str):
+        pass
+
+    def supports_documents(self) -> bool:
+        return False
+
+    async def stream_content(self, model_name: str, contents, task: str = "summary"):
+        """
+        Async iterator over text chunks as the provider generates them.
+        Backends without native streaming yield the whole response as one chunk.
+        """
+        text = await run_blocking(self.executor, self.generate_content, model_name, contents, task)
+        if text:
+            yield text
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the google.generativeai SDK"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str | None):
+        self.api_key = api_key
+        # GenerativeModel objects are reused so the SDK keeps its transport (and connections) alive
+        self._models: dict = {}
+        if self.is_available():
+            genai.configure(api_key=self.api_key)
+
+    def is_available(self) -> bool:
+        return HAS_GENAI and bool(self.api_key)
+
+    def model(self, model_name: str):
+        if model_name not in self._models:
+            self._models[model_name] = genai.GenerativeModel(model_name)
+        return self._models[model_name]
+
+    @staticmethod
+    def response_text(response) -> str:
+        try:
+            return response.text if response else ""
+        except ValueError:
+            # response.text raises when the candidate was blocked
+            return ""
+
+    def generate_content(self, model_name: str, contents, task: str = "summary") -> str:
+        return self.response_text(self.model(model_name).generate_content(contents))
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        return self.response_text(await self.model(model_name).generate_content_async(contents))
+
+    def supports_documents(self) -> bool:
+        return self.is_available()
+
+    def upload_document(self, data: bytes, mime_type: str, display_name: str | None = None) -> tuple[str, dict]:
+        # File API: the document is stored by Google (48h) and referenced by URI in later prompts
+        uploaded = genai.upload_file(io.BytesIO(data), mime_type=mime_type, display_name=display_name)
+        while uploaded.state.name == "PROCESSING":
+            time.sleep(0.5)
+            uploaded = genai.get_file(uploaded.name)
+        if uploaded.state.name == "FAILED":
+            raise Exception(f"File upload failed: {uploaded.name}")
+        return uploaded.name, {"file_data": {"mime_type": mime_type, "file_uri": uploaded.uri}}
+
+    def delete_document(self, name: str):
+        genai.delete_file(name)
+
+    async def stream_content(self, model_name: str, contents, task: str = "summary"):
+        response = await self.model(model_name).generate_content_async(contents, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                yield text
+
+
+class SimulatedBackend(LLMBackend):
+    """
+    Local stand-in for Gemini used for load testing without spending quota.
+    Latency is log-normal around `latency_ms`, and calls fail with the same
+    error messages the real API returns so the callers' retry logic is exercised.
+    """
+
+    name = "simulated"
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        latency_sigma: float = 0.4,
+        rate_429: float = 0.0,
+        rate_404: float = 0.0,
+        output_chars: int = 600,
+        dead_models: list[str] | None = None,
+        seed: int | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_429 = rate_429
+        self.rate_404 = rate_404
+        self.output_chars = output_chars
+        self.dead_models = set(dead_models or [])
+        self.random = random.Random(seed)
+        self.calls = 0
+        # Document store of the fake File API, and byte counters to check what is (re)sent
+        self.files: dict[str, int] = {}
+        self.uploaded_bytes = 0
+        self.inline_bytes = 0
+
+    @classmethod
+    def from_config(cls) -> "SimulatedBackend":
+        dead_models = config("SIM_LLM_DEAD_MODELS", default="")
+        seed = config("SIM_LLM_SEED", default="")
+        return cls(
+            latency_ms=config("SIM_LLM_LATENCY_MS", default=800, cast=float),
+            latency_sigma=config("SIM_LLM_LATENCY_SIGMA", default=0.4, cast=float),
+            rate_429=config("SIM_LLM_429_RATE", default=0.0, cast=float),
+            rate_404=config("SIM_LLM_404_RATE", default=0.0, cast=float),
+            output_chars=config("SIM_LLM_OUTPUT_CHARS", default=600, cast=int),
+            dead_models=[m.strip() for m in dead_models.split(",") if m.strip()],
+            seed=int(seed) if seed else None,
+        )
+
+    def is_available(self) -> bool:
+        return True
+
+    def sample_latency(self) -> float:
+        """Latency in seconds drawn from a log-normal distribution with median latency_ms"""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+    def supports_documents(self) -> bool:
+        return True
+
+    def upload_document(self, data: bytes, mime_type: str, display_name: str | None = None) -> tuple[str, dict]:
+        name = f"files/{uuid.uuid4().hex[:12]}"
+        self.files[name] = len(data)
+        self.uploaded_bytes += len(data)
+        return name, {"file_data": {"mime_type": mime_type, "file_uri": f"sim://{name}"}}
+
+    def delete_document(self, name: str):
+        self.files.pop(name, None)
+
+    def check_contents(self, contents):
+        """Count inline bytes and reject references to documents that were deleted, like the real API"""
+        for part in contents if isinstance(contents, list) else [contents]:
+            if not isinstance(part, dict):
+                continue
+            if "data" in part:
+                self.inline_bytes += len(part["data"])
+            elif "file_data" in part:
+                name = part["file_data"]["file_uri"].removeprefix("sim://")
+                if name not in self.files:
+                    raise Exception(f"403 You do not have permission to access the File {name} or it may not exist.")
+
+    def generate_content(self, model_name: str, contents, task: str = "summary") -> str:
+        self.calls += 1
+        self.check_contents(contents)
+        time.sleep(self.sample_latency())
+        self.raise_simulated_error(model_name)
+        return self.render_output(task)
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        self.calls += 1
+        self.check_contents(contents)
+        await asyncio.sleep(self.sample_latency())
+        self.raise_simulated_error(model_name)
+        return self.render_output(task)
+
+    async def stream_content(self, model_name: str, contents, task: str = "summary"):
+        self.calls += 1
+        self.check_contents(contents)
+        latency = self.sample_latency()
+        # Time to first token is a fraction of the full latency, the rest is spread over the chunks
+        await asyncio.sleep(latency * 0.3)
+        self.raise_simulated_error(model_name)
+        text = self.render_output(task)
+        chunk_size = max(1, len(text) // 20)
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        for chunk in chunks:
+            await asyncio.sleep(latency * 0.7 / len(chunks))
+            yield chunk
+
+    def raise_simulated_error(self, model_name: str):
+        if model_name in self.dead_models or self.random.random() < self.rate_404:
+            raise Exception(f"404 models/{model_name} is not found for API version v1beta, or is not supported for generateContent.")
+        if self.random.random() < self.rate_429:
+            raise Exception(
+                f"429 You exceeded your current quota, please check your plan and billing details. "
+                f"model: {model_name} Please retry in {self.random.uniform(1, 30):.1f}s."
+            )
+
+    def render_output(self, task: str) -> str:
+        if task == "evaluate":
+            return json.dumps({
+                "semantic_score": self.random.randint(70, 95),
+                "textual_difference": self.random.randint(40, 80),
+                "analysis": "ผลการประเมินจำลอง (Simulated backend)",
+            }, ensure_ascii=False)
+
+        filler = "เนื้อหาจำลองสำหรับการทดสอบโหลดของระบบสรุปความ "
+        body = (filler * (self.output_chars // len(filler) + 1))[:self.output_chars]
+        if task == "ocr":
+            return body
+
+        bullets = "\n".join(f"- {line}" for line in body.split(" ") if line)
+        accuracy, completeness, conciseness = (self.random.randint(70, 95) for _ in range(3))
+        average = (accuracy + completeness + conciseness) // 3
+        return (
+            f"{bullets}\n"
+            f'[METRICS: {{"accuracy": {accuracy}, "completeness": {completeness}, '
+            f'"conciseness": {conciseness}, "average": {average}}}]'
+        )
+
+
+def create_backend(name: str, api_key: str | None = None, executor: WorkloadExecutor | None = None) -> LLMBackend:
+    """Build the backend selected by LLM_BACKEND ("gemini" or "simulated")"""
+    backend = SimulatedBackend.from_config() if name == "simulated" else GeminiBackend(api_key)
+    backend.executor = executor
+    return backend
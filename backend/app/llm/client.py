@@ -0,0 +1,172 @@
+import re
+import time
+from decouple import config
+
+from .backends import LLMBackend
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Map a provider error to how long the model should be avoided:
+    - "dead": model missing or no quota at all (404 / not found / limit: 0)
+    - "quota": rate limited (429 / quota / resource exhausted)
+    - "error": anything else (network, 5xx, invalid response...)
+    """
+    message = str(error).lower()
+    if "404" in message or "not found" in message or "limit: 0" in message:
+        return "dead"
+    if "429" in message or "quota" in message or "resource has been exhausted" in message:
+        return "quota"
+    return "error"
+
+
+def parse_retry_delay(error: Exception) -> float | None:
+    """Server-provided retry delay in seconds ("Please retry in 55.7s" / "retry_delay { seconds: 55 }")"""
+    message = str(error)
+    match = re.search(r'retry in ([\d.]+)\s*s', message, flags=re.IGNORECASE)
+    if not match:
+        match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', message)
+    return float(match.group(1)) if match else None
+
+
+class ModelUnavailable(Exception):
+    """Raised without calling the provider when a model's circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker.
+
+    closed    -> calls go through
+    open      -> calls are rejected until `open_until`
+    half-open -> after the cool-down one trial call is let through; success closes
+                 the circuit, failure opens it again
+    """
+
+    def __init__(self, model_name: str, dead_cooldown: float, quota_cooldown: float,
+                 error_threshold: int, error_cooldown: float):
+        self.model_name = model_name
+        self.dead_cooldown = dead_cooldown
+        self.quota_cooldown = quota_cooldown
+        self.error_threshold = error_threshold
+        self.error_cooldown = error_cooldown
+        self.open_until = 0.0
+        self.consecutive_errors = 0
+        self.trial_in_flight = False
+        self.last_error = None
+        self.last_failure_kind = None
+
+    @property
+    def state(self) -> str:
+        if self.open_until == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.open_until = 0.0
+        self.consecutive_errors = 0
+        self.trial_in_flight = False
+
+    def record_failure(self, kind: str, error: Exception, cooldown: float | None = None):
+        self.trial_in_flight = False
+        self.last_error = str(error)[:300]
+        self.last_failure_kind = kind
+        if kind == "dead":
+            self.open_for(cooldown or self.dead_cooldown)
+        elif kind == "quota":
+            self.open_for(cooldown or self.quota_cooldown)
+        else:
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= self.error_threshold or self.open_until:
+                self.open_for(cooldown or self.error_cooldown)
+
+    def open_for(self, seconds: float):
+        self.open_until = time.monotonic() + seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "retry_in": round(max(0.0, self.open_until - time.monotonic()), 1) if self.open_until else 0.0,
+            "consecutive_errors": self.consecutive_errors,
+            "last_failure": self.last_failure_kind,
+            "last_error": self.last_error,
+        }
+
+
+class LLMClient:
+    """
+    Long-lived async entry point for all LLM calls.
+    Wraps a backend with one circuit breaker per model, so models that are missing,
+    quota-exhausted or failing are skipped for a cool-down instead of being retried
+    on every request.
+    """
+
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.dead_cooldown = config("LLM_DEAD_COOLDOWN_SECONDS", default=1800, cast=float)
+        self.quota_cooldown = config("LLM_QUOTA_COOLDOWN_SECONDS", default=30, cast=float)
+        self.error_threshold = config("LLM_ERROR_THRESHOLD", default=3, cast=int)
+        self.error_cooldown = config("LLM_ERROR_COOLDOWN_SECONDS", default=30, cast=float)
+
+    def is_available(self) -> bool:
+        return self.backend.is_available()
+
+    def breaker(self, model_name: str) -> CircuitBreaker:
+        if model_name not in self.breakers:
+            self.breakers[model_name] = CircuitBreaker(
+                model_name, self.dead_cooldown, self.quota_cooldown, self.error_threshold, self.error_cooldown
+            )
+        return self.breakers[model_name]
+
+    def healthy_models(self, model_names: list[str]) -> list[str]:
+        """Models whose circuit is not open (does not consume half-open trials)"""
+        return [m for m in model_names if self.breaker(m).state != "open"]
+
+    def record_failure(self, model_name: str, error: Exception) -> str:
+        kind = classify_error(error)
+        # A 429 tells us exactly how long the quota window lasts
+        cooldown = parse_retry_delay(error) if kind == "quota" else None
+        self.breaker(model_name).record_failure(kind, error, cooldown=cooldown)
+        return kind
+
+    async def generate(self, model_name: str, contents, task: str = "summary") -> str:
+        breaker = self.breaker(model_name)
+        if not breaker.allow():
+            raise ModelUnavailable(f"{model_name}: circuit open ({breaker.last_failure_kind}: {breaker.last_error})")
+        try:
+            text = await self.backend.generate_content_async(model_name, contents, task=task)
+        except Exception as e:
+            self.record_failure(model_name, e)
+            raise
+        finally:
+            # Also releases a half-open trial when the caller is cancelled
+            breaker.trial_in_flight = False
+        breaker.record_success()
+        return text
+
+    async def stream(self, model_name: str, contents, task: str = "summary"):
+        breaker = self.breaker(model_name)
+        if not breaker.allow():
+            raise ModelUnavailable(f"{model_name}: circuit open ({breaker.last_failure_kind}: {breaker.last_error})")
+        try:
+            async for chunk in self.backend.stream_content(model_name, contents, task=task):
+                yield chunk
+        except Exception as e:
+            self.record_failure(model_name, e)
+            raise
+        finally:
+            breaker.trial_in_flight = False
+        breaker.record_success()
+
+    def stats(self) -> dict:
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+
+class DeadlineExceeded(Exception):
+    """The request's AI budget ran out before any model returned a usable answer"""
+
+    def __init__(self, budget: float, errors: list[str]):
+        super().__init__(f"Deadline of {budget:.1f}s exceeded")
+        self.budget = budget
+        self.errors = errors
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies per model, used to derive hedge delays"""
+
+    def __init__(self, window: int = 100, min_samples: int = 10):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque] = {}
+
+    def record(self, model_name: str, seconds: float):
+        self._samples.setdefault(model_name, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model_name: str, q: float = 0.95) -> float | None:
+        samples = self._samples.get(model_name)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def first_success(
+    candidates: list[str],
+    call: Callable[[str, float], Awaitable[str]],
+    budget: float,
+    hedge_delay: Callable[[str], float] | None = None,
+) -> tuple[str, str, list[str]]:
+    """
+    Try `candidates` in order within a shared time budget and return (model, text, errors)
+    for the first non-empty answer.
+
+    call(model, remaining_seconds) runs one attempt. A failed attempt starts the next
+    candidate right away. With `hedge_delay`, a candidate that has not answered after
+    hedge_delay(model) seconds gets the next candidate started in parallel, and whichever
+    answers first wins; the others are cancelled.
+
+    Raises:
+        DeadlineExceeded: budget spent (all pending attempts are cancelled)
+        Exception: every candidate failed before the budget ran out (message lists the errors)
+    """
+    deadline = time.monotonic() + budget
+    remaining_models = list(candidates)
+    pending: dict[asyncio.Task, str] = {}
+    errors: list[str] = []
+    next_hedge_at = None
+
+    def launch():
+        nonlocal next_hedge_at
+        model_name = remaining_models.pop(0)
+        task = asyncio.ensure_future(call(model_name, max(0.0, deadline - time.monotonic())))
+        pending[task] = model_name
+        next_hedge_at = time.monotonic() + hedge_delay(model_name) if hedge_delay and remaining_models else None
+
+    try:
+        launch()
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                raise DeadlineExceeded(budget, errors)
+            timeout = deadline - now
+            if next_hedge_at is not None:
+                timeout = min(timeout, max(0.0, next_hedge_at - now))
+
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model_name = pending.pop(task)
+                try:
+                    text = task.result()
+                except Exception as e:
+                    errors.append(f"{model_name}: {e}")
+                    text = None
+                else:
+                    if text:
+                        return model_name, text, errors
+                    errors.append(f"{model_name}: Response blocked by Safety Filters or Empty.")
+                # Failure: move on to the next model without waiting for the hedge timer
+                if remaining_models:
+                    launch()
+
+            if not done and remaining_models and next_hedge_at is not None and time.monotonic() >= next_hedge_at:
+                print(f"DEBUG: Hedging with {remaining_models[0]} (no answer yet from {list(pending.values())})")
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise Exception(f"All models failed. Details: {'; '.join(errors)}")
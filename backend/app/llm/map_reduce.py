@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable
+
+from ..cache.tiered_cache import make_cache_key, normalize_text
+from .hedging import DeadlineExceeded
+
+
+# หน่วยที่ใช้ตัด section จากหยาบไปละเอียด: ย่อหน้า -> บรรทัด -> คำ
+UNIT_SEPARATORS = ("\n\n", "\n", " ")
+
+
+def split_units(text: str, max_chars: int, separators: tuple[str, ...] = UNIT_SEPARATORS) -> list[str]:
+    """
+    Pieces of `text` of at most `max_chars`, cut at the coarsest separator that works
+    (paragraphs, then lines, then words). Separators stay attached, so "".join(units) == text.
+    """
+    if len(text) <= max_chars:
+        return [text] if text else []
+    for i, separator in enumerate(separators):
+        if separator in text:
+            pieces = text.split(separator)
+            units = []
+            for j, piece in enumerate(pieces):
+                piece = piece + separator if j < len(pieces) - 1 else piece
+                units.extend(split_units(piece, max_chars, separators[i + 1:]))
+            return units
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+# จำนวนหน่วยล่าสุดที่ใช้ตัดสินจุดตัด (คำเดี่ยว ๆ ซ้ำบ่อยเกินไปที่จะใช้ hash ของมันลำพัง)
+CUT_CONTEXT_UNITS = 4
+
+
+def is_cut_point(context: list[str], unit_chars: int, mean_chars: int) -> bool:
+    """
+    Content-defined boundary after the last unit of `context`: decided by the hash of the last few
+    units, with a probability that grows with the unit's length so sections average about
+    `mean_chars` on top of the minimum.
+    """
+    digest = hashlib.blake2b("\x00".join(u.strip() for u in context).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < unit_chars / mean_chars
+
+
+def split_sections(text: str, section_chars: int, overlap_chars: int) -> list[str]:
+    """
+    Split text into sections of at most `section_chars`, each starting with the last whole
+    paragraphs/lines (up to `overlap_chars`) of the previous one.
+
+    Boundaries are anchored to content rather than to character offsets: a section ends after a
+    unit whose hash selects it (see is_cut_point) once the section is a quarter full, or when the
+    next unit would not fit. Editing or inserting a paragraph therefore only changes
+    the sections around it, and the map cache keeps hitting for the rest of the document.
+    """
+    text = text.strip()
+    if len(text) <= section_chars:
+        return [text] if text else []
+
+    # the overlap is prepended later, so a section's own units leave room for it
+    max_chars = max(section_chars - overlap_chars, section_chars // 2)
+    min_chars = max_chars // 4
+    mean_chars = max_chars // 2
+    units = split_units(text, max_chars)
+    groups: list[list[str]] = []
+    current, size = [], 0
+    for i, unit in enumerate(units):
+        if current and size + len(unit) > max_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit)
+        context = units[max(0, i - CUT_CONTEXT_UNITS + 1):i + 1]
+        if size >= min_chars and is_cut_point(context, len(unit), mean_chars):
+            groups.append(current)
+            current, size = [], 0
+    if current:
+        groups.append(current)
+
+    sections = []
+    for index, group in enumerate(groups):
+        overlap = []
+        if index and overlap_chars:
+            # ส่วนท้ายของ section ก่อนหน้าเป็นหน่วยเต็ม ๆ (ไม่ตัดกลางประโยค)
+            total = 0
+            for unit in reversed(groups[index - 1]):
+                if total + len(unit) > overlap_chars:
+                    break
+                overlap.insert(0, unit)
+                total += len(unit)
+        sections.append("".join(overlap + group).strip())
+    return [s for s in sections if s]
+
+
+class MapReduceSummarizer:
+    """
+    Summarize documents longer than one prompt:
+
+    map    - every section is summarized on its own (at most `concurrency` calls at once);
+             partial summaries are cached per section hash, so a re-run of an edited
+             document only recomputes the sections that changed
+    reduce - one prompt over the partial summaries produces the final bullet points
+
+    generate(prompt, budget_seconds, text_length) runs one LLM call with model fallback
+    and raises on failure (DeadlineExceeded when the budget runs out).
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, float, int], Awaitable[str]],
+        map_prompt: Callable[[str, int, int], str],
+        reduce_prompt: Callable[[str, int], str],
+        cache=None,
+        concurrency: int = 4,
+        section_chars: int = 12000,
+        overlap_chars: int = 600,
+        prompt_version: str = "",
+    ):
+        self.generate = generate
+        self.map_prompt = map_prompt
+        self.reduce_prompt = reduce_prompt
+        self.cache = cache
+        self.concurrency = concurrency
+        self.section_chars = section_chars
+        self.overlap_chars = overlap_chars
+        self.prompt_version = prompt_version
+
+    def section_key(self, section: str) -> str:
+        return make_cache_key(normalize_text(section), self.prompt_version)
+
+    async def summarize(self, text: str, num_sentences: int, budget: float) -> tuple[str, dict]:
+        """
+        Returns:
+            (reduced summary, report {sections, cached_sections, failed_sections})
+
+        Raises:
+            DeadlineExceeded / Exception: no section could be summarized, or the reduce step failed
+        """
+        deadline = time.monotonic() + budget
+        sections = split_sections(text, self.section_chars, self.overlap_chars)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        report = {"sections": len(sections), "cached_sections": 0, "failed_sections": 0}
+
+        async def map_section(index: int, section: str) -> str | None:
+            key = self.section_key(section)
+            if self.cache is not None:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    report["cached_sections"] += 1
+                    return cached
+            async with semaphore:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    report["failed_sections"] += 1
+                    return None
+                try:
+                    partial = (await self.generate(
+                        self.map_prompt(section, index + 1, len(sections)), remaining, len(section)
+                    )).strip()
+                except Exception as e:
+                    print(f"DEBUG: Map step failed for section {index + 1}/{len(sections)}: {e}")
+                    report["failed_sections"] += 1
+                    return None
+            if self.cache is not None:
+                await self.cache.set(key, partial)
+            return partial
+
+        partials = await asyncio.gather(*(map_section(i, s) for i, s in enumerate(sections)))
+        partials = [p for p in partials if p]
+        if not partials:
+            if time.monotonic() >= deadline:
+                raise DeadlineExceeded(budget, ["map step"])
+            raise Exception("All sections failed in the map step")
+
+        joined = "\n\n".join(f"[ส่วนที่ {i + 1}]\n{p}" for i, p in enumerate(partials))
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(budget, ["reduce step"])
+        summary = await self.generate(self.reduce_prompt(joined, num_sentences), remaining, len(joined))
+        return summary.strip(), report
@@ -0,0 +1,99 @@
+from decouple import config
+
+
+class ModelStats:
+    """Exponentially weighted latency and success rate of one model for one task type"""
+
+    def __init__(self, alpha: float, prior_latency: float):
+        self.alpha = alpha
+        self.latency = prior_latency
+        self.success = 1.0
+        self.samples = 0
+
+    def record(self, latency: float, success: bool):
+        self.samples += 1
+        if success:
+            # Failed calls often return fast (404/429), so only successes update the latency estimate
+            self.latency += self.alpha * (latency - self.latency)
+        self.success += self.alpha * ((1.0 if success else 0.0) - self.success)
+
+
+class ModelRouter:
+    """
+    Orders candidate models per task by expected time-to-success:
+
+        expected = ewma_latency / max(ewma_success, floor)
+
+    i.e. the mean time a model needs per successful answer. Models without samples
+    start from a prior latency and keep their configured order. For short documents
+    "lite" models get a bonus, for long ones a penalty. Models whose circuit is open
+    go last, so they are only reached once their cool-down has passed.
+    """
+
+    def __init__(self, client, candidates: dict[str, list[dict]]):
+        """
+        Args:
+            client: LLMClient (circuit state)
+            candidates: {task: [{"model": ..., "desc": ..., "lite": bool}, ...]} in preferred order
+        """
+        self.client = client
+        self.candidates = candidates
+        self.alpha = config("ROUTER_EWMA_ALPHA", default=0.2, cast=float)
+        self.prior_latency = config("ROUTER_PRIOR_LATENCY_SECONDS", default=5, cast=float)
+        self.success_floor = config("ROUTER_SUCCESS_FLOOR", default=0.05, cast=float)
+        self.short_text_chars = config("ROUTER_SHORT_TEXT_CHARS", default=4000, cast=int)
+        self.lite_factor = config("ROUTER_LITE_FACTOR", default=0.7, cast=float)
+        self.stats: dict[tuple[str, str], ModelStats] = {}
+
+    def _stats(self, task: str, model_name: str) -> ModelStats:
+        key = (task, model_name)
+        if key not in self.stats:
+            self.stats[key] = ModelStats(self.alpha, self.prior_latency)
+        return self.stats[key]
+
+    def record(self, task: str, model_name: str, latency: float, success: bool):
+        self._stats(task, model_name).record(latency, success)
+
+    def expected_time(self, task: str, candidate: dict, text_length: int | None = None) -> float:
+        stats = self._stats(task, candidate["model"])
+        expected = stats.latency / max(stats.success, self.success_floor)
+        if candidate.get("lite") and text_length is not None:
+            if text_length <= self.short_text_chars:
+                expected *= self.lite_factor
+            else:
+                expected /= self.lite_factor
+        return expected
+
+    def order(self, task: str, text_length: int | None = None) -> list[str]:
+        """Model names for `task`, best first"""
+        ranked = sorted(
+            enumerate(self.candidates.get(task, [])),
+            key=lambda item: (
+                self.client.breaker(item[1]["model"]).state == "open",
+                self.expected_time(task, item[1], text_length),
+                item[0],
+            ),
+        )
+        return [candidate["model"] for _, candidate in ranked]
+
+    def table(self, text_length: int | None = None) -> dict:
+        """Current routing table for the admin endpoint"""
+        table = {}
+        for task, candidates in self.candidates.items():
+            order = self.order(task, text_length)
+            rows = []
+            for candidate in candidates:
+                stats = self._stats(task, candidate["model"])
+                rows.append({
+                    "model": candidate["model"],
+                    "desc": candidate.get("desc"),
+                    "lite": bool(candidate.get("lite")),
+                    "rank": order.index(candidate["model"]) + 1,
+                    "ewma_latency": round(stats.latency, 3),
+                    "ewma_success": round(stats.success, 3),
+                    "samples": stats.samples,
+                    "expected_time_to_success": round(self.expected_time(task, candidate, text_length), 3),
+                    "circuit": self.client.breaker(candidate["model"]).state,
+                })
+            table[task] = sorted(rows, key=lambda row: row["rank"])
+        return table
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import time
+from decouple import config
+
+from .client import LLMClient, ModelUnavailable, classify_error, parse_retry_delay
+
+
+class RateLimited(Exception):
+    """The model's token bucket cannot serve the call within the allowed wait"""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate_per_minute`, holding at most `burst` tokens.
+    `block_for` empties the bucket until a server-provided retry delay has passed.
+    A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token can be taken (0 if one is available now)"""
+        if not self.rate and not self.blocked_until:
+            return 0.0
+        now = time.monotonic()
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if not self.rate or self.tokens >= 1:
+            return blocked
+        return max(blocked, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        if self.rate:
+            self.tokens -= 1
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "rpm": round(self.rate * 60, 2),
+            "tokens": round(self.tokens, 2) if self.rate else None,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 1),
+        }
+
+
+def contents_fingerprint(model_name: str, task: str, contents) -> str:
+    """Stable hash of a call (model + task + prompt parts, including inline bytes) for single-flight"""
+    digest = hashlib.sha256(f"{model_name}\x00{task}\x00".encode("utf-8"))
+    parts = contents if isinstance(contents, list) else [contents]
+    for part in parts:
+        if isinstance(part, dict) and "data" in part:
+            digest.update(str(part.get("mime_type", "")).encode("utf-8"))
+            data = part["data"]
+            digest.update(data if isinstance(data, bytes) else str(data).encode("utf-8"))
+        elif isinstance(part, dict):
+            # File references ({"file_data": {...}}) are identified by their URI
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        else:
+            digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LLMScheduler:
+    """
+    Central gate for every Gemini call (summary, evaluation, OCR).
+
+    - Token buckets per API key and per (key, model) keep us under the quota
+      instead of discovering it through 429s; a 429 with a retry delay blocks the
+      model's bucket for exactly that long.
+    - A call that would have to wait longer than `max_wait` raises RateLimited so the
+      caller can move on to the next model instead of queueing.
+    - Identical in-flight calls are coalesced (single-flight): concurrent duplicates
+      await the same upstream request, which is cancelled once its last waiter gives up
+      (hedge losers and expired calls stop using quota).
+    """
+
+    def __init__(self, client: LLMClient, key_id: str = "default"):
+        self.client = client
+        self.key_id = key_id
+        self.default_model_rpm = config("LLM_MODEL_RPM", default=15, cast=float)
+        self.key_rpm = config("LLM_KEY_RPM", default=0, cast=float)
+        self.max_wait = config("LLM_MAX_QUEUE_WAIT_SECONDS", default=10, cast=float)
+        self.model_rpm = self._parse_overrides(config("LLM_MODEL_RPM_OVERRIDES", default=""))
+        self.key_bucket = TokenBucket(self.key_rpm)
+        self.model_buckets: dict[str, TokenBucket] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        # Callers currently awaiting each single-flight task
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.counters = {"calls": 0, "coalesced": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    @staticmethod
+    def _parse_overrides(value: str) -> dict[str, float]:
+        """"gemini-2.0-flash=15,gemini-2.0-flash-lite=30" -> {model: rpm}"""
+        overrides = {}
+        for item in value.split(","):
+            if "=" in item:
+                model_name, rpm = item.split("=", 1)
+                overrides[model_name.strip()] = float(rpm)
+        return overrides
+
+    def is_available(self) -> bool:
+        return self.client.is_available()
+
+    def bucket(self, model_name: str) -> TokenBucket:
+        if model_name not in self.model_buckets:
+            self.model_buckets[model_name] = TokenBucket(self.model_rpm.get(model_name, self.default_model_rpm))
+        return self.model_buckets[model_name]
+
+    async def acquire(self, model_name: str, max_wait: float | None = None):
+        """Wait for a key token and a model token, or raise RateLimited if that takes longer than max_wait"""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        buckets = (self.key_bucket, self.bucket(model_name))
+        while True:
+            wait = max(b.wait_time() for b in buckets)
+            if wait <= 0:
+                for b in buckets:
+                    b.take()
+                return
+            if time.monotonic() + wait > deadline:
+                self.counters["rate_limited"] += 1
+                raise RateLimited(f"{model_name}: rate limited for another {wait:.1f}s")
+            self.counters["waited_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    def _on_error(self, model_name: str, error: Exception):
+        if classify_error(error) == "quota":
+            delay = parse_retry_delay(error)
+            self.bucket(model_name).block_for(delay if delay is not None else self.client.quota_cooldown)
+
+    async def _call(self, model_name: str, contents, task: str, max_wait: float | None) -> str:
+        await self.acquire(model_name, max_wait)
+        self.counters["calls"] += 1
+        try:
+            return await self.client.generate(model_name, contents, task=task)
+        except (ModelUnavailable, RateLimited):
+            # our own rejections (open circuit): not a provider answer, must not block the bucket again
+            raise
+        except Exception as e:
+            self._on_error(model_name, e)
+            raise
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Waiters may have given up (deadline/hedging); retrieve the error so it is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    async def generate(self, model_name: str, contents, task: str = "summary", max_wait: float | None = None) -> str:
+        key = contents_fingerprint(model_name, task, contents)
+        task_ = self._inflight.get(key)
+        if task_ is not None:
+            self.counters["coalesced"] += 1
+        else:
+            task_ = asyncio.ensure_future(self._call(model_name, contents, task, max_wait))
+            self._inflight[key] = task_
+            task_.add_done_callback(lambda t: self._finished(key, t))
+        # shield: one waiter giving up must not cancel the call the others are waiting on...
+        self._waiters[task_] = self._waiters.get(task_, 0) + 1
+        try:
+            return await asyncio.shield(task_)
+        except asyncio.CancelledError:
+            # ...but when the last one gives up nobody needs the answer: stop the upstream call
+            if self._waiters[task_] == 1 and not task_.done():
+                task_.cancel()
+            raise
+        finally:
+            self._waiters[task_] -= 1
+            if not self._waiters[task_]:
+                del self._waiters[task_]
+
+    async def stream(self, model_name: str, contents, task: str = "summary", max_wait: float | None = None):
+        await self.acquire(model_name, max_wait)
+        self.counters["calls"] += 1
+        try:
+            async for chunk in self.client.stream(model_name, contents, task=task):
+                yield chunk
+        except (ModelUnavailable, RateLimited):
+            raise
+        except Exception as e:
+            self._on_error(model_name, e)
+            raise
+
+    def stats(self) -> dict:
+        return {
+            **{k: round(v, 2) if isinstance(v, float) else v for k, v in self.counters.items()},
+            "key_id": self.key_id,
+            "inflight": len(self._inflight),
+            "key": self.key_bucket.snapshot(),
+            "models": {name: b.snapshot() for name, b in self.model_buckets.items()},
+        }
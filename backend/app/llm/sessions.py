@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+
+from ..workers.executors import run_blocking
+from .backends import LLMBackend
+
+
+class DocumentSession:
+    """
+    One document known to the LLM provider. `part` goes into `contents` in place of
+    the raw bytes: a File API reference when the backend supports uploads, otherwise
+    the inline bytes kept in memory (so at least they are read and validated once).
+    """
+
+    def __init__(self, session_id: str, digest: str, mime_type: str, size: int, part: dict,
+                 provider_name: str | None, expires_at: float, owner_id: str | None = None):
+        self.session_id = session_id
+        self.owner_id = owner_id  # user that opened it (None = anonymous request)
+        self.digest = digest
+        self.mime_type = mime_type
+        self.size = size
+        self.part = part
+        self.provider_name = provider_name
+        self.expires_at = expires_at
+        self.text: str | None = None  # transcription, once OCR has run
+
+    @property
+    def uploaded(self) -> bool:
+        return self.provider_name is not None
+
+    def snapshot(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "mime_type": self.mime_type,
+            "size": self.size,
+            "uploaded": self.uploaded,
+            "has_text": self.text is not None,
+            "expires_in": round(max(0.0, self.expires_at - time.monotonic())),
+        }
+
+
+class DocumentSessionStore:
+    """
+    Sessions keyed by owner + SHA-256 of the document bytes: the same user opening the same
+    file twice (re-upload, job retry) reuses the provider copy, while other users get sessions
+    of their own. Expired and evicted sessions are deleted from the provider.
+
+    The store lives in the API process: a session_id is only known to the process that opened it,
+    so /documents needs a single long-running server and is not routed to the API on Vercel.
+    """
+
+    def __init__(self, backend: LLMBackend, ttl_seconds: float = 3600, max_sessions: int = 100):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, DocumentSession] = OrderedDict()
+        self._by_digest: dict[tuple[str | None, str], str] = {}
+        self._opening: dict[tuple[str | None, str], asyncio.Task] = {}
+        self.counters = {"opened": 0, "reused": 0, "upload_errors": 0}
+
+    async def open(
+        self, data: bytes, mime_type: str, display_name: str | None = None, owner_id: str | None = None
+    ) -> DocumentSession:
+        self._expire()
+        key = (owner_id, hashlib.sha256(data).hexdigest())
+        session = self.get(self._by_digest.get(key, ""))
+        if session is not None:
+            self.counters["reused"] += 1
+            return session
+
+        # Concurrent opens of the same document by the same owner share one upload
+        task = self._opening.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._create(key, data, mime_type, display_name))
+            self._opening[key] = task
+            task.add_done_callback(lambda _: self._opening.pop(key, None))
+        else:
+            self.counters["reused"] += 1
+        return await asyncio.shield(task)
+
+    async def _create(
+        self, key: tuple[str | None, str], data: bytes, mime_type: str, display_name: str | None
+    ) -> DocumentSession:
+        owner_id, digest = key
+        provider_name, part = None, {"mime_type": mime_type, "data": data}
+        if self.backend.supports_documents():
+            try:
+                provider_name, part = await run_blocking(
+                    self.backend.executor, self.backend.upload_document, data, mime_type, display_name
+                )
+            except Exception as e:
+                # Fall back to inline bytes rather than failing the request
+                print(f"DEBUG: Document upload failed, sending inline: {e}")
+                self.counters["upload_errors"] += 1
+
+        session = DocumentSession(
+            uuid.uuid4().hex, digest, mime_type, len(data), part, provider_name,
+            time.monotonic() + self.ttl_seconds, owner_id,
+        )
+        self._sessions[session.session_id] = session
+        self._by_digest[key] = session.session_id
+        self.counters["opened"] += 1
+        while len(self._sessions) > self.max_sessions:
+            _, oldest = self._sessions.popitem(last=False)
+            self._discard(oldest)
+        return session
+
+    def get_owned(self, session_id: str | None, owner_id: str | None) -> DocumentSession | None:
+        """Like get(), but None unless `owner_id` opened the session (callers answer 404 either way)"""
+        session = self.get(session_id)
+        if session is None or session.owner_id != owner_id:
+            return None
+        return session
+
+    def get(self, session_id: str | None) -> DocumentSession | None:
+        session = self._sessions.get(session_id or "")
+        if session is None:
+            return None
+        if session.expires_at <= time.monotonic():
+            self.close(session_id)
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._discard(session)
+        return True
+
+    def _discard(self, session: DocumentSession):
+        key = (session.owner_id, session.digest)
+        if self._by_digest.get(key) == session.session_id:
+            del self._by_digest[key]
+        if session.provider_name:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._delete(session.provider_name)
+                return
+            # Provider deletes are network calls: keep them off the event loop (fire and forget)
+            if self.backend.executor is not None:
+                self.backend.executor.submit(self._delete, session.provider_name)
+            else:
+                loop.run_in_executor(None, self._delete, session.provider_name)
+
+    def _delete(self, provider_name: str):
+        try:
+            self.backend.delete_document(provider_name)
+        except Exception as e:
+            print(f"DEBUG: Failed to delete provider file {provider_name}: {e}")
+
+    def _expire(self):
+        now = time.monotonic()
+        for session_id in [sid for sid, s in self._sessions.items() if s.expires_at <= now]:
+            self.close(session_id)
+
+    def stats(self) -> dict:
+        return {**self.counters, "active": len(self._sessions)}
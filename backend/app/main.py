@@ -1,17 +1,40 @@
-from fastapi import FastAPI, HTTPException, Body, Depends, UploadFile, File, Form, Request, Header
+from fastapi import FastAPI, HTTPException, Body, Depends, UploadFile, File, Form, Request, Header, Response, Query
+from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import Headers
 import asyncio
-from starlette.concurrency import run_in_threadpool
+import hashlib
+import io
+import json
+import re
+import tempfile
+import time
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from .summarizer.text_processor import TextProcessor
 from .summarizer.summarization_model import SummarizationModel
+from .summarizer.compressor import InputCompressor
+from .summarizer.local_evaluator import LocalEvaluator
 from .models.user import UserSchema, UserLoginSchema, TokenSchema
-from .database.mongo import user_collection, create_unique_index, client, history_collection
+from .database.mongo import user_collection, create_unique_index, client, history_collection, job_collection, cache_collection
 from .auth.auth_handler import get_hashed_password_v2, verify_password, sign_jwt, decode_jwt, verify_google_token
 from .routers.users import router as user_router
 from .routers.history import router as history_router
 from .routers.admin import router as admin_router
+from .llm.backends import create_backend
+from .llm.client import LLMClient, ModelUnavailable
+from .llm.hedging import DeadlineExceeded, LatencyTracker, first_success
+from .llm.map_reduce import MapReduceSummarizer
+from .llm.router import ModelRouter
+from .llm.scheduler import LLMScheduler, RateLimited
+from .llm.sessions import DocumentSession, DocumentSessionStore
+from .jobs.job_queue import JobQueue, JobQueueFull, FINISHED_STATES
+from .uploads.limits import UploadSizeLimitMiddleware, read_upload
+from .uploads.resumable import ResumableUploadStore
+from .uploads.text_body import MAX_TEXT_BODY_BYTES, read_text_body
+from .cache.tiered_cache import TieredCache, make_cache_key, normalize_text
+from .workers.executors import WorkloadExecutor
 from decouple import config
 
 import os
@@ -57,12 +80,44 @@ else:
     if not HAS_GENAI:
         STARTUP_ERRORS.append("GenAI module missing")
 
+# Blocking work runs on one named pool per workload class instead of the shared default threadpool,
+# so slow Gemini calls cannot hold the threads that ranking or file extraction need (stats on /health)
+executors = {
+    "llm": WorkloadExecutor("llm", config("EXECUTOR_LLM_WORKERS", default=16, cast=int)),
+    "cpu": WorkloadExecutor("cpu", config("EXECUTOR_CPU_WORKERS", default=max(2, os.cpu_count() or 1), cast=int)),
+    "extraction": WorkloadExecutor("extraction", config("EXECUTOR_EXTRACTION_WORKERS", default=4, cast=int)),
+    "io": WorkloadExecutor("io", config("EXECUTOR_IO_WORKERS", default=8, cast=int)),
+}
+
+# Pluggable LLM backend: "gemini" (default) or "simulated" for offline load testing
+LLM_BACKEND = config("LLM_BACKEND", default="gemini")
+llm_backend = create_backend(LLM_BACKEND, api_key=GOOGLE_API_KEY, executor=executors["llm"])
+# One long-lived client for the whole process (model objects, connections and circuit breakers are reused)
+llm_client = LLMClient(llm_backend)
+# All Gemini calls go through the scheduler: per-model/per-key token buckets + coalescing of identical calls
+llm_scheduler = LLMScheduler(
+    llm_client,
+    key_id=hashlib.sha256(GOOGLE_API_KEY.encode("utf-8")).hexdigest()[:8] if GOOGLE_API_KEY else "default",
+)
+if LLM_BACKEND != "gemini":
+    gemini_model = "active" if llm_backend.is_available() else None
+# Scanned documents are uploaded to the provider once; OCR, summary and evaluation reference the session
+document_sessions = DocumentSessionStore(
+    llm_backend,
+    ttl_seconds=config("DOC_SESSION_TTL_SECONDS", default=3600, cast=float),
+    max_sessions=config("DOC_SESSION_MAX", default=100, cast=int),
+)
+
 import textwrap
 
 # Try to import full file processor, fallback to simple one
 try:
     from .summarizer.file_processor import FileProcessor
-    file_processor = FileProcessor()
+    file_processor = FileProcessor(
+        ocr_concurrency=config("OCR_PAGE_CONCURRENCY", default=4, cast=int),
+        pdf_workers=config("PDF_EXTRACT_WORKERS", default=0, cast=int),
+        executor=executors["extraction"],
+    )
     FILE_PROCESSOR_MODE = "full"
 except ImportError as e:
     STARTUP_ERRORS.append(f"FileProcessor Import Error: {e}")
@@ -77,12 +132,21 @@ except Exception as e:
 
 app = FastAPI()
 
+# Oversize uploads are cut off while the body is still arriving (added before CORS so 413s keep CORS headers)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_file_size=file_processor.MAX_FILE_SIZE,
+    paths={"/summarize-file", "/jobs/summarize-file"},
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Resumable uploads: the client reads the offset to resume from; history: the cursor of the next page
+    expose_headers=["Upload-Offset", "Upload-Length", "Location", "X-Next-Cursor"],
 )
 
 # Mount static files
@@ -139,21 +203,82 @@ summarization_model = SummarizationModel()
 class TextRequest(BaseModel):
     text: str
     num_sentences: int | None = 5
+    no_cache: bool = False
+    ai_mode: str | None = None  # "compress" | "map_reduce" สำหรับเอกสารยาว (ค่าเริ่มต้นจาก AI_LONG_DOC_MODE)
 
-def summarize_with_ai(text: str, num_sentences: int) -> str:
-
-
-    # กลยุทธ์: ลำดับความสำคัญการ Fallback หลายโมเดล (ขึ้นอยู่กับความพร้อมใช้งานจริง)
-    strategies = [
-        {'model': 'gemini-2.0-flash', 'desc': 'Gemini 2.0 Flash (Standard)'},
-        {'model': 'gemini-2.0-flash-lite', 'desc': 'Gemini 2.0 Flash Lite (Efficient)'},
-        {'model': 'gemini-2.5-flash', 'desc': 'Gemini 2.5 Flash (Newest)'},
-        {'model': 'gemini-1.5-flash-latest', 'desc': 'Gemini 1.5 Flash Latest (Fallback)'},
-    ]
-
-    last_error = None
-    
-    prompt = textwrap.dedent(f"""
+class BatchTextRequest(BaseModel):
+    texts: list[str]
+    num_sentences: int | None = 5
+    use_ai: bool = False
+    concurrency: int | None = None
+
+# Batch limits: items per request, and how many items run through the engines at once
+BATCH_MAX_ITEMS = config("BATCH_MAX_ITEMS", default=1000, cast=int)
+BATCH_CONCURRENCY = config("BATCH_CONCURRENCY", default=8, cast=int)
+BATCH_HISTORY_FLUSH = 100
+
+JOB_EVENTS_POLL_SECONDS = 0.5
+
+def get_user_id_from_authorization(authorization: str | None) -> str | None:
+    """Return the user id from an optional 'Bearer <jwt>' header, or None for anonymous requests"""
+    if not authorization:
+        return None
+    # Remove 'Bearer ' prefix if present
+    token = authorization.split(" ")[1] if " " in authorization else authorization
+    decoded = decode_jwt(token)
+    return decoded["user_id"] if decoded else None
+
+def unpack_basic_result(basic_result) -> tuple[str, dict | None]:
+    """Basic Engine returns a dict (summary + metrics) or a plain string on fallback paths"""
+    if isinstance(basic_result, dict):
+        return basic_result.get("summary", ""), basic_result.get("metrics", None)
+    return str(basic_result), None
+
+def summarize_basic(text: str, num_sentences: int):
+    """Clean + TextRank in one call so the whole CPU part runs on a single worker thread"""
+    return summarization_model.summarize(text_processor.clean_text(text), num_sentences=num_sentences)
+
+# กลยุทธ์: โมเดลที่ใช้ได้ (ลำดับนี้เป็นค่าเริ่มต้น ลำดับจริงมาจาก model_router ตามสถิติ latency/success)
+AI_SUMMARY_STRATEGIES = [
+    {'model': 'gemini-2.0-flash', 'desc': 'Gemini 2.0 Flash (Standard)'},
+    {'model': 'gemini-2.0-flash-lite', 'desc': 'Gemini 2.0 Flash Lite (Efficient)', 'lite': True},
+    {'model': 'gemini-2.5-flash', 'desc': 'Gemini 2.5 Flash (Newest)'},
+    {'model': 'gemini-1.5-flash-latest', 'desc': 'Gemini 1.5 Flash Latest (Fallback)'},
+]
+
+# Candidate models for AI OCR
+OCR_MODELS = [
+    {'model': 'gemini-2.0-flash', 'desc': 'Gemini 2.0 Flash'},
+    {'model': 'gemini-2.0-flash-lite-preview-02-05', 'desc': 'Gemini 2.0 Flash Lite Preview', 'lite': True},
+    {'model': 'gemini-2.0-flash-exp', 'desc': 'Gemini 2.0 Flash Experimental'},
+    {'model': 'gemini-flash-latest', 'desc': 'Gemini Flash Latest (stable alias)'},
+]
+
+# Adaptive routing: per task, models are tried in order of expected time-to-success
+model_router = ModelRouter(llm_client, {"summary": AI_SUMMARY_STRATEGIES, "ocr": OCR_MODELS})
+app.state.model_router = model_router  # อ่านโดย GET /admin/model-routing (routers/admin.py)
+# Recent successful latencies per model (p95 -> hedge delay)
+ai_latency = LatencyTracker()
+
+async def routed_generate(task: str, model_name: str, contents, max_wait: float | None = None) -> str:
+    """llm_scheduler.generate + latency/success bookkeeping for the router and the hedge delays"""
+    started = time.monotonic()
+    try:
+        response_text = await llm_scheduler.generate(model_name, contents, task=task, max_wait=max_wait)
+    except (ModelUnavailable, RateLimited):
+        # Rejected locally without reaching the provider: nothing to learn about the model
+        raise
+    except Exception:
+        model_router.record(task, model_name, time.monotonic() - started, success=False)
+        raise
+    elapsed = time.monotonic() - started
+    model_router.record(task, model_name, elapsed, success=bool(response_text))
+    if response_text:
+        ai_latency.record(model_name, elapsed)
+    return response_text
+
+def build_summary_prompt(text: str, num_sentences: int) -> str:
+    return textwrap.dedent(f"""
         Role: You are an expert Document Analyst and Content Summarizer using Thai language.
         Task: Analyze the raw text extracted from a PDF/DOCX document, clean the noise, and provide a high-quality summary.
 
@@ -188,77 +313,243 @@ def summarize_with_ai(text: str, num_sentences: int) -> str:
         "{text}"
     """)
 
-    # Try models in order with Smart Retry
-    retry_delay = 1
-    
-    # ลองใช้โมเดลตามลำดับด้วย Smart Retry (Exponential Backoff)
-    retry_delay = 1
-    all_errors = []
+def parse_ai_metrics(ai_text: str) -> tuple[str, dict | None]:
+    """Split the trailing [METRICS: {...}] block from an AI summary (same pattern as the frontend)"""
+    match = re.search(r'\[METRICS:\s*(\{.*?\})\s*\]', ai_text, flags=re.DOTALL)
+    if not match:
+        return ai_text.strip(), None
+    summary = (ai_text[:match.start()] + ai_text[match.end():]).strip()
+    try:
+        return summary, json.loads(match.group(1))
+    except ValueError:
+        return summary, None
+
+# Content-addressed cache of engine outputs (basic + AI), shared by /summarize and /summarize-file
+summary_cache = TieredCache(
+    "summary",
+    collection=cache_collection,
+    max_entries=config("CACHE_LRU_SIZE", default=512, cast=int),
+)
+# Extracted text of uploads keyed by the SHA-256 of the file bytes: repeat uploads of the same
+# document skip pdfplumber / DOCX parsing and OCR. Values can be large, so the Mongo tier is compressed.
+extraction_cache = TieredCache(
+    "extraction",
+    collection=cache_collection,
+    max_entries=config("EXTRACTION_CACHE_LRU_SIZE", default=64, cast=int),
+    compress=True,
+)
 
-    for i, strategy in enumerate(strategies):
-        model_name = strategy['model']
-        
-        # Exponential Backoff ก่อนลองโมเดลถัดไป
-        if i > 0:
-            print(f"DEBUG: Waiting {retry_delay}s before trying next model...")
-            import time
-            time.sleep(retry_delay)
-            retry_delay *= 2 
-            
-        # ตรรกะการลองซ้ำแบบซ้อน (Nested Retry) สำหรับข้อผิดพลาด 429
-        max_retries_per_model = 5
-        for attempt in range(max_retries_per_model):
-            try:
-                print(f"DEBUG: Trying {strategy['desc']} (Model: {model_name}) [Attempt {attempt+1}]...")
-                
-                genai.configure(api_key=GOOGLE_API_KEY)
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                
-                if response and response.text:
-                    print(f"DEBUG: Success with {model_name}")
-                    return response.text.strip()
-                else:
-                    raise ValueError("Response blocked by Safety Filters or Empty.")
-                
-            except Exception as e:
-                print(f"DEBUG: Failed with {model_name}: {e}")
-                
-                # กู้คืน: การรอคอยอัจฉริยะ (Smart Wait) สำหรับ 429 (สำคัญสำหรับคีย์ฟรี)
-                if "429" in str(e) or "quota" in str(e).lower():
-                    # คำขอจากผู้ใช้: คีย์ใหม่ = ไม่ต้องรอ!
-                    print(f"DEBUG: Rate Limit Hit. Retrying immediately (No Wait Mode)...")
-                    # import time
-                    # ... wait logic disabled ...
-                    # time.sleep(wait_time)
-                    
-                    if attempt < max_retries_per_model - 1:
-                         continue
-                
-                # ถ้าเป็น 404/400 (ไม่พบ / อาร์กิวเมนต์ไม่ถูกต้อง) หรือ Limit 0 ให้ล้มเหลวทันทีเพื่อไปโมเดลถัดไป
-                if "404" in str(e) or "not found" in str(e).lower() or "limit: 0" in str(e).lower():
-                     all_errors.append(f"{model_name}: {str(e)}") # Show FULL error
-                     break
-                
-                all_errors.append(f"{model_name}: {str(e)}")
-                break
-        
-        # Exponential Backoff สำหรับโมเดลถัดไป
-        if i < len(strategies) - 1:
-             retry_delay *= 2 
-    
-    # ถ้าล้มเหลวทั้งหมด
-    return f"AI Service Error: All models failed. Details: {'; '.join(all_errors)}"
+def extraction_cache_key(content: bytes, page_range: tuple[int, int | None] | None, max_chars: int | None) -> str:
+    # OCR_PROMPT is part of the key: OCR'd text changes with the prompt
+    version = getattr(file_processor, "EXTRACTOR_VERSION", "simple")
+    return make_cache_key(content, version, OCR_PROMPT, list(page_range or ()), max_chars or 0)
+
+# งบ token ของข้อความที่ส่งให้ Gemini: เอกสารที่ยาวกว่านี้จะถูกย่อด้วย TextRank ก่อน
+AI_INPUT_TOKEN_BUDGET = config("AI_INPUT_TOKEN_BUDGET", default=8000, cast=int)
+AI_EVAL_TOKEN_BUDGET = config("AI_EVAL_TOKEN_BUDGET", default=5000, cast=int)
+input_compressor = InputCompressor(chars_per_token=config("AI_CHARS_PER_TOKEN", default=3.0, cast=float))
+
+# Prompt (and input budget) changes invalidate cached AI summaries automatically
+AI_PROMPT_VERSION = hashlib.sha256(
+    f"{build_summary_prompt('', 0)}{AI_INPUT_TOKEN_BUDGET}".encode("utf-8")
+).hexdigest()[:12]
+
+def summary_cache_key(text: str, num_sentences: int, ai_mode: str = "compress") -> str:
+    return make_cache_key(normalize_text(text), num_sentences, SummarizationModel.ENGINE_VERSION, AI_PROMPT_VERSION, ai_mode)
+
+# ข้อความที่ยาวกว่านี้ normalize + hash บน cpu executor (ข้อความสั้นเร็วกว่าการส่งข้าม thread)
+CACHE_KEY_INLINE_CHARS = 64 * 1024
+
+async def summary_cache_key_async(text: str, num_sentences: int, ai_mode: str = "compress") -> str:
+    if len(text) <= CACHE_KEY_INLINE_CHARS:
+        return summary_cache_key(text, num_sentences, ai_mode)
+    return await executors["cpu"].run(summary_cache_key, text, num_sentences, ai_mode)
+
+async def compress_for_ai(text: str, token_budget: int = AI_INPUT_TOKEN_BUDGET) -> tuple[str, dict]:
+    """Text to send to the LLM (cleaned + TextRank-selected when over budget) and the compression report"""
+    compression = await executors["cpu"].run(input_compressor.compress, text, token_budget)
+    compressed_text = compression.pop("text")
+    if compression["ratio"] < 1:
+        print(f"DEBUG: AI input compressed {compression['original_tokens']} -> {compression['compressed_tokens']} tokens")
+    return compressed_text, compression
+
+async def cache_engine_output(cache_key: str, output: dict):
+    # Never cache an AI outage, otherwise the error would be served until the entry expires
+    if str(output.get("ai_summary", "")).startswith("AI Service Error"):
+        return
+    await summary_cache.set(cache_key, output)
+
+# งบเวลารวมของ AI ต่อคำขอ: ทุกโมเดลที่ลองใช้เวลาร่วมกัน เมื่อหมดเวลาจะคืนเฉพาะสรุปแบบพื้นฐาน
+AI_DEADLINE_SECONDS = config("AI_DEADLINE_SECONDS", default=30, cast=float)
+# Hedging (optional): start the next model when the current one is slower than its p95
+AI_HEDGING = config("AI_HEDGING", default=False, cast=bool)
+AI_HEDGE_DELAY_SECONDS = config("AI_HEDGE_DELAY_SECONDS", default=4, cast=float)
+AI_TIMEOUT_PREFIX = "AI Service Error: Deadline exceeded"
+
+def ai_status_of(ai_summary: str | None) -> str:
+    """"ok" | "timeout" (budget spent) | "error" (all models failed) | "skipped" (AI not requested)"""
+    if ai_summary is None:
+        return "skipped"
+    if ai_summary.startswith(AI_TIMEOUT_PREFIX):
+        return "timeout"
+    if ai_summary.startswith("AI Service Error"):
+        return "error"
+    return "ok"
+
+def hedge_delay(model_name: str) -> float:
+    return ai_latency.percentile(model_name, 0.95) or AI_HEDGE_DELAY_SECONDS
+
+async def generate_with_fallback(prompt: str, budget: float, text_length: int | None = None, task: str = "summary") -> str:
+    """
+    One LLM answer for `prompt`, trying models in router order within `budget` seconds.
+    Raises DeadlineExceeded when the budget runs out, Exception when every model failed.
+    """
+    async def attempt(model_name: str, remaining: float) -> str:
+        print(f"DEBUG: Trying model {model_name} ({remaining:.1f}s left)...")
+        # ไม่รอ token ของ rate limiter นานกว่างบเวลาที่เหลือ
+        return await routed_generate(task, model_name, prompt, max_wait=min(llm_scheduler.max_wait, remaining))
+
+    # ลองใช้โมเดลตามลำดับ: โมเดลที่ circuit เปิดอยู่ (ไม่พบ / quota หมด / ล้มเหลวซ้ำ) จะล้มเหลวทันทีโดยไม่เรียก API
+    model_name, response_text, _ = await first_success(
+        model_router.order(task, text_length),
+        attempt,
+        budget,
+        hedge_delay=hedge_delay if AI_HEDGING else None,
+    )
+    print(f"DEBUG: Success with {model_name}")
+    return response_text
+
+# ใช้แทนข้อความต้นฉบับใน prompt เมื่อเอกสารถูกแนบผ่าน document session
+ATTACHED_DOCUMENT_NOTE = "(The raw input is the attached document.)"
+
+async def summarize_with_ai(
+    text: str, num_sentences: int, budget: float | None = None, session: DocumentSession | None = None
+) -> str:
+    if session is not None:
+        # The document is already with the provider: reference it instead of embedding its text
+        prompt = [session.part, build_summary_prompt(ATTACHED_DOCUMENT_NOTE, num_sentences)]
+    else:
+        prompt = build_summary_prompt(text, num_sentences)
+    budget = AI_DEADLINE_SECONDS if budget is None else budget
+    try:
+        response_text = await generate_with_fallback(prompt, budget, len(text))
+    except DeadlineExceeded as e:
+        print(f"DEBUG: AI deadline exceeded after {budget}s")
+        return f"{AI_TIMEOUT_PREFIX} ({budget:.0f}s). Details: {'; '.join(e.errors)}"
+    except Exception as e:
+        # ถ้าล้มเหลวทั้งหมด
+        return f"AI Service Error: {e}"
+    return response_text.strip()
+
+def build_map_prompt(section: str, index: int, total: int) -> str:
+    return textwrap.dedent(f"""
+        Role: You are an expert Document Analyst using Thai language.
+        Task: This is section {index} of {total} of a long document (raw text extracted from a PDF/DOCX, sections overlap slightly).
+        Summarize ONLY this section as short Thai bullet points covering its key facts, findings and story events.
+        Ignore extraction noise (headers, footers, page numbers, stage directions). Do not add any introduction or metrics.
+
+        Section Text:
+        "{section}"
+    """)
+
+def build_reduce_prompt(partial_summaries: str, num_sentences: int) -> str:
+    return textwrap.dedent(f"""
+        Role: You are an expert Document Analyst and Content Summarizer using Thai language.
+        Task: Below are partial summaries of consecutive sections of ONE long document, in order.
+        Merge them into a single summary of the whole document: remove repetition (sections overlap), keep the core message and key findings.
+
+        Output Requirement:
+        - Output exactly {num_sentences} bullet points in natural, professional Thai.
+        - Concise, clear, and easy to read. Do NOT list the sections separately.
+
+        **Quality Metrics Generation (Important):**
+        At the very end of your response, strictly append a JSON-like string evaluating your own summary.
+        Format: [METRICS: {{"accuracy": XX, "completeness": XX, "conciseness": XX, "average": XX}}]
+        (Do not add any markdown around this specific line, just the raw bracketed string)
+
+        Partial Summaries:
+        {partial_summaries}
+    """)
+
+# โหมดสำหรับเอกสารที่ยาวเกินงบ token: "compress" (ย่อด้วย TextRank) หรือ "map_reduce" (สรุปทีละส่วนแล้วรวม)
+AI_LONG_DOC_MODE = config("AI_LONG_DOC_MODE", default="compress")
+AI_LONG_DOC_MODES = ("compress", "map_reduce")
+AI_MAP_REDUCE_DEADLINE_SECONDS = config("AI_MAP_REDUCE_DEADLINE_SECONDS", default=90, cast=float)
+# Partial summaries are cached per section, keyed by section text + map prompt version
+section_cache = TieredCache("section", collection=cache_collection, max_entries=config("CACHE_LRU_SIZE", default=512, cast=int))
+map_reduce_summarizer = MapReduceSummarizer(
+    generate=generate_with_fallback,
+    map_prompt=build_map_prompt,
+    reduce_prompt=build_reduce_prompt,
+    cache=section_cache,
+    concurrency=config("AI_MAP_REDUCE_CONCURRENCY", default=4, cast=int),
+    section_chars=int(config("AI_SECTION_TOKENS", default=4000, cast=int) * input_compressor.chars_per_token),
+    overlap_chars=int(config("AI_SECTION_OVERLAP_TOKENS", default=200, cast=int) * input_compressor.chars_per_token),
+    prompt_version=hashlib.sha256(build_map_prompt("", 0, 0).encode("utf-8")).hexdigest()[:12],
+)
+
+def resolve_ai_mode(mode: str | None) -> str:
+    mode = mode or AI_LONG_DOC_MODE
+    if mode not in AI_LONG_DOC_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown ai_mode '{mode}' (expected one of {', '.join(AI_LONG_DOC_MODES)})")
+    return mode
+
+async def summarize_document_with_ai(
+    text: str, num_sentences: int, mode: str = "compress", session: DocumentSession | None = None
+) -> tuple[str, dict]:
+    """
+    AI summary of a document of any length; returns (ai_summary, report of how the input was prepared).
+    Documents within AI_INPUT_TOKEN_BUDGET go out as one prompt. Longer ones are either compressed
+    with TextRank ("compress") or summarized section by section and reduced ("map_reduce").
+    With a document session the provider-side copy of the file is referenced instead.
+    """
+    if session is not None:
+        return await summarize_with_ai(text, num_sentences, session=session), {
+            "mode": "session", "session_id": session.session_id, "uploaded": session.uploaded,
+        }
+
+    if mode == "map_reduce" and input_compressor.estimate_tokens(text) > AI_INPUT_TOKEN_BUDGET:
+        budget = AI_MAP_REDUCE_DEADLINE_SECONDS
+        report = {"mode": "map_reduce", "original_tokens": input_compressor.estimate_tokens(text)}
+        try:
+            ai_summary, sections = await map_reduce_summarizer.summarize(text, num_sentences, budget)
+        except DeadlineExceeded as e:
+            return f"{AI_TIMEOUT_PREFIX} ({budget:.0f}s). Details: {'; '.join(e.errors)}", report
+        except Exception as e:
+            return f"AI Service Error: {e}", report
+        return ai_summary, {**report, **sections}
+
+    ai_input, compression = await compress_for_ai(text)
+    return await summarize_with_ai(ai_input, num_sentences), {"mode": "compress", **compression}
 
 
 class EvaluationRequest(BaseModel):
+    original_text: str = ""
+    summary_text: str
+    session_id: str | None = None  # evaluate against a document session instead of original_text
+    mode: str = "ai"  # "ai" (Gemini) | "local" (ROUGE + keyword coverage, no quota)
+
+class EvaluationPair(BaseModel):
     original_text: str
     summary_text: str
 
-async def evaluate_quality_with_ai(original: str, summary: str) -> dict:
-    if not gemini_model or not HAS_GENAI:
+class EvaluationBatchRequest(BaseModel):
+    items: list[EvaluationPair]
+
+EVAL_BATCH_MAX_ITEMS = 1000
+local_evaluator = LocalEvaluator(text_processor)
+
+async def evaluate_quality_with_ai(original: str, summary: str, session: DocumentSession | None = None) -> dict:
+    if not gemini_model:
         return {"error": "AI Service Offline"}
 
+    if session is not None:
+        # ต้นฉบับคือเอกสารที่อัปโหลดไว้แล้ว ไม่ต้องส่งข้อความซ้ำ
+        original, compression = ATTACHED_DOCUMENT_NOTE, {"mode": "session", "session_id": session.session_id}
+    else:
+        # ย่อต้นฉบับตามงบ token แทนการตัดที่ 15,000 ตัวอักษร
+        original, compression = await compress_for_ai(original, AI_EVAL_TOKEN_BUDGET)
+
     prompt = textwrap.dedent(f"""
         บทบาท: คุณคือผู้เชี่ยวชาญด้านการวิเคราะห์ภาษาและการประเมินคุณภาพการสรุปความ
 
@@ -285,21 +576,20 @@ async def evaluate_quality_with_ai(original: str, summary: str) -> dict:
         [ข้อมูลนำเข้า]
 
         บทความต้นฉบับ:
-        "{original[:15000]}"
+        "{original}"
 
         บทสรุปที่สร้างขึ้น:
         "{summary[:5000]}"
     """)
 
     try:
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash') # โมเดลที่รวดเร็วสำหรับการประเมินผล
-        response = await run_in_threadpool(model.generate_content, prompt)
+        # โมเดลที่รวดเร็วสำหรับการประเมินผล
+        contents = [session.part, prompt] if session is not None else prompt
+        response_text = await llm_scheduler.generate('gemini-2.0-flash', contents, task="evaluate")
         
         # ตรรกะการแยกวิเคราะห์ง่ายๆ (โหมด JSON ดีกว่า แต่การแยกวิเคราะห์ข้อความก็แข็งแกร่งพอสำหรับตอนนี้)
-        text_res = response.text.strip()
+        text_res = response_text.strip()
         # ตรวจสอบให้แน่ใจว่าได้ JSON ที่สะอาด
-        import json
         
         # พยายามหาบล็อก JSON
         if "```json" in text_res:
@@ -309,14 +599,56 @@ async def evaluate_quality_with_ai(original: str, summary: str) -> dict:
             end = text_res.rfind("}") + 1
             text_res = text_res[start:end]
             
-        return json.loads(text_res)
+        return {**json.loads(text_res), "input_compression": compression}
     except Exception as e:
         print(f"DEBUG: Evaluation Error: {e}")
         return {"error": str(e), "raw_response": text_res if 'text_res' in locals() else "No response"}
 
 @app.post("/evaluate")
-async def evaluate_summary(request: EvaluationRequest):
-    return await evaluate_quality_with_ai(request.original_text, request.summary_text)
+async def evaluate_summary(request: EvaluationRequest, authorization: str | None = Header(default=None)):
+    if request.mode == "local":
+        if not request.original_text:
+            raise HTTPException(status_code=400, detail="original_text is required for local evaluation")
+        return {
+            "mode": "local",
+            **await executors["cpu"].run(local_evaluator.evaluate, request.original_text, request.summary_text),
+        }
+    if request.mode != "ai":
+        raise HTTPException(status_code=400, detail=f"Unknown evaluation mode '{request.mode}' (expected ai or local)")
+
+    session = None
+    if request.session_id:
+        session = get_session_for_request(request.session_id, authorization)
+    elif not request.original_text:
+        raise HTTPException(status_code=400, detail="original_text or session_id is required")
+    return await evaluate_quality_with_ai(request.original_text, request.summary_text, session=session)
+
+@app.post("/evaluate/batch")
+async def evaluate_batch(request: EvaluationBatchRequest):
+    """Score many summary/original pairs locally (ROUGE-1/2/L + keyword coverage) in one call"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items cannot be empty.")
+    if len(request.items) > EVAL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {EVAL_BATCH_MAX_ITEMS}).")
+    pairs = [(item.original_text, item.summary_text) for item in request.items]
+    results = await executors["cpu"].run(local_evaluator.evaluate_many, pairs)
+    return {"mode": "local", "count": len(results), "results": results}
+
+def get_session_for_request(session_id: str, authorization: str | None) -> DocumentSession:
+    """Session opened by the caller; another user's session is reported as not found"""
+    session = document_sessions.get_owned(session_id, get_user_id_from_authorization(authorization))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Document session not found or expired")
+    return session
+
+@app.get("/documents/{session_id}")
+async def get_document_session(session_id: str, authorization: str | None = Header(default=None)):
+    return get_session_for_request(session_id, authorization).snapshot()
+
+@app.delete("/documents/{session_id}")
+async def close_document_session(session_id: str, authorization: str | None = Header(default=None)):
+    document_sessions.close(get_session_for_request(session_id, authorization).session_id)
+    return {"status": "success", "message": "Document session closed"}
 
 API_VERSION = "v1.8-evaluator"
 
@@ -345,6 +677,13 @@ async def health_check():
         "startup_errors": STARTUP_ERRORS,
         "mongo_config_source": masked_uri,
         "ai_engine": "active" if gemini_model else "inactive",
+        "cache": summary_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "executors": {name: executor.stats() for name, executor in executors.items()},
+        "llm_circuits": llm_client.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "document_sessions": document_sessions.stats(),
+        "resumable_uploads": resumable_uploads.stats(),
     }
 
 
@@ -444,7 +783,7 @@ async def google_login(token_data: dict = Body(...)):
             raise HTTPException(status_code=400, detail="Token is required")
             
         # Verify token in threadpool to avoid blocking async event loop
-        user_info = await run_in_threadpool(verify_google_token, token)
+        user_info = await executors["io"].run(verify_google_token, token)
         if not user_info:
             raise HTTPException(status_code=400, detail="Invalid Google Token (Verification Failed)")
         
@@ -485,38 +824,76 @@ async def google_login(token_data: dict = Body(...)):
         print(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
-@app.post("/summarize")
+TEXT_BODY_MAX_BYTES = config("TEXT_BODY_MAX_BYTES", default=MAX_TEXT_BODY_BYTES, cast=int)
+
+async def read_text_request(
+    http_request: Request, num_sentences: int | None, no_cache: bool, ai_mode: str | None
+) -> TextRequest:
+    """
+    Body of /summarize: a JSON TextRequest, or the raw text itself (text/plain, options in the query string).
+    Either may be sent with Content-Encoding: gzip; see read_text_body.
+    """
+    content_type = (http_request.headers.get("content-type") or "application/json").split(";")[0].strip().lower()
+    if content_type not in ("application/json", "text/plain"):
+        raise HTTPException(status_code=415, detail="Content-Type ต้องเป็น application/json หรือ text/plain")
+    body = await read_text_body(http_request, TEXT_BODY_MAX_BYTES)
+    if content_type == "text/plain":
+        # ข้อความดิบ: ไม่ต้อง escape เป็น JSON (ภาษาไทยไม่กลายเป็น \uXXXX) และไม่ต้อง parse
+        return TextRequest(text=body, num_sentences=num_sentences, no_cache=no_cache, ai_mode=ai_mode)
+    try:
+        return TextRequest.model_validate_json(body)
+    except ValidationError as e:
+        # same shape as FastAPI's own body validation errors
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)])
+
+@app.post(
+    "/summarize",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": TextRequest.model_json_schema()},
+        "text/plain": {"schema": {"type": "string"}},
+    }}},
+)
 async def summarize_text(
-    request: TextRequest, 
+    http_request: Request,
+    num_sentences: int | None = Query(default=5),
+    no_cache: bool = Query(default=False),
+    ai_mode: str | None = Query(default=None),
     authorization: str | None = Header(default=None)
 ):
+    request = await read_text_request(http_request, num_sentences, no_cache, ai_mode)
     try:
         if not request.text:
             raise HTTPException(status_code=400, detail="Input text cannot be empty.")
         
-        # 1. การสรุปแบบพื้นฐาน
-        processed_text = text_processor.clean_text(request.text)
-        
-        # การประมวลผลแบบขนาน
-        basic_task = run_in_threadpool(summarization_model.summarize, processed_text, num_sentences=request.num_sentences or 5)
-        ai_task = run_in_threadpool(summarize_with_ai, request.text, num_sentences=request.num_sentences or 5)
-        
-        basic_result, ai_summary = await asyncio.gather(basic_task, ai_task)
-        
-        # จัดการการคืนค่าแบบ Dictionary จาก Basic Engine
-        if isinstance(basic_result, dict):
-            basic_summary_text = basic_result.get("summary", "")
-            basic_metrics = basic_result.get("metrics", None)
-        else:
-            basic_summary_text = str(basic_result)
-            basic_metrics = None
+        num_sentences = request.num_sentences or 5
+        ai_mode = resolve_ai_mode(request.ai_mode)
+        cache_key = await summary_cache_key_async(request.text, num_sentences, ai_mode)
+        engine_output = None if request.no_cache else await summary_cache.get(cache_key)
+        cached = engine_output is not None
+
+        if not cached:
+            # 1. การสรุปแบบพื้นฐาน (clean + TextRank บน cpu executor) และ AI แบบขนาน
+            basic_task = executors["cpu"].run(summarize_basic, request.text, num_sentences)
+            ai_task = summarize_document_with_ai(request.text, num_sentences=num_sentences, mode=ai_mode)
+            
+            basic_result, (ai_summary, ai_input) = await asyncio.gather(basic_task, ai_task)
+            
+            # จัดการการคืนค่าแบบ Dictionary จาก Basic Engine
+            basic_summary_text, basic_metrics = unpack_basic_result(basic_result)
+            engine_output = {
+                "basic_summary": basic_summary_text,
+                "basic_metrics": basic_metrics,
+                "ai_summary": ai_summary,
+                "ai_input": ai_input,
+            }
+            await cache_engine_output(cache_key, engine_output)
 
         result = {
             "original_text": request.text, 
-            "basic_summary": basic_summary_text,
-            "basic_metrics": basic_metrics,
-            "ai_summary": ai_summary,
-            "comparison_mode": True
+            **engine_output,
+            "ai_status": ai_status_of(engine_output.get("ai_summary")),
+            "comparison_mode": True,
+            "cached": cached
         }
 
         # Auto-save history if user is logged in
@@ -542,93 +919,485 @@ async def summarize_text(
                 print(f"DEBUG: Failed to save history: {e}")
 
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/summarize-file")
-async def summarize_file(
-    file: UploadFile = File(...),
-    num_sentences: int = Form(5),
+@app.post("/summarize/batch")
+async def summarize_batch(
+    request: BatchTextRequest,
     authorization: str | None = Header(default=None)
 ):
-    try:
-        from starlette.concurrency import run_in_threadpool
+    """
+    Summarize many texts in one request. Results are streamed as NDJSON, one line per item
+    in completion order (each line carries its "index"), followed by a final {"done": true} line.
+    History entries are bulk-inserted for logged-in users.
+    """
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="texts cannot be empty.")
+    if len(request.texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {BATCH_MAX_ITEMS} texts.")
+
+    num_sentences = request.num_sentences or 5
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    user_id = get_user_id_from_authorization(authorization)
+
+    async def summarize_item(index: int, text: str) -> dict:
+        if not text or not text.strip():
+            return {"index": index, "error": "Input text cannot be empty."}
+        async with semaphore:
+            try:
+                basic_task = executors["cpu"].run(summarize_basic, text, num_sentences)
+                if request.use_ai:
+                    ai_task = summarize_document_with_ai(text, num_sentences=num_sentences, mode=AI_LONG_DOC_MODE)
+                    basic_result, (ai_summary, ai_input) = await asyncio.gather(basic_task, ai_task)
+                else:
+                    basic_result, ai_summary, ai_input = await basic_task, None, None
+            except Exception as e:
+                return {"index": index, "error": str(e)}
 
-        # Validate file
-        file_processor.validate_file(file)
-        
-        # Extract text
-        extracted_text = await file_processor.extract_text_from_file(file)
-        
-        # --- AI OCR Fallback (Hybrid Mode) ---
-        if not extracted_text:
-            print("DEBUG: Local text extraction returned empty. Attempting AI OCR...")
-            
-            # Check if file is suitable for OCR (PDF or Image)
-            # file_processor guarantees PDF or Image types generally, but let's double check content type handled by Gemini
-            # Supported: application/pdf, image/jpeg, image/png, etc.
-            
-            # Reset cursor to read bytes for OCR
-            await file.seek(0)
-            file_bytes = await file.read()
-            
+        basic_summary_text, basic_metrics = unpack_basic_result(basic_result)
+        return {
+            "index": index,
+            "basic_summary": basic_summary_text,
+            "basic_metrics": basic_metrics,
+            "ai_summary": ai_summary,
+            "ai_status": ai_status_of(ai_summary),
+            "ai_input": ai_input,
+        }
+
+    async def flush_history(items: list[dict]) -> int:
+        if not items:
+            return 0
+        try:
+            await history_collection.insert_many(items, ordered=False)
+            return len(items)
+        except Exception as e:
+            print(f"DEBUG: Failed to save batch history: {e}")
+            return 0
+
+    async def stream_results():
+        tasks = [asyncio.create_task(summarize_item(i, text)) for i, text in enumerate(request.texts)]
+        pending_history = []
+        errors = 0
+        saved = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+
+                if "error" in item:
+                    errors += 1
+                elif user_id:
+                    text = request.texts[item["index"]]
+                    pending_history.append({
+                        "user_id": user_id,
+                        "title": text[:50] + "..." if len(text) > 50 else text,
+                        "original_text": text,
+                        "summary_result": {"original_text": text, **item, "comparison_mode": request.use_ai},
+                        "created_at": datetime.now(timezone.utc),
+                        "is_favorite": False
+                    })
+                    if len(pending_history) >= BATCH_HISTORY_FLUSH:
+                        saved += await flush_history(pending_history)
+                        pending_history = []
+
+            saved += await flush_history(pending_history)
+            yield json.dumps({"done": True, "count": len(tasks), "errors": errors, "history_saved": saved}) + "\n"
+        finally:
+            # Client disconnected mid-stream: stop the remaining items
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/summarize/stream")
+async def summarize_stream(
+    request: TextRequest,
+    authorization: str | None = Header(default=None)
+):
+    """
+    Server-sent events variant of /summarize:
+    - "basic": basic summary + metrics (sent as soon as TextRank finishes)
+    - "token": AI summary text chunks as Gemini generates them
+    - "error": the AI budget (AI_DEADLINE_SECONDS) ran out, or the model failed, after tokens were sent
+    - "done": full AI summary, the parsed [METRICS: ...] block and any error
+    ai_mode and no_cache work as in /summarize and share its cache: a cached result is replayed
+    as one "token" event, and map_reduce documents (no token stream) send the final summary that way.
+    """
+    if not request.text:
+        raise HTTPException(status_code=400, detail="Input text cannot be empty.")
+
+    num_sentences = request.num_sentences or 5
+    ai_mode = resolve_ai_mode(request.ai_mode)
+    user_id = get_user_id_from_authorization(authorization)
+    cache_key = await summary_cache_key_async(request.text, num_sentences, ai_mode)
+    cached_output = None if request.no_cache else await summary_cache.get(cache_key)
+
+    async def events():
+        if cached_output is not None:
+            basic_summary_text, basic_metrics = cached_output["basic_summary"], cached_output["basic_metrics"]
+        else:
+            basic_result = await executors["cpu"].run(summarize_basic, request.text, num_sentences)
+            basic_summary_text, basic_metrics = unpack_basic_result(basic_result)
+        yield sse_event("basic", {"basic_summary": basic_summary_text, "basic_metrics": basic_metrics})
+
+        if cached_output is not None:
+            ai_summary, ai_input, error = cached_output["ai_summary"], cached_output.get("ai_input"), None
+            yield sse_event("token", {"text": ai_summary})
+        elif ai_mode == "map_reduce" and input_compressor.estimate_tokens(request.text) > AI_INPUT_TOKEN_BUDGET:
+            # map-reduce สรุปทีละส่วนแล้วรวม ไม่มี token ให้ stream จึงส่งสรุปสุดท้ายเป็น chunk เดียว
+            ai_summary, ai_input = await summarize_document_with_ai(request.text, num_sentences, mode=ai_mode)
+            error = None if ai_status_of(ai_summary) == "ok" else ai_summary
+            if error is None:
+                yield sse_event("token", {"text": ai_summary})
+        else:
+            compressed_text, compression = await compress_for_ai(request.text)
+            ai_input = {"mode": "compress", **compression}
+            prompt = build_summary_prompt(compressed_text, num_sentences)
+            parts = []
+            all_errors = []
+            deadline = time.monotonic() + AI_DEADLINE_SECONDS
+            timed_out = False
+            interrupted = False  # stream broke after some tokens were already sent
+            for model_name in model_router.order("summary", len(compressed_text)):
+                remaining = deadline - time.monotonic()
+                # Fallbacks share the request's AI budget
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                started = time.monotonic()
+                stream = llm_scheduler.stream(
+                    model_name, prompt, task="summary", max_wait=min(llm_scheduler.max_wait, remaining)
+                )
+                try:
+                    while True:
+                        # ทุก chunk ต้องมาถึงภายในงบเวลาที่เหลือ ไม่ใช่แค่ตอนเริ่ม stream
+                        try:
+                            chunk = await asyncio.wait_for(anext(stream), max(0.0, deadline - time.monotonic()))
+                        except StopAsyncIteration:
+                            break
+                        parts.append(chunk)
+                        yield sse_event("token", {"text": chunk})
+                    model_router.record("summary", model_name, time.monotonic() - started, success=bool(parts))
+                    if parts:
+                        print(f"DEBUG: Stream success with {model_name}")
+                        break
+                    all_errors.append(f"{model_name}: Response blocked by Safety Filters or Empty.")
+                except asyncio.TimeoutError:
+                    model_router.record("summary", model_name, time.monotonic() - started, success=False)
+                    print(f"DEBUG: Stream from {model_name} exceeded the AI deadline")
+                    all_errors.append(f"{model_name}: Deadline exceeded while streaming")
+                    timed_out = True
+                    break
+                except Exception as e:
+                    if not isinstance(e, (ModelUnavailable, RateLimited)):
+                        model_router.record("summary", model_name, time.monotonic() - started, success=False)
+                    print(f"DEBUG: Stream failed with {model_name}: {e}")
+                    all_errors.append(f"{model_name}: {str(e)}")
+                    # Tokens already sent cannot be taken back, so only fall back before the first one
+                    if parts:
+                        interrupted = True
+                        break
+                finally:
+                    await stream.aclose()
+
+            if timed_out and parts:
+                # ข้อความที่ส่งไปแล้วไม่ครบ: แจ้งให้ client ทราบก่อน "done"
+                yield sse_event("error", {"error": "; ".join(all_errors), "ai_status": "timeout"})
+                ai_summary = f"{AI_TIMEOUT_PREFIX} ({AI_DEADLINE_SECONDS:.0f}s). Details: {'; '.join(all_errors)}"
+            elif interrupted:
+                yield sse_event("error", {"error": "; ".join(all_errors), "ai_status": "error"})
+                ai_summary = f"AI Service Error: Stream interrupted. Details: {'; '.join(all_errors)}"
+            elif parts:
+                ai_summary = "".join(parts).strip()
+            elif timed_out:
+                ai_summary = f"{AI_TIMEOUT_PREFIX} ({AI_DEADLINE_SECONDS:.0f}s). Details: {'; '.join(all_errors)}"
+            else:
+                ai_summary = f"AI Service Error: All models failed. Details: {'; '.join(all_errors)}"
+            error = None if parts and not (timed_out or interrupted) else "; ".join(all_errors)
+
+        ai_summary_text, ai_metrics = parse_ai_metrics(ai_summary)
+        engine_output = {
+            "basic_summary": basic_summary_text,
+            "basic_metrics": basic_metrics,
+            "ai_summary": ai_summary,
+            "ai_input": ai_input,
+        }
+        # สรุปที่ไม่สมบูรณ์ (หมดเวลา / stream ขาดกลางทาง) ไม่เก็บลง cache
+        if cached_output is None and error is None:
+            await cache_engine_output(cache_key, engine_output)
+
+        result = {
+            "original_text": request.text,
+            **engine_output,
+            "ai_status": ai_status_of(ai_summary),
+            "comparison_mode": True,
+            "cached": cached_output is not None
+        }
+        yield sse_event("done", {
+            "ai_summary": ai_summary,
+            "ai_status": result["ai_status"],
+            "ai_input": ai_input,
+            "ai_summary_text": ai_summary_text,
+            "ai_metrics": ai_metrics,
+            "error": error,
+            "cached": result["cached"],
+        })
+
+        if user_id:
             try:
-                extracted_text = await perform_ocr_with_gemini(file_bytes, file.content_type)
+                await history_collection.insert_one({
+                    "user_id": user_id,
+                    "title": request.text[:50] + "..." if len(request.text) > 50 else request.text,
+                    "original_text": request.text,
+                    "summary_result": result,
+                    "created_at": datetime.now(timezone.utc),
+                    "is_favorite": False
+                })
             except Exception as e:
-                print(f"DEBUG: OCR Fallback failed: {e}")
-                raise HTTPException(status_code=400, detail=f"ไม่สามารถอ่านไฟล์ได้ (Scanned PDF) และ AI OCR ล้มเหลว: {str(e)}")
+                print(f"DEBUG: Failed to save history: {e}")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _no_progress(stage: str, **details):
+    pass
+
+def resolve_page_range(page_from: int | None, page_to: int | None) -> tuple[int, int | None] | None:
+    """Validate the optional 1-based, inclusive page range of a file request"""
+    if page_from is None and page_to is None:
+        return None
+    first = page_from or 1
+    if first < 1 or (page_to is not None and page_to < first):
+        raise HTTPException(status_code=400, detail="ช่วงหน้าไม่ถูกต้อง (page_from ต้องไม่น้อยกว่า 1 และไม่มากกว่า page_to)")
+    return first, page_to
+
+def resolve_max_chars(max_chars: int | None) -> int | None:
+    if max_chars is not None and max_chars <= 0:
+        raise HTTPException(status_code=400, detail="max_chars ต้องมากกว่า 0")
+    return max_chars
+
+async def extract_uploaded_text(
+    file: UploadFile,
+    content: bytes | None,
+    report=_no_progress,
+    page_range: tuple[int, int | None] | None = None,
+    max_chars: int | None = None,
+    user_id: str | None = None,
+) -> tuple[str, dict, int, DocumentSession | None]:
+    """
+    Local extraction, with per-page OCR of scanned pages and whole-file AI OCR as the fallback.
+
+    Returns:
+        tuple: (extracted text, extraction metadata, pages OCR'd in this call, document session or None)
+    """
+    ocr_pages_done = 0
+
+    async def ocr_page(image: bytes, page_number: int, pages_to_ocr: int) -> str:
+        # หน้าสแกนใน PDF ผสม: OCR ทีละหน้า (ขนานกัน) แล้ว FileProcessor รวมกลับตามลำดับหน้า
+        nonlocal ocr_pages_done
+        text = await ocr_pdf_page(image, page_number)
+        ocr_pages_done += 1
+        await report("ocr", page=ocr_pages_done, pages=pages_to_ocr, pdf_page=page_number)
+        return text
+
+    extraction = {}
+    if FILE_PROCESSOR_MODE == "full":
+        extracted_text = await file_processor.extract_text_from_file(
+            file,
+            ocr_page=ocr_page if llm_client.is_available() else None,
+            page_range=page_range,
+            max_chars=max_chars,
+            info=extraction,
+            content=content,
+        )
+    else:
+        extracted_text = await file_processor.extract_text_from_file(file)
+    session = None
+    
+    # --- AI OCR Fallback (Hybrid Mode) ---
+    if not extracted_text:
+        print("DEBUG: Local text extraction returned empty. Attempting AI OCR...")
         
-        if not extracted_text:
-            raise HTTPException(status_code=400, detail="ไม่พบเนื้อหาในไฟล์ (Blank File)")
+        # Check if file is suitable for OCR (PDF or Image)
+        # file_processor guarantees PDF or Image types generally, but let's double check content type handled by Gemini
+        # Supported: application/pdf, image/jpeg, image/png, etc.
         
+        # Same bytes the extractor read: no second read of the upload
+        if content is None:
+            content = await read_upload(file, file_processor.MAX_FILE_SIZE)
+        file_bytes = content
+        mime_type = file.content_type
+        
+        await report("ocr", page=1, pages=1)
+        try:
+            pages_total = extraction.get("pages_total")
+            if pages_total and (extraction["first_page"], extraction["last_page"]) != (1, pages_total):
+                # OCR ทั้งไฟล์ต้องเคารพช่วงหน้าที่เลือก (และที่ extraction รายงาน): ส่งเฉพาะหน้าเหล่านั้น
+                file_bytes = await executors["extraction"].run(
+                    file_processor.slice_pdf, file_bytes, extraction["first_page"], extraction["last_page"]
+                )
+            if FILE_PROCESSOR_MODE == "full" and file_processor.is_image(file):
+                # ย่อ/แปลงเป็นขาวดำก่อนอัปโหลด (ภาพจากมือถือเล็กลงหลายเท่า)
+                original_size = len(file_bytes)
+                file_bytes, mime_type = await file_processor.preprocess_for_ocr(file_bytes)
+                print(f"DEBUG: Image preprocessed for OCR: {original_size} -> {len(file_bytes)} bytes ({mime_type})")
+            # Upload once: the OCR fallbacks and the AI summary all reference this session
+            session = await document_sessions.open(file_bytes, mime_type, display_name=file.filename, owner_id=user_id)
+            extracted_text = await perform_ocr_with_gemini(file_bytes, mime_type, session=session)
+            extraction["ocr"] = "document"
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"DEBUG: OCR Fallback failed: {e}")
+            raise HTTPException(status_code=400, detail=f"ไม่สามารถอ่านไฟล์ได้ (Scanned PDF) และ AI OCR ล้มเหลว: {str(e)}")
+    
+    if ocr_pages_done:
+        extraction["ocr"] = "pages"
+    extraction["ocr_pages"] = ocr_pages_done
+    extraction["extractor_version"] = getattr(file_processor, "EXTRACTOR_VERSION", "simple")
+    return extracted_text, extraction, ocr_pages_done, session
+
+async def process_uploaded_file(
+    file: UploadFile,
+    num_sentences: int,
+    report=_no_progress,
+    use_cache: bool = True,
+    ai_mode: str = AI_LONG_DOC_MODE,
+    page_range: tuple[int, int | None] | None = None,
+    max_chars: int | None = None,
+    content: bytes | None = None,
+    user_id: str | None = None,
+) -> tuple[dict, str]:
+    """
+    File pipeline shared by /summarize-file and the job queue:
+    validate -> extract -> (AI OCR fallback) -> clean -> Basic + AI engines.
+    `report(stage, **details)` receives stage-level progress.
+    `page_range` / `max_chars` bound how much of a PDF is read (see FileProcessor.extract_text_from_file).
+    The upload is read once (`content`, when the caller already has the bytes) and shared by extraction and OCR.
+
+    Returns:
+        tuple: (result dict, extracted text)
+    """
+    # Validate file
+    file_processor.validate_file(file)
+    
+    # Extract text
+    await report("extracting")
+    extraction_key, cached_extraction = None, None
+    if FILE_PROCESSOR_MODE == "full":
+        if content is None:
+            content = await read_upload(file, file_processor.MAX_FILE_SIZE)
+        extraction_key = await executors["cpu"].run(extraction_cache_key, content, page_range, max_chars)
+        if use_cache:
+            cached_extraction = await extraction_cache.get(extraction_key)
+
+    if cached_extraction is not None:
+        # ไฟล์เดิม (bytes เดียวกัน) เคยถูกดึงข้อความแล้ว: ข้าม pdfplumber / OCR ไปสรุปเลย
+        extracted_text = cached_extraction["text"]
+        extraction = {**cached_extraction["extraction"], "cached": True}
+        ocr_pages_done, session = 0, None
+    else:
+        extracted_text, extraction, ocr_pages_done, session = await extract_uploaded_text(
+            file, content, report, page_range, max_chars, user_id
+        )
+        # ผลที่ยังขาดหน้าสแกน (ไม่มี AI หรือ OCR บางหน้าล้มเหลว) ไม่เก็บ เพื่อให้ครั้งหน้าลองใหม่
+        if extraction_key and extracted_text and not extraction.get("ocr_incomplete"):
+            await extraction_cache.set(extraction_key, {"text": extracted_text, "extraction": extraction})
+        extraction["cached"] = False
+    
+    if not extracted_text:
+        raise HTTPException(status_code=400, detail="ไม่พบเนื้อหาในไฟล์ (Blank File)")
+    
+    cache_key = await summary_cache_key_async(extracted_text, num_sentences, ai_mode)
+    engine_output = await summary_cache.get(cache_key) if use_cache else None
+    cached = engine_output is not None
+
+    if not cached:
         # Process and summarize text
-        processed_text = await run_in_threadpool(text_processor.clean_text, extracted_text)
+        await report("cleaning", characters=len(extracted_text))
+        processed_text = await executors["cpu"].run(text_processor.clean_text, extracted_text)
         
         # Parallel Execution
-        basic_task = run_in_threadpool(summarization_model.summarize, processed_text, num_sentences=num_sentences)
-        ai_task = run_in_threadpool(summarize_with_ai, extracted_text, num_sentences=num_sentences)
+        basic_task = asyncio.ensure_future(executors["cpu"].run(summarization_model.summarize, processed_text, num_sentences=num_sentences))
+        ai_task = asyncio.ensure_future(summarize_document_with_ai(extracted_text, num_sentences=num_sentences, mode=ai_mode, session=session))
         
-        basic_result, ai_summary = await asyncio.gather(basic_task, ai_task)
+        await report("ranking")
+        basic_result = await basic_task
+        if not ai_task.done():
+            await report("ai")
+        ai_summary, ai_input = await ai_task
 
         # Handle Dictionary Return from Basic Engine
-        if isinstance(basic_result, dict):
-            basic_summary_text = basic_result.get("summary", "")
-            basic_metrics = basic_result.get("metrics", None)
-        else:
-            basic_summary_text = str(basic_result)
-            basic_metrics = None
-        
-        result = {
-            "filename": file.filename,
-            "file_type": file.content_type,
-            "extracted_text_length": len(extracted_text),
+        basic_summary_text, basic_metrics = unpack_basic_result(basic_result)
+        engine_output = {
             "basic_summary": basic_summary_text,
             "basic_metrics": basic_metrics,
             "ai_summary": ai_summary,
-            "comparison_mode": True
+            "ai_input": ai_input,
         }
+        await cache_engine_output(cache_key, engine_output)
+    
+    result = {
+        "filename": file.filename,
+        "file_type": file.content_type,
+        "extracted_text_length": len(extracted_text),
+        "extraction": extraction,
+        **engine_output,
+        "document_session": session.session_id if session else None,
+        "ocr_pages": ocr_pages_done,
+        "ai_status": ai_status_of(engine_output.get("ai_summary")),
+        "comparison_mode": True,
+        "cached": cached
+    }
+    return result, extracted_text
+
+async def save_file_history(user_id: str, filename: str, extracted_text: str, result: dict):
+    try:
+        history_item = {
+            "user_id": user_id,
+            "title": (filename + ": " + extracted_text[:30] + "...") if len(extracted_text) > 30 else filename,
+            "original_text": extracted_text,
+            "summary_result": result,
+            "created_at": datetime.now(timezone.utc),
+            "is_favorite": False
+        }
+        await history_collection.insert_one(history_item)
+        print(f"DEBUG: File History saved for user {user_id}")
+    except Exception as e:
+        print(f"DEBUG: Failed to save file history: {e}")
+
+@app.post("/summarize-file")
+async def summarize_file(
+    file: UploadFile = File(...),
+    num_sentences: int = Form(5),
+    no_cache: bool = Form(False),
+    ai_mode: str | None = Form(None),
+    page_from: int | None = Form(None),
+    page_to: int | None = Form(None),
+    max_chars: int | None = Form(None),
+    authorization: str | None = Header(default=None)
+):
+    try:
+        user_id = get_user_id_from_authorization(authorization)
+        result, extracted_text = await process_uploaded_file(
+            file, num_sentences, use_cache=not no_cache, ai_mode=resolve_ai_mode(ai_mode),
+            page_range=resolve_page_range(page_from, page_to), max_chars=resolve_max_chars(max_chars),
+            user_id=user_id,
+        )
 
         # Auto-save history if user is logged in --> บันทึกประวัติอัตโนมัติถ้าผู้ใช้เข้าสู่ระบบแล้ว
-        if authorization:
-            try:
-                # Remove 'Bearer ' prefix if present --> ลบคำนำหน้า 'Bearer ' ถ้ามี
-                token = authorization.split(" ")[1] if " " in authorization else authorization
-                decoded = decode_jwt(token)
-                if decoded:
-                    user_id = decoded["user_id"]
-                    
-                    history_item = {
-                        "user_id": user_id,
-                        "title": (file.filename + ": " + extracted_text[:30] + "...") if len(extracted_text) > 30 else file.filename,
-                        "original_text": extracted_text,
-                        "summary_result": result,
-                        "created_at": datetime.utcnow(),
-                        "is_favorite": False
-                    }
-                    await history_collection.insert_one(history_item)
-                    print(f"DEBUG: File History saved for user {user_id}")
-            except Exception as e:
-                print(f"DEBUG: Failed to save file history: {e}")
+        if user_id:
+            await save_file_history(user_id, file.filename, extracted_text, result)
 
         return result
         
@@ -637,54 +1406,297 @@ async def summarize_file(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"เกิดข้อผิดพลาดในการประมวลผลไฟล์: {str(e)}")
 
-async def perform_ocr_with_gemini(file_bytes: bytes, mime_type: str) -> str:
-    """Fallback OCR using Gemini with multiple model fallbacks and retry logic"""
-    if not HAS_GENAI or not GOOGLE_API_KEY:
-        raise Exception("AI System (Gemini) is explicitly required for scanned documents (OCR).")
+# --- Asynchronous file jobs ---
+
+def make_upload_file(content: bytes, filename: str, content_type: str | None) -> UploadFile:
+    """UploadFile for bytes received outside a multipart request (queued jobs, resumable uploads)"""
+    return UploadFile(
+        file=io.BytesIO(content),
+        filename=filename,
+        headers=Headers({"content-type": content_type or ""}),
+    )
+
+async def run_file_job(job_id: str, payload: dict, report) -> dict:
+    upload = make_upload_file(payload["content"], payload["filename"], payload["content_type"])
+    result, extracted_text = await process_uploaded_file(
+        upload, payload["num_sentences"], report=report, use_cache=not payload["no_cache"], ai_mode=payload["ai_mode"],
+        page_range=payload.get("page_range"), max_chars=payload.get("max_chars"), content=payload["content"],
+        user_id=payload["user_id"],
+    )
+    if payload["user_id"]:
+        await report("saving")
+        await save_file_history(payload["user_id"], payload["filename"], extracted_text, result)
+    return result
+
+job_queue = JobQueue(
+    job_collection,
+    run_file_job,
+    workers=config("JOB_WORKERS", default=2, cast=int),
+    max_queued=config("JOB_MAX_QUEUED", default=100, cast=int),
+    lease_seconds=config("JOB_LEASE_SECONDS", default=60, cast=float),
+)
 
-    genai.configure(api_key=GOOGLE_API_KEY)
-    
-    # Priority list of models to try for OCR
-    ocr_models = [
-        "gemini-2.0-flash",
-        "gemini-2.0-flash-lite-preview-02-05", # Try the lite version
-        "gemini-2.0-flash-exp",
-        "gemini-flash-latest" # Fallback to latest stable flash alias
-    ]
-    
+@app.on_event("startup")
+async def start_job_queue():
+    try:
+        await job_queue.start()
+    except Exception as e:
+        print(f"DEBUG: Job queue startup error: {e}")
+        STARTUP_ERRORS.append(f"Job Queue Startup Error: {e}")
+
+@app.on_event("shutdown")
+async def stop_file_processor():
+    await job_queue.stop()
+    if FILE_PROCESSOR_MODE == "full":
+        file_processor.shutdown()
+    for executor in executors.values():
+        executor.shutdown()
+
+async def get_job_for_request(job_id: str, authorization: str | None) -> dict:
+    job = await job_queue.get(job_id)
+    # Jobs created by a logged-in user are only visible to that user
+    if not job or (job.get("user_id") and job["user_id"] != get_user_id_from_authorization(authorization)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def job_status(job: dict) -> dict:
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job.get("progress", {}),
+        "error": job.get("error"),
+        "filename": job.get("meta", {}).get("filename"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+@app.post("/jobs/summarize-file", status_code=202)
+async def submit_file_job(
+    file: UploadFile = File(...),
+    num_sentences: int = Form(5),
+    no_cache: bool = Form(False),
+    ai_mode: str | None = Form(None),
+    page_from: int | None = Form(None),
+    page_to: int | None = Form(None),
+    max_chars: int | None = Form(None),
+    authorization: str | None = Header(default=None)
+):
+    """Accept an upload and summarize it in the background. Poll /jobs/{job_id} for progress."""
+    file_processor.validate_file(file)
+    ai_mode = resolve_ai_mode(ai_mode)
+    page_range = resolve_page_range(page_from, page_to)
+    max_chars = resolve_max_chars(max_chars)
+    content = await read_upload(file, file_processor.MAX_FILE_SIZE)
+
+    job_id = await enqueue_file_job(
+        content, file.filename, file.content_type, num_sentences, no_cache, ai_mode, page_range, max_chars,
+        get_user_id_from_authorization(authorization),
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+async def enqueue_file_job(
+    content: bytes, filename: str, content_type: str | None, num_sentences: int, no_cache: bool,
+    ai_mode: str, page_range: tuple[int, int | None] | None, max_chars: int | None, user_id: str | None,
+) -> str:
+    payload = {
+        "content": content,
+        "filename": filename,
+        "content_type": content_type,
+        "num_sentences": num_sentences,
+        "no_cache": no_cache,
+        "ai_mode": ai_mode,
+        "page_range": page_range,
+        "max_chars": max_chars,
+        "user_id": user_id,
+    }
+    try:
+        return await job_queue.submit(payload, user_id=user_id, meta={"filename": filename})
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full, please retry later.")
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, authorization: str | None = Header(default=None)):
+    return job_status(await get_job_for_request(job_id, authorization))
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, authorization: str | None = Header(default=None)):
+    job = await get_job_for_request(job_id, authorization)
+    if job["status"] == "error":
+        raise HTTPException(status_code=400, detail=job.get("error") or "Job failed")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is not finished (status: {job['status']})")
+    return job["result"]
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, authorization: str | None = Header(default=None)):
+    """Server-sent events with the job status every time it changes, until the job finishes"""
+    await get_job_for_request(job_id, authorization)
+
+    async def events():
+        last_update = None
+        while True:
+            job = await job_queue.get(job_id)
+            if not job:
+                yield sse_event("error", {"detail": "Job not found"})
+                return
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield sse_event("progress", job_status(job))
+            if job["status"] in FINISHED_STATES:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, authorization: str | None = Header(default=None)):
+    await get_job_for_request(job_id, authorization)
+    if not await job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return {"status": "success", "message": "Job cancelled"}
+
+# --- Resumable uploads (tus-style) ---
+# POST /uploads -> PATCH (or PUT) /uploads/{id} with Upload-Offset, repeated; HEAD /uploads/{id} after a
+# dropped connection to get the offset to resume from -> POST /uploads/{id}/summarize
+
+resumable_uploads = ResumableUploadStore(
+    config("RESUMABLE_UPLOAD_DIR", default=os.path.join(tempfile.gettempdir(), "artificer_uploads")),
+    max_size=config("RESUMABLE_UPLOAD_MAX_BYTES", default=50 * 1024 * 1024, cast=int),
+    max_chunk_size=config("RESUMABLE_CHUNK_MAX_BYTES", default=8 * 1024 * 1024, cast=int),
+    ttl_seconds=config("RESUMABLE_UPLOAD_TTL_SECONDS", default=24 * 3600, cast=int),
+    executor=executors["io"],
+)
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    length: int
+    content_type: str | None = None
+
+class UploadSummarizeRequest(BaseModel):
+    num_sentences: int = 5
+    no_cache: bool = False
+    ai_mode: str | None = None
+    page_from: int | None = None
+    page_to: int | None = None
+    max_chars: int | None = None
+    background: bool = False  # True = ส่งเข้าคิวงาน (คืนค่า job_id) แทนการรอผล
+
+def upload_status(meta: dict) -> dict:
+    return {
+        "upload_id": meta["upload_id"],
+        "filename": meta["filename"],
+        "offset": meta["offset"],
+        "length": meta["length"],
+        "complete": meta["offset"] == meta["length"],
+    }
+
+def upload_headers(meta: dict) -> dict:
+    return {"Upload-Offset": str(meta["offset"]), "Upload-Length": str(meta["length"]), "Cache-Control": "no-store"}
+
+async def get_upload_for_request(upload_id: str, authorization: str | None) -> dict:
+    meta = await resumable_uploads.get(upload_id)
+    # Uploads created by a logged-in user are only visible to that user
+    if not meta or (meta.get("user_id") and meta["user_id"] != get_user_id_from_authorization(authorization)):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return meta
+
+@app.post("/uploads", status_code=201)
+async def create_upload(request: UploadCreateRequest, response: Response, authorization: str | None = Header(default=None)):
+    file_processor.validate_file(make_upload_file(b"", request.filename, request.content_type))
+    meta = await resumable_uploads.create(
+        request.length, request.filename, request.content_type, get_user_id_from_authorization(authorization)
+    )
+    response.headers.update({**upload_headers(meta), "Location": f"/uploads/{meta['upload_id']}"})
+    return upload_status(meta)
+
+@app.head("/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str, authorization: str | None = Header(default=None)):
+    meta = await get_upload_for_request(upload_id, authorization)
+    return Response(status_code=200, headers=upload_headers(meta))
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, authorization: str | None = Header(default=None)):
+    return upload_status(await get_upload_for_request(upload_id, authorization))
+
+@app.api_route("/uploads/{upload_id}", methods=["PATCH", "PUT"])
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    authorization: str | None = Header(default=None),
+):
+    """Append the raw request body at Upload-Offset; the body is streamed to disk as it arrives"""
+    await get_upload_for_request(upload_id, authorization)
+    meta = await resumable_uploads.append(upload_id, upload_offset, request.stream())
+    return Response(status_code=204, headers=upload_headers(meta))
+
+@app.delete("/uploads/{upload_id}")
+async def delete_upload(upload_id: str, authorization: str | None = Header(default=None)):
+    await get_upload_for_request(upload_id, authorization)
+    await resumable_uploads.delete(upload_id)
+    return {"status": "success", "message": "Upload deleted"}
+
+@app.post("/uploads/{upload_id}/summarize")
+async def summarize_upload(
+    upload_id: str,
+    request: UploadSummarizeRequest = Body(default=UploadSummarizeRequest()),
+    authorization: str | None = Header(default=None),
+):
+    """Finalize a complete upload and run it through the /summarize-file pipeline (or the job queue)"""
+    await get_upload_for_request(upload_id, authorization)
+    ai_mode = resolve_ai_mode(request.ai_mode)
+    page_range = resolve_page_range(request.page_from, request.page_to)
+    max_chars = resolve_max_chars(request.max_chars)
+    meta, content = await resumable_uploads.read_complete(upload_id)
+    user_id = get_user_id_from_authorization(authorization)
+
+    if request.background:
+        job_id = await enqueue_file_job(
+            content, meta["filename"], meta["content_type"], request.num_sentences, request.no_cache,
+            ai_mode, page_range, max_chars, user_id,
+        )
+        await resumable_uploads.delete(upload_id)
+        return {"job_id": job_id, "status": "queued"}
+
+    try:
+        result, extracted_text = await process_uploaded_file(
+            make_upload_file(b"", meta["filename"], meta["content_type"]), request.num_sentences,
+            use_cache=not request.no_cache, ai_mode=ai_mode, page_range=page_range, max_chars=max_chars, content=content,
+            user_id=user_id,
+        )
+        if user_id:
+            await save_file_history(user_id, meta["filename"], extracted_text, result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"เกิดข้อผิดพลาดในการประมวลผลไฟล์: {str(e)}")
+
+    # เก็บไฟล์ไว้ถ้าสรุปไม่สำเร็จ เพื่อให้ลองใหม่ได้โดยไม่ต้องอัปโหลดซ้ำ
+    await resumable_uploads.delete(upload_id)
+    return result
+
+OCR_PROMPT = "Transcribe the text from this image/document exactly as it appears. Output ONLY the text content. Do not add any markdown formatting or comments."
+
+# OCR results of single PDF pages, keyed by the hash of the rendered page image
+ocr_page_cache = TieredCache("ocr_page", collection=cache_collection, max_entries=config("CACHE_LRU_SIZE", default=512, cast=int))
+
+async def transcribe_with_fallback(part: dict) -> str:
+    """Run the OCR prompt on one content part (inline image or document reference), trying models in router order"""
     last_error = None
-    
-    print("DEBUG: Triggering AI OCR with fallback strategy...")
-    
-    prompt = "Transcribe the text from this image/document exactly as it appears. Output ONLY the text content. Do not add any markdown formatting or comments."
-    
-    for model_name in ocr_models:
+    # Models with an open circuit or an empty token bucket are skipped instead of sleeping on the event loop
+    for model_name in model_router.order("ocr"):
         try:
             print(f"DEBUG: Attempting AI OCR with model: {model_name}")
-            model = genai.GenerativeModel(model_name)
+            response_text = await routed_generate("ocr", model_name, [part, OCR_PROMPT])
             
-            # Simple retry for 429 within the model attempt
-            for attempt in range(2):
-                try:
-                    response = await run_in_threadpool(
-                        model.generate_content,
-                        contents=[
-                            {'mime_type': mime_type, 'data': file_bytes},
-                            prompt
-                        ]
-                    )
-                    
-                    if response and response.text:
-                        print(f"DEBUG: AI OCR Success with {model_name}")
-                        return response.text.strip()
-                except Exception as e:
-                    if "429" in str(e):
-                        print(f"DEBUG: 429 Quota Exceeded for {model_name}. Retrying...")
-                        import time
-                        time.sleep(2) # Short wait before internal retry
-                        continue
-                    else:
-                        raise e # Re-raise other errors to break internal loop and try next model
+            if response_text:
+                print(f"DEBUG: AI OCR Success with {model_name}")
+                return response_text.strip()
             
         except Exception as e:
             print(f"DEBUG: Failed with {model_name}: {e}")
@@ -696,6 +1708,32 @@ async def perform_ocr_with_gemini(file_bytes: bytes, mime_type: str) -> str:
     print(f"DEBUG: {error_msg}")
     raise Exception(error_msg)
 
+async def perform_ocr_with_gemini(file_bytes: bytes, mime_type: str, session: DocumentSession | None = None) -> str:
+    """Fallback OCR using Gemini with multiple model fallbacks and retry logic"""
+    if not llm_client.is_available():
+        raise Exception("AI System (Gemini) is explicitly required for scanned documents (OCR).")
+
+    if session is None:
+        session = await document_sessions.open(file_bytes, mime_type)
+    if session.text is not None:
+        return session.text
+
+    print("DEBUG: Triggering AI OCR with fallback strategy...")
+    # The session part is a file reference, so fallbacks do not resend the bytes
+    session.text = await transcribe_with_fallback(session.part)
+    return session.text
+
+async def ocr_pdf_page(image: bytes, page_number: int) -> str:
+    """OCR of one rasterized PDF page (grayscale JPEG), cached by page image hash"""
+    cache_key = make_cache_key(image, OCR_PROMPT)
+    cached = await ocr_page_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    print(f"DEBUG: OCR page {page_number} ({len(image)} bytes)")
+    text = await transcribe_with_fallback({'mime_type': 'image/jpeg', 'data': image})
+    await ocr_page_cache.set(cache_key, text)
+    return text
+
 @app.get("/debug-routes")
 def debug_routes():
     return {"routes": [{"path": route.path, "name": route.name} for route in app.routes]}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from ..database.mongo import user_collection
 from ..auth.auth_bearer import JWTBearer
 from ..auth.auth_handler import decode_jwt, get_password_hash
@@ -75,3 +75,13 @@ async def get_system_stats():
         "active_sessions": 1, # Mock
         "total_summaries": user_count * 5 # Estimate
     }
+
+@router.get("/model-routing", dependencies=[Depends(verify_admin)])
+async def get_model_routing(request: Request, text_length: int | None = None):
+    """Current model order per task with the EWMA statistics behind it (text_length: rank as for a document of that size)"""
+    model_router = request.app.state.model_router
+    return {
+        "text_length": text_length,
+        "short_text_chars": model_router.short_text_chars,
+        "tasks": model_router.table(text_length),
+    }
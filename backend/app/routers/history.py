@@ -1,13 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+import base64
+import binascii
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
 from ..database.mongo import db, history_collection
 from ..models.history import HistorySchema, HistoryResponseSchema
 from ..auth.auth_handler import decode_jwt
 from ..auth.auth_bearer import JWTBearer
 from typing import List
 from bson import ObjectId
+from bson.errors import InvalidId
 
 router = APIRouter()
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+# รายการใน sidebar ใช้แค่ฟิลด์เหล่านี้ (ไม่ดึง original_text / summary_result ที่ใหญ่)
+HISTORY_LIST_PROJECTION = {"title": 1, "created_at": 1, "is_favorite": 1}
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque cursor: position (created_at, _id) of the last item of a page"""
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, _, item_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), ObjectId(item_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 # Helper to verify user and get ID
 async def get_current_user_id(token: str = Depends(JWTBearer())):
     decoded = decode_jwt(token)
@@ -16,19 +40,43 @@ async def get_current_user_id(token: str = Depends(JWTBearer())):
     return decoded["user_id"]
 
 @router.get("/", response_model=List[HistoryResponseSchema])
-async def get_history(user_id: str = Depends(get_current_user_id)):
-    """Fetch all history items for the current user (Lightweight)"""
-    cursor = history_collection.find({"user_id": user_id}).sort("created_at", -1)
-    
-    results = []
-    async for doc in cursor:
-        results.append({
+async def get_history(
+    response: Response,
+    limit: int = Query(default=HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = Query(default=None),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Fetch one page of the current user's history, newest first (Lightweight).
+    Keyset pagination on (created_at, _id): when more items exist, the X-Next-Cursor response header
+    holds the value to pass as `cursor` for the next page. Served by the (user_id, created_at, _id) index.
+    """
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+    # ดึงเกินมา 1 รายการเพื่อรู้ว่ายังมีหน้าถัดไปหรือไม่
+    docs = await history_collection.find(query, HISTORY_LIST_PROJECTION) \
+        .sort([("created_at", -1), ("_id", -1)]) \
+        .limit(limit + 1) \
+        .to_list(limit + 1)
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1])
+
+    return [
+        {
             "id": str(doc["_id"]),
             "title": doc["title"],
             "created_at": doc["created_at"],
             "is_favorite": doc.get("is_favorite", False)
-        })
-    return results
+        }
+        for doc in docs
+    ]
 
 @router.get("/{item_id}")
 async def get_history_detail(item_id: str, user_id: str = Depends(get_current_user_id)):
@@ -0,0 +1,66 @@
+from .summarization_model import SummarizationModel
+from .text_processor import TextProcessor
+
+
+class InputCompressor:
+    """
+    ย่อข้อความก่อนส่งให้ Gemini ให้อยู่ในงบ token ที่กำหนด
+    (clean_text -> TextRank -> เลือกประโยคที่เป็นใจความกลางที่สุด เรียงตามลำดับเดิมในบทความ)
+    """
+
+    def __init__(self, chars_per_token: float = 3.0):
+        # ไม่มี tokenizer ของ Gemini ในเครื่อง จึงประมาณจากจำนวนตัวอักษร
+        self.chars_per_token = chars_per_token
+        self.processor = TextProcessor()
+        self.model = SummarizationModel()
+
+    def estimate_tokens(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1 if text else 0
+
+    def compress(self, text: str, token_budget: int) -> dict:
+        """
+        Returns:
+            dict: text (ข้อความที่จะส่ง), original_tokens, compressed_tokens, ratio (compressed/original),
+                  sentences_kept / sentences_total (None ถ้าไม่ต้องย่อ)
+        """
+        original_tokens = self.estimate_tokens(text)
+        if original_tokens <= token_budget:
+            # สั้นพออยู่แล้ว ส่งต้นฉบับตามเดิม
+            return self._result(text, original_tokens, original_tokens)
+
+        clean_text = self.processor.clean_text(text)
+        clean_tokens = self.estimate_tokens(clean_text)
+        sentences = self.processor.segment_sentences(clean_text)
+        if clean_tokens <= token_budget or not sentences:
+            # ข้อความที่แบ่งประโยคไม่ได้ ตัดตามงบแทน
+            budget_chars = int(token_budget * self.chars_per_token)
+            return self._result(clean_text[:budget_chars], original_tokens, None)
+
+        scores = self.model.textrank_scores(self.model.sentence_words(sentences, self.processor))
+        ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+
+        kept, used = [], 0
+        for i in ranked:
+            cost = self.estimate_tokens(sentences[i])
+            if used + cost > token_budget:
+                continue
+            kept.append(i)
+            used += cost
+
+        # เรียงตามลำดับเดิมเพื่อให้ LLM เห็นเนื้อเรื่องต่อเนื่อง
+        compressed = "\n".join(sentences[i] for i in sorted(kept))
+        result = self._result(compressed, original_tokens, None)
+        result["sentences_kept"] = len(kept)
+        result["sentences_total"] = len(sentences)
+        return result
+
+    def _result(self, text: str, original_tokens: int, compressed_tokens: int | None) -> dict:
+        compressed_tokens = self.estimate_tokens(text) if compressed_tokens is None else compressed_tokens
+        return {
+            "text": text,
+            "original_tokens": original_tokens,
+            "compressed_tokens": compressed_tokens,
+            "ratio": round(compressed_tokens / original_tokens, 3) if original_tokens else 1.0,
+            "sentences_kept": None,
+            "sentences_total": None,
+        }
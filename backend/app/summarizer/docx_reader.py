@@ -0,0 +1,87 @@
+import io
+import re
+import zipfile
+from typing import Iterator
+from xml.etree.ElementTree import iterparse
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+BODY = W + "body"
+PARAGRAPH = W + "p"
+TEXT = W + "t"
+TAB = W + "tab"
+BREAKS = (W + "br", W + "cr")
+
+DOCUMENT_PART = "word/document.xml"
+HEADER_PART = re.compile(r"^word/header(\d*)\.xml$")
+FOOTER_PART = re.compile(r"^word/footer(\d*)\.xml$")
+
+
+def _numbered_parts(names: list[str], pattern: re.Pattern) -> list[str]:
+    matches = [(m, name) for name in names if (m := pattern.match(name))]
+    return [name for m, name in sorted(matches, key=lambda item: int(item[0].group(1) or 0))]
+
+
+def iter_docx_paragraphs(content: bytes) -> Iterator[str]:
+    """
+    Yield the text of every paragraph of the document in the order docx2txt returns it:
+    headers (word/header*.xml), the body (word/document.xml, table cells included), then footers.
+    Each part is read incrementally (iterparse) straight from the zip member, and each top-level
+    block (paragraph / table) is dropped from the tree once emitted, so memory does not grow
+    with the document.
+
+    Raises:
+        zipfile.BadZipFile / KeyError: not a DOCX file / no word/document.xml
+    """
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        names = archive.namelist()
+        if DOCUMENT_PART not in names:
+            raise KeyError(DOCUMENT_PART)
+        parts = _numbered_parts(names, HEADER_PART) + [DOCUMENT_PART] + _numbered_parts(names, FOOTER_PART)
+        for part in parts:
+            with archive.open(part) as xml:
+                yield from _iter_part_paragraphs(xml)
+
+
+def _iter_part_paragraphs(xml) -> Iterator[str]:
+    """Paragraph texts of one WordprocessingML part (w:document, w:hdr or w:ftr)"""
+    # block ที่อ่านเสร็จแล้วถูกลบออกจาก container (w:body ของ document, ราก w:hdr / w:ftr)
+    container, container_depth = None, 0
+    depth = 0
+    # ย่อหน้าซ้อนกันได้ (text box ภายในย่อหน้า) จึงเก็บข้อความเป็น stack
+    paragraphs: list[list[str]] = []
+    # mc:Fallback เป็นสำเนาของเนื้อหาเดียวกันสำหรับโปรแกรมรุ่นเก่า
+    in_fallback = 0
+
+    for event, element in iterparse(xml, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            depth += 1
+            if depth == 1 or tag == BODY:
+                container, container_depth = element, depth
+            elif tag == PARAGRAPH:
+                paragraphs.append([])
+            elif tag == MC_FALLBACK:
+                in_fallback += 1
+            continue
+
+        depth -= 1
+        if tag == MC_FALLBACK:
+            in_fallback -= 1
+        elif paragraphs and not in_fallback:
+            if tag == TEXT and element.text:
+                paragraphs[-1].append(element.text)
+            elif tag == TAB:
+                paragraphs[-1].append("\t")
+            elif tag in BREAKS:
+                paragraphs[-1].append("\n")
+
+        if tag == PARAGRAPH:
+            text = "".join(paragraphs.pop()).strip()
+            if text:
+                yield text
+
+        # container > block: ปล่อย block ที่อ่านเสร็จแล้วทิ้ง
+        if container is not None and depth == container_depth:
+            container.clear()
@@ -1,8 +1,22 @@
+import asyncio
+import contextlib
 import io
+import multiprocessing
 import os
-from typing import Union
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Awaitable, Callable, Union
+from xml.etree.ElementTree import ParseError
 from fastapi import UploadFile, HTTPException
 
+from ..uploads.limits import read_upload
+from ..workers.executors import WorkloadExecutor, run_blocking
+from .docx_reader import iter_docx_paragraphs
+
+# ocr_page(image_bytes, page_number, pages_to_ocr) -> ข้อความของหน้านั้น
+PageOCR = Callable[[bytes, int, int], Awaitable[str]]
+
 # พยายามนำเข้า Dependencies ที่เป็นตัวเลือก
 
 try:
@@ -11,45 +25,109 @@ try:
 except ImportError:
     HAS_PDFPLUMBER = False
 
+# pypdfium2 มากับ pdfplumber (ใช้ตัดเฉพาะช่วงหน้าก่อนส่ง OCR ทั้งไฟล์)
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+
 
 
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
 try:
     import docx2txt
     HAS_DOCX2TXT = True
 except ImportError:
     HAS_DOCX2TXT = False
 
-try:
-    from docx import Document
-    HAS_PYTHON_DOCX = True
-except ImportError:
-    HAS_PYTHON_DOCX = False
+
+def extract_pdf_page_range(content: bytes, start: int, stop: int, max_chars: int | None = None) -> list[str]:
+    """
+    ข้อความของหน้า [start, stop) (หน้าที่ไม่มีข้อความได้สตริงว่าง)
+    max_chars: หยุดหลังหน้าที่ทำให้ได้ข้อความครบจำนวนนี้ (คืนรายการสั้นกว่าช่วงที่ขอ)
+    อยู่ระดับโมดูลเพื่อให้ส่งไปรันใน worker process ได้
+    """
+    texts, chars = [], 0
+    # เปิดเฉพาะหน้าที่ต้องการ (pdfplumber นับหน้าเริ่มที่ 1)
+    with pdfplumber.open(io.BytesIO(content), pages=list(range(start + 1, stop + 1))) as pdf:
+        for page in pdf.pages:
+            # extract_text มักจะรักษาเลย์เอาต์ได้ดีกว่าการดึงแบบดิบ
+            # x_tolerance และ y_tolerance สามารถปรับได้ถ้าจำเป็นสำหรับภาษาไทย
+            texts.append(page.extract_text(x_tolerance=2, y_tolerance=3) or "")
+            # คืนหน่วยความจำของ layout ที่ parse แล้วทีละหน้า
+            page.close()
+            chars += len(texts[-1].strip())
+            if max_chars and chars >= max_chars:
+                break
+    return texts
 
 
 class FileProcessor:
     """
-    คลาสสำหรับการประมวลผลไฟล์เอกสารรูปแบบต่างๆ (PDF, DOC, DOCX, TXT)
-    และดึงเนื้อหาข้อความเพื่อการสรุป
+    คลาสสำหรับการประมวลผลไฟล์เอกสารรูปแบบต่างๆ (PDF, DOC, DOCX, TXT, รูปภาพ JPG/PNG/WebP)
+    และดึงเนื้อหาข้อความเพื่อการสรุป (รูปภาพไม่มีข้อความในตัว จึงส่งต่อไป OCR ใน main.py)
     """
     
     SUPPORTED_FORMATS = {
         'application/pdf': 'pdf',
         'application/msword': 'doc',
         'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
-        'text/plain': 'txt'
+        'text/plain': 'txt',
+        'image/jpeg': 'image',
+        'image/png': 'image',
+        'image/webp': 'image',
     }
+
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
     
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    # เปลี่ยนเมื่อผลการดึงข้อความเปลี่ยน (ใช้เป็นส่วนหนึ่งของ key ของ extraction cache)
+    EXTRACTOR_VERSION = "4"
+
+    # หน้าที่มีข้อความน้อยกว่านี้ถือว่าเป็นหน้าสแกน
+    MIN_PAGE_TEXT_CHARS = 10
+    # ความละเอียดของภาพหน้าที่ส่งไป OCR (DPI)
+    OCR_RESOLUTION = 150
+    # ด้านยาวสุดของภาพที่ส่งไป OCR: ตัวอักษรบนกระดาษ A4 ยังอ่านได้ชัด แต่ภาพจากมือถือ (4000px+) เล็กลงมาก
+    OCR_MAX_SIDE = 2000
+    OCR_JPEG_QUALITY = 80
+    # จำนวนหน้าต่องานหนึ่งชิ้นของการดึงข้อความ PDF
+    PDF_PAGES_PER_TASK = 16
     
-    def __init__(self):
-        pass
+    def __init__(self, ocr_concurrency: int = 4, pdf_workers: int = 0, executor: WorkloadExecutor | None = None):
+        self.ocr_concurrency = ocr_concurrency
+        # thread pool ของงานดึงข้อความ/ภาพ (None = default pool ของ asyncio) ตัว parser ทุกตัวไม่รันบน event loop
+        self.executor = executor
+        # pdf_workers > 0: PDF ที่ยาวกว่า PDF_PAGES_PER_TASK หน้าแบ่งช่วงหน้าไปดึงข้อความขนานกันใน process pool
+        self.pdf_workers = pdf_workers
+        self._pdf_pool: ProcessPoolExecutor | None = None
     
-    async def extract_text_from_file(self, file: UploadFile) -> str:
+    async def extract_text_from_file(
+        self,
+        file: UploadFile,
+        ocr_page: PageOCR | None = None,
+        page_range: tuple[int, int | None] | None = None,
+        max_chars: int | None = None,
+        info: dict | None = None,
+        content: bytes | None = None,
+    ) -> str:
         """
         ดึงเนื้อหาข้อความจากไฟล์ที่อัปโหลดโดยอิงตามรูปแบบไฟล์
         
         Args:
             file: FastAPI UploadFile object
+            ocr_page: OCR ของหน้าเดียว (ถ้ามี) ใช้กับ PDF ที่มีบางหน้าเป็นภาพสแกน
+            page_range: (หน้าแรก, หน้าสุดท้าย) นับเริ่มที่ 1 รวมหน้าสุดท้าย (None = ถึงหน้าสุดท้าย) ใช้กับ PDF เท่านั้น
+            max_chars: หยุดอ่าน PDF เมื่อได้ข้อความครบจำนวนตัวอักษรนี้ (ไฟล์ประเภทอื่นตัดข้อความที่ความยาวนี้)
+            info: dict ที่จะถูกเติมรายละเอียดการดึงข้อความ (pages_total, pages_read, first_page, last_page, stopped_early,
+                  scanned_pages, ocr_incomplete = มีหน้าสแกนที่ไม่ได้ OCR หรือ OCR ไม่สำเร็จ)
+            content: bytes ของไฟล์ที่อ่านไว้แล้วด้วย read_upload (ไม่ต้องอ่านไฟล์ซ้ำ)
             
         Returns:
             str: Extracted text content
@@ -57,28 +135,34 @@ class FileProcessor:
         Raises:
             HTTPException: If file format is not supported or extraction fails
         """
-        # ตรวจสอบขนาดไฟล์
-        content = await file.read()
-        if len(content) > self.MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="ขนาดไฟล์เกิน 10MB")
-        
-        # รีเซ็ตตัวชี้ตำแหน่งไฟล์
-        await file.seek(0)
+        # อ่านไฟล์ครั้งเดียว (ตรวจสอบขนาดก่อนอ่าน); parser ทุกตัวใช้ bytes ชุดนี้ผ่าน BytesIO ซึ่งไม่คัดลอกข้อมูล
+        if content is None:
+            content = await read_upload(file, self.MAX_FILE_SIZE)
         
         # ระบุรูปแบบไฟล์
         file_format = self._get_file_format(file)
         
         try:
+            if info is None:
+                info = {}
+            info["stopped_early"] = False
             if file_format == 'pdf':
-                text = await self._extract_from_pdf(content)
+                text = await self._extract_from_pdf(content, ocr_page, page_range, max_chars, info)
             elif file_format == 'docx':
                 text = await self._extract_from_docx(content)
             elif file_format == 'doc':
                 text = await self._extract_from_doc(content)
             elif file_format == 'txt':
                 text = await self._extract_from_txt(content)
+            elif file_format == 'image':
+                # รูปภาพต้อง OCR เสมอ
+                text = ""
             else:
-                raise HTTPException(status_code=400, detail="รองรับเฉพาะไฟล์ PDF, DOC, DOCX, TXT เท่านั้น")
+                raise HTTPException(status_code=400, detail="รองรับเฉพาะไฟล์ PDF, DOC, DOCX, TXT, JPG, PNG, WebP เท่านั้น")
+
+            if file_format != 'pdf' and max_chars and len(text) > max_chars:
+                text = text[:max_chars]
+                info["stopped_early"] = True
             
             if not text or len(text.strip()) < 10:
                 # Instead of error, return empty string to trigger OCR fallback in main.py
@@ -111,10 +195,19 @@ class FileProcessor:
                 return 'doc'
             elif filename_lower.endswith('.txt'):
                 return 'txt'
+            elif filename_lower.endswith(self.IMAGE_EXTENSIONS):
+                return 'image'
         
         raise HTTPException(status_code=400, detail="ไม่สามารถระบุประเภทไฟล์ได้")
     
-    async def _extract_from_pdf(self, content: bytes) -> str:
+    async def _extract_from_pdf(
+        self,
+        content: bytes,
+        ocr_page: PageOCR | None = None,
+        page_range: tuple[int, int | None] | None = None,
+        max_chars: int | None = None,
+        info: dict | None = None,
+    ) -> str:
         """ดึงข้อความจากไฟล์ PDF โดยใช้ pdfplumber (ดีกว่าสำหรับภาษาไทย & เบากว่า PyMuPDF)"""
         if not HAS_PDFPLUMBER:
              raise HTTPException(
@@ -123,18 +216,44 @@ class FileProcessor:
             )
         
         try:
-            text = ""
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
-                    # extract_text มักจะรักษาเลย์เอาต์ได้ดีกว่าการดึงแบบดิบ
-                    # x_tolerance และ y_tolerance สามารถปรับได้ถ้าจำเป็นสำหรับภาษาไทย
-                    page_text = page.extract_text(x_tolerance=2, y_tolerance=3) 
-                    if page_text:
-                        text += page_text + "\n"
-            
-            if text.strip():
-                return text
-                
+            info = {} if info is None else info
+            page_count = await run_blocking(self.executor, self.count_pdf_pages, content)
+            first, last = page_range or (1, None)
+            last = page_count if last is None else min(last, page_count)
+            if page_range and first > page_count:
+                raise HTTPException(status_code=400, detail=f"ช่วงหน้าที่เลือกเกินจำนวนหน้าของเอกสาร (มี {page_count} หน้า)")
+
+            # อ่านทีละช่วงหน้าตามลำดับ และหยุดเมื่อได้ข้อความพอ (ช่วงที่เหลือจะถูกยกเลิก)
+            page_indexes, pages, chars = [], [], 0
+            async with contextlib.aclosing(self.iter_pdf_pages(content, first - 1, last, max_chars)) as page_iter:
+                async for page_index, page_text in page_iter:
+                    page_indexes.append(page_index)
+                    pages.append(page_text)
+                    chars += len(page_text.strip())
+                    if max_chars and chars >= max_chars and page_index + 1 < last:
+                        info["stopped_early"] = True
+                        break
+            info.update(
+                pages_total=page_count, pages_read=len(pages),
+                first_page=first, last_page=first + len(pages) - 1,
+            )
+            scanned = [i for i, page_text in enumerate(pages) if len(page_text.strip()) < self.MIN_PAGE_TEXT_CHARS]
+
+            # PDF ที่สแกนทั้งเล่มส่งไป OCR ทั้งไฟล์ใน main.py (คืนค่าว่าง)
+            # ส่วน PDF ผสม หรือเมื่อเลือกเฉพาะบางหน้า OCR เฉพาะหน้าที่ไม่มีข้อความ แทนที่จะทิ้งหน้าเหล่านั้นไป
+            whole_document = len(pages) == page_count
+            info["scanned_pages"] = len(scanned)
+            info["ocr_incomplete"] = False
+            if scanned and (len(scanned) < len(pages) or not whole_document):
+                if ocr_page is None:
+                    info["ocr_incomplete"] = True
+                else:
+                    ocr_texts = await self._ocr_pages(content, [page_indexes[i] for i in scanned], ocr_page)
+                    for i, page_text in zip(scanned, ocr_texts):
+                        pages[i] = page_text or ""
+                    info["ocr_incomplete"] = None in ocr_texts
+
+            text = "\n".join(page_text for page_text in pages if page_text.strip())
             if text.strip():
                 return text
                 
@@ -145,58 +264,164 @@ class FileProcessor:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"ไม่สามารถอ่านไฟล์ PDF ได้: {str(e)}")
-    
-    async def _extract_from_docx(self, content: bytes) -> str:
-        """ดึงข้อความจากไฟล์ DOCX"""
-        if not HAS_DOCX2TXT and not HAS_PYTHON_DOCX:
-            raise HTTPException(
-                status_code=500, 
-                detail="ไม่สามารถอ่านไฟล์ DOCX ได้ เนื่องจากไม่มี DOCX processing libraries"
+
+    def slice_pdf(self, content: bytes, first_page: int, last_page: int) -> bytes:
+        """PDF ที่มีเฉพาะหน้า first_page..last_page (นับจาก 1, รวมหน้าสุดท้าย) สำหรับ OCR ทั้งไฟล์เมื่อเลือกช่วงหน้า"""
+        if not HAS_PDFIUM:
+            raise HTTPException(status_code=400, detail="OCR ทั้งไฟล์ไม่รองรับการเลือกช่วงหน้า (ไม่มี pypdfium2 installed)")
+        source = pdfium.PdfDocument(content)
+        sliced = pdfium.PdfDocument.new()
+        try:
+            sliced.import_pages(source, pages=list(range(first_page - 1, last_page)))
+            buffer = io.BytesIO()
+            sliced.save(buffer)
+            return buffer.getvalue()
+        finally:
+            sliced.close()
+            source.close()
+
+    def count_pdf_pages(self, content: bytes) -> int:
+        with pdfplumber.open(io.BytesIO(content)) as pdf:
+            return len(pdf.pages)
+
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        if self._pdf_pool is None:
+            # spawn: ไม่ fork process ที่มี event loop และ thread ของ server อยู่
+            self._pdf_pool = ProcessPoolExecutor(
+                max_workers=self.pdf_workers, mp_context=multiprocessing.get_context("spawn")
             )
-        
+        return self._pdf_pool
+
+    async def iter_pdf_pages(
+        self, content: bytes, start: int = 0, stop: int | None = None, max_chars: int | None = None
+    ) -> AsyncIterator[tuple[int, str]]:
+        """
+        Yield (page_index, text) for pages [start, stop), in page order, as soon as each page range is done.
+        Sequential mode parses one range at a time on a worker thread; with pdf_workers > 0 up to
+        pdf_workers ranges run ahead in the process pool. Ranges not yet consumed are cancelled when
+        the caller stops iterating early (use contextlib.aclosing when breaking out of the loop).
+        With max_chars, sequential mode stops inside a range on the page that reaches it (stripped
+        text, counted as the caller does) and the iteration ends there.
+        """
+        loop = asyncio.get_running_loop()
+        if stop is None:
+            stop = await run_blocking(self.executor, self.count_pdf_pages, content)
+        ranges = [(first, min(first + self.PDF_PAGES_PER_TASK, stop))
+                  for first in range(start, stop, self.PDF_PAGES_PER_TASK)]
+        parallel = self.pdf_workers > 0 and len(ranges) > 1
+        pending = []
+        chars = 0
+
+        def submit_next():
+            first, last = ranges[len(pending)]
+            pending.append(loop.run_in_executor(self._get_pdf_pool(), extract_pdf_page_range, content, first, last))
+
         try:
-            text = ""
-            
-            # วิธีที่ 1: ใช้ docx2txt (ง่ายกว่าและเชื่อถือได้มากกว่า)
-            if HAS_DOCX2TXT:
-                try:
-                    text = docx2txt.process(io.BytesIO(content))
-                    if text.strip():
-                        return text
-                except Exception:
-                    pass  # ลองใช้ python-docx เป็น fallback
-            
-            # วิธีที่ 2: ใช้ python-docx เป็น fallback
-            if HAS_PYTHON_DOCX:
+            for i, (first, last) in enumerate(ranges):
+                if parallel:
+                    while len(pending) < min(len(ranges), i + self.pdf_workers):
+                        submit_next()
+                    texts = await pending[i]
+                else:
+                    # ส่งงบที่เหลือเข้าไปด้วย: ไม่ parse หน้าที่เหลือของช่วงเมื่อได้ข้อความครบแล้ว
+                    remaining = max_chars - chars if max_chars else None
+                    texts = await run_blocking(self.executor, extract_pdf_page_range, content, first, last, remaining)
+                for offset, page_text in enumerate(texts):
+                    chars += len(page_text.strip())
+                    yield first + offset, page_text
+                if len(texts) < last - first:
+                    return
+        except BrokenProcessPool:
+            # worker ตาย (เช่น หน่วยความจำไม่พอ): สร้าง pool ใหม่ในครั้งถัดไป
+            self.shutdown()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown(wait=False, cancel_futures=True)
+            self._pdf_pool = None
+
+    def render_pdf_page(self, content: bytes, page_index: int) -> bytes:
+        """
+        Rasterize one page and encode it for OCR (see encode_for_ocr).
+        Each call opens its own document so pages can render in parallel threads.
+        """
+        with pdfplumber.open(io.BytesIO(content)) as pdf:
+            image = pdf.pages[page_index].to_image(resolution=self.OCR_RESOLUTION).original
+        return self.encode_for_ocr(image)
+
+    def is_image(self, file: UploadFile) -> bool:
+        try:
+            return self._get_file_format(file) == 'image'
+        except HTTPException:
+            return False
+
+    def encode_for_ocr(self, image: "Image.Image") -> bytes:
+        """
+        Downsample to OCR_MAX_SIDE, convert to grayscale and re-encode as JPEG.
+        สีไม่ช่วยในการอ่านตัวอักษร และ JPEG ขาวดำเล็กกว่า PNG/JPEG สีหลายเท่า
+        """
+        image = image.convert("L")
+        if max(image.size) > self.OCR_MAX_SIDE:
+            image.thumbnail((self.OCR_MAX_SIDE, self.OCR_MAX_SIDE), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.OCR_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+    def preprocess_image(self, data: bytes) -> tuple[bytes, str]:
+        """
+        Prepare an uploaded photo/scan for OCR. CPU-bound: call through preprocess_for_ocr.
+
+        Returns:
+            (image bytes, mime type) - the original bytes when re-encoding would not make them smaller
+        """
+        if not HAS_PIL:
+            raise HTTPException(status_code=500, detail="ไม่สามารถประมวลผลรูปภาพได้ เนื่องจากไม่มี Pillow installed")
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                original_format = (image.format or "").lower()
+                # ภาพจากมือถือมักเก็บการหมุนไว้ใน EXIF
+                encoded = self.encode_for_ocr(ImageOps.exif_transpose(image))
+        except Exception as e:
+            print(f"DEBUG: Image preprocessing failed: {e}")
+            raise HTTPException(status_code=400, detail="ไม่สามารถอ่านไฟล์รูปภาพได้ ไฟล์อาจเสียหายหรือไม่ใช่รูปภาพ")
+
+        if len(encoded) >= len(data) and original_format in ("jpeg", "png", "webp"):
+            return data, f"image/{original_format}"
+        return encoded, "image/jpeg"
+
+    async def preprocess_for_ocr(self, data: bytes) -> tuple[bytes, str]:
+        """preprocess_image on a worker thread (Pillow releases the GIL while decoding/resizing/encoding)"""
+        return await run_blocking(self.executor, self.preprocess_image, data)
+
+    async def _ocr_pages(self, content: bytes, page_indexes: list[int], ocr_page: PageOCR) -> list[str | None]:
+        """Rasterize + OCR only the given pages, at most `ocr_concurrency` at a time; results keep page order (None = failed)"""
+        semaphore = asyncio.Semaphore(self.ocr_concurrency)
+
+        async def run(page_index: int) -> str | None:
+            async with semaphore:
+                image = await run_blocking(self.executor, self.render_pdf_page, content, page_index)
                 try:
-                    doc = Document(io.BytesIO(content))
-                    paragraphs = []
-                    
-                    for paragraph in doc.paragraphs:
-                        if paragraph.text.strip():
-                            paragraphs.append(paragraph.text.strip())
-                    
-                    # ดึงข้อความจากตารางด้วย
-                    for table in doc.tables:
-                        for row in table.rows:
-                            for cell in row.cells:
-                                if cell.text.strip():
-                                    paragraphs.append(cell.text.strip())
-                    
-                    text = "\n".join(paragraphs)
-                    if text.strip():
-                        return text
-                except Exception:
-                    pass
-            
-            # ถ้าทั้งสองวิธีล้มเหลว
+                    return await ocr_page(image, page_index + 1, len(page_indexes))
+                except Exception as e:
+                    # หน้าที่ OCR ไม่ได้ไม่ควรทำให้ทั้งไฟล์ล้มเหลว
+                    print(f"DEBUG: OCR failed for page {page_index + 1}: {e}")
+                    return None
+
+        return await asyncio.gather(*(run(i) for i in page_indexes))
+    
+    async def _extract_from_docx(self, content: bytes) -> str:
+        """ดึงข้อความจากไฟล์ DOCX (อ่าน header, word/document.xml และ footer แบบ stream ทีละย่อหน้า รวมข้อความในตาราง)"""
+        try:
+            return await run_blocking(self.executor, lambda: "\n".join(iter_docx_paragraphs(content)))
+        except (zipfile.BadZipFile, KeyError, ParseError):
             raise HTTPException(
                 status_code=500, 
                 detail="ไม่สามารถอ่านเนื้อหาจากไฟล์ DOCX ได้ ไฟล์อาจเสียหายหรือไม่ถูกต้อง"
             )
-            
-        except HTTPException:
-            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"ไม่สามารถอ่านไฟล์ DOCX ได้: {str(e)}")
     
@@ -211,7 +436,7 @@ class FileProcessor:
         try:
             # สำหรับไฟล์ .doc เราจะลองใช้ docx2txt ซึ่งบางครั้งก็ใช้ได้
             # หมายเหตุ: การรองรับ .doc มีจำกัด แนะนำให้ผู้ใช้แปลงเป็น .docx
-            text = docx2txt.process(io.BytesIO(content))
+            text = await run_blocking(self.executor, docx2txt.process, io.BytesIO(content))
             
             if not text.strip():
                 raise HTTPException(
@@ -232,22 +457,24 @@ class FileProcessor:
     async def _extract_from_txt(self, content: bytes) -> str:
         """ดึงข้อความจากไฟล์ TXT"""
         try:
-            # ลองใช้การเข้ารหัสแบบต่างๆ
-            encodings = ['utf-8', 'utf-8-sig', 'cp874', 'iso-8859-1', 'windows-1252']
-            
-            for encoding in encodings:
-                try:
-                    text = content.decode(encoding)
-                    return text
-                except UnicodeDecodeError:
-                    continue
-            
-            # ถ้าการเข้ารหัสทั้งหมดล้มเหลว ให้ใช้ utf-8 พร้อมการจัดการข้อผิดพลาด
-            text = content.decode('utf-8', errors='replace')
-            return text
-            
+            # ไฟล์ 10MB ที่ต้องลองหลาย encoding ใช้เวลาพอสมควร จึงไม่ทำบน event loop
+            return await run_blocking(self.executor, self._decode_text, content)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"ไม่สามารถอ่านไฟล์ TXT ได้: {str(e)}")
+
+    @staticmethod
+    def _decode_text(content: bytes) -> str:
+        # ลองใช้การเข้ารหัสแบบต่างๆ
+        encodings = ['utf-8', 'utf-8-sig', 'cp874', 'iso-8859-1', 'windows-1252']
+        
+        for encoding in encodings:
+            try:
+                return content.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        
+        # ถ้าการเข้ารหัสทั้งหมดล้มเหลว ให้ใช้ utf-8 พร้อมการจัดการข้อผิดพลาด
+        return content.decode('utf-8', errors='replace')
     
     def validate_file(self, file: UploadFile) -> bool:
         """
@@ -270,6 +497,6 @@ class FileProcessor:
         try:
             self._get_file_format(file)
         except HTTPException:
-            raise HTTPException(status_code=400, detail="รองรับเฉพาะไฟล์ PDF, DOC, DOCX, TXT เท่านั้น")
+            raise HTTPException(status_code=400, detail="รองรับเฉพาะไฟล์ PDF, DOC, DOCX, TXT, JPG, PNG, WebP เท่านั้น")
         
         return True
\ No newline at end of file
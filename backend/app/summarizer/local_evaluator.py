@@ -0,0 +1,97 @@
+from array import array
+from collections import Counter
+
+from .summarization_model import SummarizationModel
+from .text_processor import TextProcessor
+
+
+def lcs_length(a, b) -> int:
+    """
+    Length of the longest common subsequence of two token ID sequences.
+    Bit-parallel (Hyyro 2004): one row of the DP table is a Python int with one bit per
+    token of `a`, so each token of `b` costs a few big-int operations instead of len(a) steps.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return 0
+    masks: dict[int, int] = {}
+    for i, token in enumerate(a):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    row = full
+    for token in b:
+        matches = row & masks.get(token, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(a) - bin(row).count("1")
+
+
+def prf(overlap: int, candidate_total: int, reference_total: int) -> dict:
+    precision = overlap / candidate_total if candidate_total else 0.0
+    recall = overlap / reference_total if reference_total else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+
+class LocalEvaluator:
+    """
+    ประเมินบทสรุปเทียบกับต้นฉบับในเครื่อง (ไม่ใช้ Gemini): ROUGE-1, ROUGE-2, ROUGE-L และความครอบคลุมคำสำคัญ
+    ตัดคำด้วย TextProcessor.tokenize ของโปรเจกต์ แล้วแปลงเป็น token ID (array) ก่อนคำนวณ
+    """
+
+    KEYWORD_COUNT = 20
+
+    def __init__(self, processor: TextProcessor | None = None):
+        self.processor = processor or TextProcessor()
+
+    def token_ids(self, text: str, vocabulary: dict[str, int]) -> array:
+        """Token IDs of `text`; `vocabulary` is shared by the texts compared together (one dict per evaluation)"""
+        ids = array("I")
+        for token in self.processor.tokenize(text or ""):
+            token = token.lower()
+            # ข้ามเครื่องหมายวรรคตอน / bullet
+            if not any(ch.isalnum() for ch in token):
+                continue
+            token_id = vocabulary.get(token)
+            if token_id is None:
+                token_id = vocabulary[token] = len(vocabulary)
+            ids.append(token_id)
+        return ids
+
+    @staticmethod
+    def ngram_overlap(candidate: array, reference: array, n: int) -> tuple[int, int, int]:
+        if n == 1:
+            candidate_grams, reference_grams = Counter(candidate), Counter(reference)
+        else:
+            candidate_grams = Counter(zip(*(candidate[i:] for i in range(n))))
+            reference_grams = Counter(zip(*(reference[i:] for i in range(n))))
+        overlap = sum((candidate_grams & reference_grams).values())
+        return overlap, max(0, len(candidate) - n + 1), max(0, len(reference) - n + 1)
+
+    def keyword_ids(self, original: str, vocabulary: dict[str, int]) -> list[int]:
+        """Token IDs of the most frequent non-stopword words of the original (same rule as the basic engine)"""
+        words = [
+            w.lower() for w in self.processor.tokenize(original or "")
+            if w.lower() not in SummarizationModel.STOPWORDS and len(w.strip()) > 1
+        ]
+        return [vocabulary.setdefault(w, len(vocabulary)) for w, _ in Counter(words).most_common(self.KEYWORD_COUNT)]
+
+    def evaluate(self, original: str, summary: str) -> dict:
+        vocabulary: dict[str, int] = {}
+        reference = self.token_ids(original, vocabulary)
+        candidate = self.token_ids(summary, vocabulary)
+
+        scores = {}
+        for n in (1, 2):
+            scores[f"rouge_{n}"] = prf(*self.ngram_overlap(candidate, reference, n))
+        scores["rouge_l"] = prf(lcs_length(candidate, reference), len(candidate), len(reference))
+
+        keywords = self.keyword_ids(original, vocabulary)
+        summary_ids = set(candidate)
+        hits = sum(1 for k in keywords if k in summary_ids)
+        scores["keyword_coverage"] = round(hits / len(keywords), 4) if keywords else 0.0
+        scores["tokens"] = {"original": len(reference), "summary": len(candidate)}
+        return scores
+
+    def evaluate_many(self, pairs: list[tuple[str, str]]) -> list[dict]:
+        return [self.evaluate(original, summary) for original, summary in pairs]
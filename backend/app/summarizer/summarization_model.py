@@ -4,6 +4,63 @@ from collections import Counter
 from deep_translator import GoogleTranslator
 
 class SummarizationModel:
+    # เปลี่ยนค่านี้เมื่อแก้ตรรกะการสรุป เพื่อให้ cache ของผลลัพธ์เดิมไม่ถูกใช้ซ้ำ
+    ENGINE_VERSION = "textrank-v1"
+
+    # คำหยุด (Stopwords) เพิ่มเติมสำหรับภาษาไทย/อังกฤษ
+    STOPWORDS = frozenset([
+        "the", "is", "in", "at", "of", "on", "and", "a", "an", "to", "for", "with", "user", "defined", "this", "that", "it",
+        "การ", "ความ", "ที่", "ซึ่ง", "อัน", "ของ", "และ", "หรือ", "ใน", "โดย", "เป็น", "ไป", "มา", "จะ", "ให้", "ได้", "แต่",
+        "จาก", "ว่า", "เพื่อ", "กับ", "แก่", "แห่ง", "นั้น", "นี้", "กัน", "แล้ว", "จึง", "อยู่", "ถูก", "เอา"
+    ])
+
+    def sentence_words(self, sentences: list[str], processor) -> list[list[str]]:
+        """คำของแต่ละประโยค (ตัดคำแล้ว ตัวพิมพ์เล็ก ไม่รวมคำหยุด)"""
+        sentence_words = []
+        for sent in sentences:
+            # ใช้ตัวตัดคำที่สร้างขึ้นเอง แทน .split()
+            # ช่วยให้ระบุคำภาษาไทยได้แม้ไม่มีช่องว่าง
+            words = processor.tokenize(sent)
+
+            # ดึงคำที่สะอาดแล้ว (ลบเครื่องหมายวรรคตอน/ขยะตัวอักษรเดียวถ้าจำเป็น)
+            clean_words = [w.lower() for w in words if w.lower() not in self.STOPWORDS and len(w.strip()) > 0]
+            sentence_words.append(clean_words)
+        return sentence_words
+
+    def textrank_scores(self, sentence_words: list[list[str]], damping: float = 0.85, iterations: int = 10) -> list[float]:
+        """
+        คะแนน TextRank ของแต่ละประโยค
+        TextRank แบบย่อ: score(i) = (1-d) + d * sum(similarity(i,j) * score(j))
+        เราใช้ Jaccard Similarity เพื่อความง่ายและความเร็ว
+        """
+        n = len(sentence_words)
+        word_sets = [set(words) for words in sentence_words]
+
+        # คำนวณความคล้ายคลึงครั้งเดียว เก็บเฉพาะคู่ที่มีคำร่วมกัน (เมทริกซ์แบบ sparse)
+        neighbors = [[] for _ in range(n)]
+        for i in range(n):
+            set1 = word_sets[i]
+            if not set1:
+                continue
+            for j in range(i + 1, n):
+                set2 = word_sets[j]
+                if not set2:
+                    continue
+                intersection = len(set1 & set2)
+                if intersection:
+                    sim = intersection / (len(set1) + len(set2) - intersection)
+                    neighbors[i].append((j, sim))
+                    neighbors[j].append((i, sim))
+
+        scores = [1.0] * n  # คะแนนเริ่มต้น PageRank
+        # รันการวนซ้ำด้วย Power Method
+        for _ in range(iterations):
+            scores = [
+                (1 - damping) + damping * sum(sim * scores[j] for j, sim in neighbors[i])
+                for i in range(n)
+            ]
+        return scores
+
     def summarize(self, text: str, num_sentences: int = 5, min_length: int = 20, max_length: int = 2000) -> dict:
         if not text:
             return ""
@@ -41,61 +98,8 @@ class SummarizationModel:
             #    pass
 
             # 2. การใช้งาน TextRank (แบบกราฟ)
-            
-            # คำหยุด (Stopwords) เพิ่มเติมสำหรับภาษาไทย/อังกฤษ
-            stopwords = set([
-                "the", "is", "in", "at", "of", "on", "and", "a", "an", "to", "for", "with", "user", "defined", "this", "that", "it",
-                "การ", "ความ", "ที่", "ซึ่ง", "อัน", "ของ", "และ", "หรือ", "ใน", "โดย", "เป็น", "ไป", "มา", "จะ", "ให้", "ได้", "แต่",
-                "จาก", "ว่า", "เพื่อ", "กับ", "แก่", "แห่ง", "นั้น", "นี้", "กัน", "แล้ว", "จึง", "อยู่", "ถูก", "เอา"
-            ])
-
-            # คำนวณชุดคำล่วงหน้าสำหรับแต่ละประโยค (Jaccard Similarity ต้องการ set)
-            sentence_words = []
-            for sent in valid_sentences:
-                # ใช้ตัวตัดคำที่สร้างขึ้นเอง แทน .split()
-                # ช่วยให้ระบุคำภาษาไทยได้แม้ไม่มีช่องว่าง
-                words = processor.tokenize(sent)
-                
-                # ดึงคำที่สะอาดแล้ว (ลบเครื่องหมายวรรคตอน/ขยะตัวอักษรเดียวถ้าจำเป็น)
-                clean_words = [w.lower() for w in words if w.lower() not in stopwords and len(w.strip()) > 0]
-                sentence_words.append(clean_words)
-
-            # สร้างเมทริกซ์ความคล้ายคลึง
-            n = len(valid_sentences)
-            scores = [1.0] * n  # คะแนนเริ่มต้น PageRank
-            damping = 0.85
-            iterations = 10
-            
-            # คล้ายกับ PageRank: score(i) = (1-d) + d * sum(score(j) * weight(j,i) / sum_weight(j))
-            # TextRank แบบย่อ: score(i) = (1-d) + d * sum(similarity(i,j) * score(j))
-            # เราใช้ Jaccard Similarity เพื่อความง่ายและความเร็ว
-            
-            def jaccard_similarity(words1, words2):
-                set1 = set(words1)
-                set2 = set(words2)
-                if not set1 or not set2:
-                    return 0.0
-                intersection = len(set1.intersection(set2))
-                # Soft Jaccard เพื่อหลีกเลี่ยงค่า 0 สนิท ถ้าการซ้อนทับน้อยแต่มีความเกี่ยวข้องสูง
-                union = len(set1) + len(set2) - intersection 
-                if union == 0: return 0.0
-                return intersection / union
-
-            # รันการวนซ้ำด้วย Power Method
-            for _ in range(iterations):
-                new_scores = [0.0] * n
-                for i in range(n):
-                    sum_similarity = 0.0
-                    for j in range(n):
-                        if i == j: continue
-                        
-                        sim = jaccard_similarity(sentence_words[i], sentence_words[j])
-                        
-                        # เพิ่มค่าคะแนนจากเพื่อนบ้าน j
-                        sum_similarity += sim * scores[j]
-                    
-                    new_scores[i] = (1 - damping) + damping * sum_similarity
-                scores = new_scores
+            sentence_words = self.sentence_words(valid_sentences, processor)
+            scores = self.textrank_scores(sentence_words)
 
             # 4. เลือกประโยคยอดนิยม
             # สร้างคู่ของ (ดัชนี, คะแนน)
@@ -150,7 +154,7 @@ class SummarizationModel:
                 all_words.extend(processor.tokenize(s))
             
             # ดึงคำสำคัญ (ไม่รวมคำหยุด)
-            keywords = [w.lower() for w in all_words if w.lower() not in stopwords and len(w.strip()) > 1]
+            keywords = [w.lower() for w in all_words if w.lower() not in self.STOPWORDS and len(w.strip()) > 1]
             if keywords:
                  most_common = [w for w, count in Counter(keywords).most_common(20)]
                  
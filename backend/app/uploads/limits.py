@@ -0,0 +1,84 @@
+import json
+
+from fastapi import HTTPException, UploadFile
+
+# ส่วนเกินของ multipart (boundary, header ของแต่ละ part, ฟิลด์อื่นในฟอร์ม) ที่ยอมให้นอกเหนือจากขนาดไฟล์
+MULTIPART_OVERHEAD = 64 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def too_large(max_size: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"ขนาดไฟล์เกิน {max_size // (1024 * 1024)}MB")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversize upload bodies while they are still arriving.
+    Starlette only hands an UploadFile to the endpoint after the whole multipart body has been
+    spooled, so checking `len(content)` in the endpoint means a 200MB upload is received in full
+    before the 413. Here the Content-Length is checked up front and the streamed body is counted
+    chunk by chunk; the HTTPException raised from `receive` is re-raised by FastAPI's body reader.
+    """
+
+    def __init__(self, app, max_file_size: int, paths: set[str]):
+        self.app = app
+        self.max_file_size = max_file_size
+        self.max_body_size = max_file_size + MULTIPART_OVERHEAD
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise too_large(self.max_file_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        error = too_large(self.max_file_size)
+        body = json.dumps({"detail": error.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_upload(file: UploadFile, max_size: int) -> bytes:
+    """
+    Read an upload once, failing as soon as it crosses `max_size`.
+    Starlette has already spooled the part to a SpooledTemporaryFile and knows its size, so an
+    oversize file is rejected without reading it; uploads built by hand (size unknown) are read
+    in chunks and stopped at the limit.
+    """
+    if file.size is not None:
+        if file.size > max_size:
+            raise too_large(max_size)
+        await file.seek(0)
+        return await file.read()
+
+    await file.seek(0)
+    chunks, total = [], 0
+    while chunk := await file.read(READ_CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_size:
+            raise too_large(max_size)
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from ..workers.executors import WorkloadExecutor, run_blocking
+
+# เขียนลงดิสก์ทีละก้อนประมาณนี้ (ไม่เก็บ chunk ทั้งก้อนไว้ในหน่วยความจำ)
+WRITE_BUFFER_SIZE = 1024 * 1024
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ResumableUploadStore:
+    """
+    Resumable uploads in the style of tus (https://tus.io): create an upload with its total length,
+    append chunks at the current offset, ask for the offset after a dropped connection, then finalize.
+
+    Every upload is one file on local disk (`<id>.part`) that chunks are appended to in place, so
+    finalizing needs no reassembly, plus a small `<id>.json` with its metadata so uploads survive
+    a server restart. Uploads not finished within `ttl_seconds` are deleted.
+
+    State is local to the host: every request of one upload must reach the same machine (single
+    server or sticky sessions). Serverless deployments (Vercel) cannot serve these endpoints.
+    """
+
+    def __init__(self, directory: str, max_size: int, max_chunk_size: int, ttl_seconds: float = 24 * 3600,
+                 executor: WorkloadExecutor | None = None):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_chunk_size = max_chunk_size
+        self.ttl_seconds = ttl_seconds
+        self.executor = executor
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.counters = {"created": 0, "chunks": 0, "bytes": 0, "finalized": 0, "expired": 0}
+
+    def _path(self, upload_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.{suffix}")
+
+    def _read_meta(self, upload_id: str) -> dict | None:
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            return None
+        try:
+            with open(self._path(upload_id, "json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # offset คือขนาดไฟล์จริงบนดิสก์ (ถูกต้องเสมอแม้ server ดับกลาง chunk)
+            meta["offset"] = os.path.getsize(self._path(upload_id, "part"))
+        except OSError:
+            return None
+        return meta
+
+    def _write_meta(self, meta: dict):
+        stored = {k: v for k, v in meta.items() if k != "offset"}
+        tmp_path = self._path(meta["upload_id"], "json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(meta["upload_id"], "json"))
+
+    async def create(self, length: int, filename: str, content_type: str | None, user_id: str | None) -> dict:
+        if length <= 0:
+            raise HTTPException(status_code=400, detail="ขนาดไฟล์ต้องมากกว่า 0")
+        if length > self.max_size:
+            raise HTTPException(status_code=413, detail=f"ขนาดไฟล์เกิน {self.max_size // (1024 * 1024)}MB")
+        for expired_id in await run_blocking(self.executor, self.expire):
+            self._locks.pop(expired_id, None)
+
+        meta = {
+            "upload_id": uuid.uuid4().hex,
+            "length": length,
+            "filename": filename,
+            "content_type": content_type,
+            "user_id": user_id,
+            "created_at": time.time(),
+        }
+
+        def write():
+            os.makedirs(self.directory, exist_ok=True)
+            open(self._path(meta["upload_id"], "part"), "wb").close()
+            self._write_meta(meta)
+
+        await run_blocking(self.executor, write)
+        self.counters["created"] += 1
+        return {**meta, "offset": 0}
+
+    async def get(self, upload_id: str) -> dict | None:
+        meta = await run_blocking(self.executor, self._read_meta, upload_id)
+        if meta is not None and meta["created_at"] + self.ttl_seconds <= time.time():
+            await self.delete(upload_id)
+            return None
+        return meta
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> dict:
+        """
+        Append a request body at `offset`, which must equal the bytes already stored (409 otherwise,
+        so the client asks for the offset and resumes from there). The body is written as it arrives.
+        """
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            meta = await self.get(upload_id)
+            if meta is None:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            if offset != meta["offset"]:
+                raise HTTPException(status_code=409, detail=f"Upload-Offset ไม่ตรงกับข้อมูลที่ได้รับแล้ว ({meta['offset']})")
+
+            remaining = meta["length"] - offset
+            received = 0
+            buffer = bytearray()
+            with open(self._path(upload_id, "part"), "ab") as f:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > remaining:
+                        raise HTTPException(status_code=413, detail="ข้อมูลเกินขนาดไฟล์ที่ประกาศไว้")
+                    if received > self.max_chunk_size:
+                        raise HTTPException(status_code=413, detail=f"chunk ใหญ่เกิน {self.max_chunk_size // (1024 * 1024)}MB")
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await run_blocking(self.executor, f.write, bytes(buffer))
+                        buffer.clear()
+                # ถ้า connection หลุดกลางทาง ส่วนที่เขียนไปแล้วยังอยู่ และ offset คือขนาดไฟล์จริง
+                if buffer:
+                    await run_blocking(self.executor, f.write, bytes(buffer))
+
+            self.counters["chunks"] += 1
+            self.counters["bytes"] += received
+            meta["offset"] = offset + received
+            return meta
+
+    async def read_complete(self, upload_id: str) -> tuple[dict, bytes]:
+        """Bytes of a finished upload (409 while chunks are still missing)"""
+        meta = await self.get(upload_id)
+        if meta is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if meta["offset"] != meta["length"]:
+            raise HTTPException(
+                status_code=409, detail=f"การอัปโหลดยังไม่ครบ ({meta['offset']}/{meta['length']} bytes)"
+            )
+        content = await run_blocking(self.executor, self._read_part, upload_id)
+        self.counters["finalized"] += 1
+        return meta, content
+
+    def _read_part(self, upload_id: str) -> bytes:
+        with open(self._path(upload_id, "part"), "rb") as f:
+            return f.read()
+
+    async def delete(self, upload_id: str) -> bool:
+        self._locks.pop(upload_id, None)
+        return await run_blocking(self.executor, self._remove, upload_id)
+
+    def _remove(self, upload_id: str) -> bool:
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            return False
+        removed = False
+        for suffix in ("part", "json"):
+            try:
+                os.remove(self._path(upload_id, suffix))
+                removed = True
+            except OSError:
+                pass
+        return removed
+
+    def expire(self) -> list[str]:
+        """Delete uploads older than ttl_seconds (runs on a worker thread); returns the deleted IDs"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        expired_ids = []
+        cutoff = time.time() - self.ttl_seconds
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            try:
+                expired = os.path.getmtime(os.path.join(self.directory, name)) <= cutoff
+            except OSError:
+                continue
+            if expired and self._remove(upload_id):
+                expired_ids.append(upload_id)
+                self.counters["expired"] += 1
+        return expired_ids
+
+    def stats(self) -> dict:
+        return dict(self.counters)
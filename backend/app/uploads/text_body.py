@@ -0,0 +1,65 @@
+import codecs
+import zlib
+
+from fastapi import HTTPException, Request
+
+# ขนาดข้อความสูงสุดหลังคลายการบีบอัด (กัน gzip bomb: body เล็กแต่คลายแล้วใหญ่มาก)
+MAX_TEXT_BODY_BYTES = 20 * 1024 * 1024
+SUPPORTED_ENCODINGS = ("identity", "gzip")
+
+
+def body_charset(content_type: str | None) -> str:
+    """Charset parameter of a Content-Type header (utf-8 when absent or unknown)"""
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            charset = value.strip().strip('"') or "utf-8"
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                raise HTTPException(status_code=415, detail=f"Unsupported charset: {charset}")
+    return "utf-8"
+
+
+async def read_text_body(request: Request, max_size: int = MAX_TEXT_BODY_BYTES) -> str:
+    """
+    Request body as text, decoded while it arrives: `Content-Encoding: gzip` is inflated chunk by
+    chunk and the charset decoder is fed incrementally, so the only full copy kept is the text itself.
+    Bodies over `max_size` bytes (after decompression) are rejected with 413 as soon as they cross it.
+    """
+    encoding = (request.headers.get("content-encoding") or "identity").strip().lower()
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding} (expected gzip)")
+    # wbits=31: gzip header + trailer (CRC) ถูกตรวจด้วย
+    inflater = zlib.decompressobj(wbits=31) if encoding == "gzip" else None
+    decoder = codecs.getincrementaldecoder(body_charset(request.headers.get("content-type")))(errors="strict")
+
+    parts, total = [], 0
+
+    def feed(data: bytes, final: bool = False):
+        nonlocal total
+        total += len(data)
+        if total > max_size:
+            raise HTTPException(status_code=413, detail=f"ข้อความเกิน {max_size // (1024 * 1024)}MB")
+        parts.append(decoder.decode(data, final=final))
+
+    try:
+        async for chunk in request.stream():
+            if inflater is None:
+                feed(chunk)
+                continue
+            # คลายทีละไม่เกิน max_size + 1 byte เพื่อหยุดได้ทันทีเมื่อเกินขนาด
+            data = inflater.decompress(chunk, max_size - total + 1)
+            feed(data)
+            while inflater.unconsumed_tail:
+                feed(inflater.decompress(inflater.unconsumed_tail, max_size - total + 1))
+        if inflater is not None:
+            feed(inflater.flush())
+            if not inflater.eof:
+                raise HTTPException(status_code=400, detail="gzip body is truncated")
+        feed(b"", final=True)
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"ข้อความไม่ใช่ {e.encoding} ที่ถูกต้อง")
+    return "".join(parts)
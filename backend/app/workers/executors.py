@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class WorkloadExecutor:
+    """
+    A named thread pool for one class of blocking work (LLM I/O, CPU ranking, file extraction, ...).
+    Giving every class its own, separately sized pool means a burst in one (e.g. slow Gemini calls
+    holding threads) queues only behind itself instead of starving the others in a shared pool.
+
+    stats() exports the current queue depth / active threads and the wait (submit -> start) and
+    run times of the last `window` tasks.
+    """
+
+    def __init__(self, name: str, max_workers: int, window: int = 200):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=window)
+        self._runs: deque[float] = deque(maxlen=window)
+        self.queued = 0
+        self.active = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        submitted_at = time.perf_counter()
+        # เหมือน asyncio.to_thread: งานใน thread เห็น contextvars ของผู้เรียก
+        context = contextvars.copy_context()
+        state = {"started": False}
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                state["started"] = True
+                self.queued -= 1
+                self.active += 1
+                self._waits.append(started_at - submitted_at)
+            succeeded = False
+            try:
+                result = context.run(fn, *args, **kwargs)
+                succeeded = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self._runs.append(time.perf_counter() - started_at)
+                    self.counters["completed" if succeeded else "failed"] += 1
+
+        def on_done(future: Future):
+            # งานที่ถูกยกเลิกก่อนเริ่ม (เช่น request ถูกยกเลิก) ไม่ได้ออกจากคิวผ่าน task()
+            if future.cancelled():
+                with self._lock:
+                    if not state["started"]:
+                        self.queued -= 1
+                    self.counters["cancelled"] += 1
+
+        with self._lock:
+            self.queued += 1
+            self.counters["submitted"] += 1
+        future = self._pool.submit(task)
+        future.add_done_callback(on_done)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) on this pool (the drop-in for asyncio.to_thread / run_in_threadpool)"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    @staticmethod
+    def _percentile(samples: list[float], q: float) -> float:
+        if not samples:
+            return 0.0
+        samples = sorted(samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits, runs = list(self._waits), list(self._runs)
+            snapshot = {**self.counters, "workers": self.max_workers, "queued": self.queued, "active": self.active}
+        return {
+            **snapshot,
+            "wait_ms_p50": round(self._percentile(waits, 0.5) * 1000, 1),
+            "wait_ms_p95": round(self._percentile(waits, 0.95) * 1000, 1),
+            "wait_ms_max": round(max(waits, default=0.0) * 1000, 1),
+            "run_ms_p50": round(self._percentile(runs, 0.5) * 1000, 1),
+            "run_ms_p95": round(self._percentile(runs, 0.95) * 1000, 1),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_blocking(executor: WorkloadExecutor | None, fn, *args, **kwargs):
+    """Run fn on `executor`, or on asyncio's default pool when none was configured"""
+    if executor is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await executor.run(fn, *args, **kwargs)
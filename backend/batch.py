@@ -0,0 +1,298 @@
+"""
+Offline batch summarizer for directories of documents.
+
+Walks directories / glob patterns, extracts text with the same FileProcessor used by
+/summarize-file, runs the Basic engine on a process pool and (with --ai) the AI engine
+under a client-side rate limit. One JSON line per file is appended to the output as soon
+as that file is done, so an interrupted run is resumed by running the same command again:
+files already in the output (same path, size and mtime) are skipped, failed ones are retried.
+With --ai a file also counts as done only once its AI summary succeeded (ai_status "ok").
+The record of a file that is processed again is replaced, so the output keeps one line per file.
+
+Scanned PDFs and images have no text layer; they are recorded with status "needs_ocr"
+(OCR goes through the HTTP API, which keeps document sessions and the OCR caches).
+
+Usage (from the repository root):
+    python -m backend.batch archive/ --output summaries.jsonl
+    python -m backend.batch "archive/**/*.pdf" --workers 4 --ai --ai-rpm 10 --output summaries.jsonl
+"""
+import argparse
+import asyncio
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# ประเภทไฟล์ที่ FileProcessor อ่านได้ (ตามนามสกุล)
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".doc": "application/msword",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+# สถานะที่ถือว่าเสร็จแล้ว (ไม่ทำซ้ำเมื่อ resume)
+DONE_STATUSES = ("ok", "empty", "needs_ocr", "skipped")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize directories of documents offline (JSONL output, resumable)")
+    parser.add_argument("inputs", nargs="+", help="Files, directories (searched recursively) or glob patterns")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) - 1), help="Extraction / ranking processes")
+    parser.add_argument("--num-sentences", type=int, default=5)
+    parser.add_argument("--max-chars", type=int, default=None, help="Stop reading a document after this many characters")
+    parser.add_argument("--max-file-mb", type=float, default=None,
+                        help="Skip files larger than this (default and maximum: FileProcessor.MAX_FILE_SIZE)")
+    parser.add_argument("--include-text", action="store_true", help="Also write the extracted text")
+    parser.add_argument("--ai", action="store_true", help="Also run the AI engine (uses the configured LLM backend)")
+    parser.add_argument("--ai-mode", default="compress", choices=("compress", "map_reduce"), help="How long documents go to the AI")
+    parser.add_argument("--ai-rpm", type=float, default=10, help="LLM calls per minute per model (scheduler token bucket)")
+    parser.add_argument("--ai-concurrency", type=int, default=4, help="AI summaries in flight at once")
+    parser.add_argument("--ai-deadline", type=float, default=300, help="Seconds one AI summary may take, queueing for the rate limit included")
+    parser.add_argument("--mongo", default="memory://", help="MONGO_DETAILS for the AI caches (default: in-memory stand-in)")
+    return parser.parse_args(argv)
+
+
+def find_files(inputs: list[str]) -> list[Path]:
+    """Supported files under `inputs`, each once, in a stable order"""
+    found = {}
+    for pattern in inputs:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = (p for p in path.rglob("*") if p.is_file())
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = (Path(p) for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+        for candidate in candidates:
+            if candidate.suffix.lower() in CONTENT_TYPES:
+                found.setdefault(str(candidate.resolve()), candidate)
+    return [found[key] for key in sorted(found)]
+
+
+def file_identity(path: Path) -> dict:
+    stat = path.stat()
+    return {"path": str(path.resolve()), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def is_done(record: dict, require_ai: bool = False) -> bool:
+    if record.get("status") not in DONE_STATUSES:
+        return False
+    # AI ล้มเหลว / หมดเวลา หรือรอบก่อนไม่ได้ใช้ --ai: ทำใหม่เมื่อรันด้วย --ai
+    return not require_ai or record["status"] != "ok" or record.get("ai_status") == "ok"
+
+
+def load_done(output: Path, require_ai: bool = False) -> set[tuple]:
+    """
+    (path, size, mtime) of files already finished in `output` (with `require_ai`, "ok" records
+    need a successful AI summary too). Records of files that will be processed again and a line
+    cut off by an interruption are removed from `output`, so the new record replaces the old one.
+    """
+    done = set()
+    if not output.exists():
+        return done
+    data = output.read_bytes()
+    kept = []
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if is_done(record, require_ai):
+            done.add((record.get("path"), record.get("size"), record.get("mtime")))
+            kept.append(line)
+    compacted = b"".join(kept)
+    if compacted != data:
+        # ไฟล์ชั่วคราว + replace: ถ้าถูกขัดจังหวะระหว่างเขียน output เดิมยังอยู่ครบ
+        temporary = output.with_name(output.name + ".tmp")
+        temporary.write_bytes(compacted)
+        os.replace(temporary, output)
+    return done
+
+
+# --- Worker process -------------------------------------------------------
+
+_worker = {}
+
+
+def init_worker():
+    # โหลด parser / TextRank ครั้งเดียวต่อ process
+    from backend.app.summarizer.file_processor import FileProcessor
+    from backend.app.summarizer.summarization_model import SummarizationModel
+    from backend.app.summarizer.text_processor import TextProcessor
+
+    _worker["file_processor"] = FileProcessor(pdf_workers=0)
+    _worker["text_processor"] = TextProcessor()
+    _worker["summarization_model"] = SummarizationModel()
+
+
+def process_file(identity: dict, num_sentences: int, max_chars: int | None, max_file_size: int) -> dict:
+    """Extract + Basic engine for one file (runs in a worker process). Never raises: errors become records."""
+    from fastapi import HTTPException, UploadFile
+    from starlette.datastructures import Headers
+
+    started = time.perf_counter()
+    path = Path(identity["path"])
+    record = {**identity, "filename": path.name}
+
+    def result(status: str, **fields) -> dict:
+        return {**record, "status": status, **fields, "elapsed_ms": round((time.perf_counter() - started) * 1000)}
+
+    try:
+        if identity["size"] > max_file_size:
+            return result("skipped", error=f"larger than {max_file_size // (1024 * 1024)}MB")
+        content = path.read_bytes()
+        content_type = CONTENT_TYPES[path.suffix.lower()]
+        upload = UploadFile(file=io.BytesIO(content), filename=path.name, headers=Headers({"content-type": content_type}))
+        extraction = {}
+        text = asyncio.run(_worker["file_processor"].extract_text_from_file(
+            upload, max_chars=max_chars, info=extraction, content=content,
+        ))
+        record["extraction"] = extraction
+        record["extracted_text_length"] = len(text)
+        if not text:
+            scanned = content_type == "application/pdf" or content_type.startswith("image/")
+            return result("needs_ocr" if scanned else "empty")
+
+        processed_text = _worker["text_processor"].clean_text(text)
+        basic_result = _worker["summarization_model"].summarize(processed_text, num_sentences=num_sentences)
+        if isinstance(basic_result, dict):
+            record["basic_summary"], record["basic_metrics"] = basic_result.get("summary", ""), basic_result.get("metrics")
+        else:
+            record["basic_summary"], record["basic_metrics"] = str(basic_result), None
+        return result("ok", text=text)
+    except HTTPException as e:
+        return result("error", error=str(e.detail))
+    except Exception as e:
+        return result("error", error=f"{type(e).__name__}: {e}")
+
+
+# --- Driver ---------------------------------------------------------------
+
+def configure_ai_environment(args):
+    # Must run before backend.app.main is imported: scheduler, deadlines and Mongo are read at import time
+    os.environ["MONGO_DETAILS"] = args.mongo
+    os.environ["LLM_MODEL_RPM"] = str(args.ai_rpm)
+    os.environ["AI_DEADLINE_SECONDS"] = str(args.ai_deadline)
+    os.environ["AI_MAP_REDUCE_DEADLINE_SECONDS"] = str(args.ai_deadline)
+    # ในงาน batch รอคิว rate limit ได้ (ดีกว่าข้ามไปโมเดลถัดไปแล้วล้มเหลว)
+    os.environ["LLM_MAX_QUEUE_WAIT_SECONDS"] = str(args.ai_deadline)
+
+
+async def run(args) -> dict:
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    done = load_done(output, require_ai=args.ai)
+    files = [identity for identity in map(file_identity, find_files(args.inputs))
+             if (identity["path"], identity["size"], identity["mtime"]) not in done]
+    counts = {"found": len(files) + len(done), "already_done": len(done), "ok": 0, "empty": 0,
+              "needs_ocr": 0, "skipped": 0, "error": 0, "ai_failed": 0}
+    print(f"Batch: {len(files)} files to process ({len(done)} already in {output})", file=sys.stderr)
+    if not files:
+        return counts
+
+    ai = None
+    if args.ai:
+        configure_ai_environment(args)
+        from backend.app import main as ai
+        if not ai.llm_client.is_available():
+            raise SystemExit("AI engine is not available (check GOOGLE_API_KEY / LLM_BACKEND)")
+    ai_semaphore = asyncio.Semaphore(args.ai_concurrency)
+
+    loop = asyncio.get_running_loop()
+    # spawn เหมือน process pool ของ FileProcessor (fork ไม่ปลอดภัยเมื่อมี thread อยู่แล้ว)
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker,
+    )
+    # FileProcessor ปฏิเสธไฟล์ที่ใหญ่กว่า MAX_FILE_SIZE อยู่แล้ว: ข้ามไฟล์เหล่านั้นแทนที่จะนับเป็น error
+    from backend.app.summarizer.file_processor import FileProcessor
+    max_file_size = FileProcessor.MAX_FILE_SIZE
+    if args.max_file_mb:
+        max_file_size = min(max_file_size, int(args.max_file_mb * 1024 * 1024))
+    pending = iter(files)
+    in_flight: set[asyncio.Future] = set()
+    started = time.perf_counter()
+
+    def submit_next() -> bool:
+        identity = next(pending, None)
+        if identity is None:
+            return False
+        in_flight.add(asyncio.ensure_future(finish(loop.run_in_executor(
+            pool, process_file, identity, args.num_sentences, args.max_chars, max_file_size,
+        ))))
+        return True
+
+    async def finish(extracted: asyncio.Future) -> dict:
+        record = await extracted
+        text = record.pop("text", None)
+        if ai is not None and record["status"] == "ok":
+            async with ai_semaphore:
+                record["ai_summary"], record["ai_input"] = await ai.summarize_document_with_ai(
+                    text, args.num_sentences, mode=args.ai_mode,
+                )
+            record["ai_status"] = ai.ai_status_of(record["ai_summary"])
+        if args.include_text and text is not None:
+            record["text"] = text
+        return record
+
+    try:
+        with open(output, "a", encoding="utf-8") as out:
+            # ส่งงานเข้า pool ทีละช่วง (ไม่สร้าง future ของทุกไฟล์ในคลังพร้อมกัน)
+            while len(in_flight) < args.workers * 2 + args.ai_concurrency and submit_next():
+                pass
+            processed = 0
+            while in_flight:
+                finished, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    in_flight.discard(future)
+                    record = future.result()
+                    # หนึ่งบรรทัดต่อไฟล์ เขียนทันทีเพื่อให้ resume ได้หลังถูกขัดจังหวะ
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    counts[record["status"]] += 1
+                    if record.get("ai_status") not in (None, "ok"):
+                        counts["ai_failed"] += 1
+                    processed += 1
+                    submit_next()
+                    if record["status"] == "error":
+                        print(f"  error: {record['path']}: {record['error']}", file=sys.stderr)
+                    elif record.get("ai_status") not in (None, "ok"):
+                        print(f"  ai {record['ai_status']}: {record['path']} (retried on the next run)", file=sys.stderr)
+                    if processed % 50 == 0 or processed == len(files):
+                        rate = processed / (time.perf_counter() - started)
+                        print(f"  {processed}/{len(files)} files ({rate:.1f}/s)", file=sys.stderr)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+        if ai is not None:
+            await ai.stop_file_processor()
+    return counts
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        counts = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("Interrupted: finished files are in the output, run the same command again to resume", file=sys.stderr)
+        raise SystemExit(130)
+    print(json.dumps(counts), file=sys.stderr)
+    if counts["error"] or counts["ai_failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
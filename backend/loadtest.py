@@ -0,0 +1,170 @@
+"""
+Offline load driver for the summarizer API.
+
+Runs the ASGI app in-process with the simulated LLM backend and the in-memory
+Mongo stand-in, so no Gemini quota or MongoDB server is needed, and reports
+throughput and p50/p95/p99 latency per route.
+
+Needs the dev requirements (httpx): pip install -r backend/requirements-dev.txt
+
+Usage (from the repository root):
+    python -m backend.loadtest --requests 200 --concurrency 20
+    python -m backend.loadtest --routes summarize,evaluate --sim-429-rate 0.1 --sim-latency-ms 1500
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+
+SAMPLE_TEXT = (
+    "ประเทศไทยเป็นประเทศที่มีประวัติศาสตร์ยาวนาน มีวัฒนธรรมที่หลากหลายและสวยงาม "
+    "เมืองหลวงของประเทศไทยคือกรุงเทพมหานคร ซึ่งเป็นเมืองที่มีประชากรมากที่สุดในประเทศ "
+    "เศรษฐกิจของประเทศไทยขึ้นอยู่กับการท่องเที่ยว การเกษตร และการส่งออกสินค้าอุตสาหกรรม\n"
+) * 20
+
+ROUTES = ("summarize", "summarize-file", "evaluate")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test for the summarizer API")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent in-flight requests per route")
+    parser.add_argument("--routes", default=",".join(ROUTES), help=f"Comma separated subset of {ROUTES}")
+    parser.add_argument("--text-file", default=None, help="Input text (defaults to test_document.txt or a built-in sample)")
+    parser.add_argument("--num-sentences", type=int, default=5)
+    parser.add_argument("--anonymous", action="store_true", help="Do not send a JWT (skips history inserts)")
+    parser.add_argument("--use-cache", action="store_true", help="Allow result cache hits (bypassed by default)")
+    parser.add_argument("--sim-latency-ms", type=float, default=800)
+    parser.add_argument("--sim-latency-sigma", type=float, default=0.4)
+    parser.add_argument("--sim-429-rate", type=float, default=0.0)
+    parser.add_argument("--sim-404-rate", type=float, default=0.0)
+    parser.add_argument("--sim-output-chars", type=int, default=600)
+    parser.add_argument("--sim-dead-models", default="", help="Comma separated models that always return 404")
+    parser.add_argument("--model-rpm", type=float, default=0, help="LLM_MODEL_RPM for the scheduler (0 = no client-side rate limit)")
+    parser.add_argument("--mongo", default="memory://", help="MONGO_DETAILS for the run (default: in-memory stand-in)")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    # Must run before the app is imported: backends and Mongo client are built at import time
+    os.environ["LLM_BACKEND"] = "simulated"
+    os.environ["MONGO_DETAILS"] = args.mongo
+    os.environ["SIM_LLM_LATENCY_MS"] = str(args.sim_latency_ms)
+    os.environ["SIM_LLM_LATENCY_SIGMA"] = str(args.sim_latency_sigma)
+    os.environ["SIM_LLM_429_RATE"] = str(args.sim_429_rate)
+    os.environ["SIM_LLM_404_RATE"] = str(args.sim_404_rate)
+    os.environ["SIM_LLM_OUTPUT_CHARS"] = str(args.sim_output_chars)
+    os.environ["SIM_LLM_DEAD_MODELS"] = args.sim_dead_models
+    os.environ["LLM_MODEL_RPM"] = str(args.model_rpm)
+
+
+def load_text(path: str | None) -> str:
+    candidate = Path(path or "test_document.txt")
+    if candidate.exists():
+        return candidate.read_text(encoding="utf-8")
+    return SAMPLE_TEXT
+
+
+def build_request(route: str, text: str, num_sentences: int, use_cache: bool = False) -> dict:
+    # Every request repeats the same text, so the result cache would otherwise answer all but the first
+    no_cache = not use_cache
+    if route == "summarize":
+        return {"method": "POST", "url": "/summarize", "json": {"text": text, "num_sentences": num_sentences, "no_cache": no_cache}}
+    if route == "summarize-file":
+        return {
+            "method": "POST",
+            "url": "/summarize-file",
+            "files": {"file": ("loadtest.txt", text.encode("utf-8"), "text/plain")},
+            "data": {"num_sentences": str(num_sentences), "no_cache": str(no_cache).lower()},
+        }
+    if route == "evaluate":
+        return {"method": "POST", "url": "/evaluate", "json": {"original_text": text, "summary_text": text[:500]}}
+    raise ValueError(f"Unknown route: {route}")
+
+
+async def run_route(client, route: str, request: dict, total: int, concurrency: int, headers: dict) -> dict:
+    latencies = []
+    statuses = defaultdict(int)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(headers=headers, **request)
+                statuses[response.status_code] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "route": route,
+        "requests": total,
+        "ok": statuses.get(200, 0),
+        "statuses": dict(statuses),
+        "throughput": total / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def print_report(results: list[dict]):
+    print()
+    print(f"{'route':<16}{'reqs':>7}{'ok':>7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for r in results:
+        print(
+            f"{r['route']:<16}{r['requests']:>7}{r['ok']:>7}{r['throughput']:>10.1f}"
+            f"{r['p50'] * 1000:>10.0f}{r['p95'] * 1000:>10.0f}{r['p99'] * 1000:>10.0f}  {r['statuses']}"
+        )
+
+
+async def main():
+    args = parse_args()
+    configure_environment(args)
+
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("The load driver needs httpx: pip install httpx")
+
+    from backend.app.main import app
+    from backend.app.auth.auth_handler import sign_jwt
+
+    for handler in app.router.on_startup:
+        try:
+            await handler()
+        except Exception as e:
+            print(f"WARNING: Startup handler {handler.__name__} failed: {e}")
+
+    text = load_text(args.text_file)
+    headers = {} if args.anonymous else {"Authorization": f"Bearer {sign_jwt('loadtest-user')['access_token']}"}
+    routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        for route in routes:
+            request = build_request(route, text, args.num_sentences, use_cache=args.use_cache)
+            results.append(await run_route(client, route, request, args.requests, args.concurrency, headers))
+
+    print_report(results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
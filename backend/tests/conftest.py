@@ -0,0 +1,45 @@
+"""
+Shared settings for the backend tests: in-memory Mongo stand-in and the simulated LLM backend,
+set before backend.app.main is imported (it reads its configuration at import time),
+plus the `api` fixture (in-process HTTP client) and auth_header() for logged-in requests.
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+
+os.environ.setdefault("MONGO_DETAILS", "memory://")
+os.environ.setdefault("LLM_BACKEND", "simulated")
+os.environ.setdefault("SIM_LLM_LATENCY_MS", "5")
+os.environ.setdefault("SIM_LLM_LATENCY_SIGMA", "0")
+os.environ.setdefault("LLM_MODEL_RPM", "0")
+
+
+class Api:
+    """In-process HTTP client for backend.app.main (one event loop per request or per scenario)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def run(self, scenario):
+        """Run `await scenario(client)` with one client, for multi-step flows that share the event loop"""
+        async def main():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+                return await scenario(client)
+        return asyncio.run(main())
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return self.run(lambda client: client.request(method, url, **kwargs))
+
+
+@pytest.fixture
+def api() -> Api:
+    from backend.app import main
+    return Api(main.app)
+
+
+def auth_header(user_id: str) -> dict:
+    from backend.app.auth.auth_handler import sign_jwt
+    return {"Authorization": f"Bearer {sign_jwt(user_id)['access_token']}"}
@@ -0,0 +1,53 @@
+"""
+AI deadline budget: a slow model never holds a request past AI_DEADLINE_SECONDS; the basic
+summary is still returned and the timeout is reported (and not cached).
+"""
+import time
+
+import pytest
+
+from backend.app import main
+from backend.app.llm.backends import SimulatedBackend
+
+TEXT = "The ferry leaves at noon. Cars board first. Foot passengers wait at gate two. " * 6
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(main.llm_client, "breakers", {})
+
+    def install(**kwargs) -> SimulatedBackend:
+        simulated = SimulatedBackend(latency_sigma=0, **kwargs)
+        monkeypatch.setattr(main.llm_client, "backend", simulated)
+        return simulated
+
+    return install
+
+
+def test_slow_model_times_out_within_the_budget(api, backend, monkeypatch):
+    backend(latency_ms=5000)
+    monkeypatch.setattr(main, "AI_DEADLINE_SECONDS", 0.3)
+    text = TEXT + "Deadline marker."
+
+    started = time.monotonic()
+    response = api.request("POST", "/summarize", json={"text": text, "num_sentences": 2})
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ai_status"] == "timeout" and body["basic_summary"]
+    assert elapsed < 2
+    # a timeout is not cached: the next request asks the AI again
+    backend(latency_ms=5)
+    retry = api.request("POST", "/summarize", json={"text": text, "num_sentences": 2}).json()
+    assert retry["cached"] is False and retry["ai_status"] == "ok"
+
+
+def test_failing_model_falls_through_to_the_next(api, backend):
+    text = TEXT + "Fallback marker."
+    # the order depends on the text length (lite models first for short texts)
+    first = main.model_router.order("summary", len(text))[0]
+    simulated = backend(latency_ms=5, dead_models=[first])
+    response = api.request("POST", "/summarize", json={"text": text, "no_cache": True})
+    assert response.status_code == 200 and response.json()["ai_status"] == "ok"
+    assert simulated.calls == 2
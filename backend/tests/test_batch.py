@@ -0,0 +1,95 @@
+"""
+Offline batch CLI: resume skips finished files, and with --ai a file whose AI summary failed
+is not finished (the next run retries it and replaces its record).
+"""
+import asyncio
+import json
+
+from backend import batch
+from backend.app import main
+
+TEXT = "The library opens at nine. Members can borrow ten books. Late returns pay a small fee. " * 5
+
+
+def run_batch(tmp_path, *extra) -> tuple[dict, list[dict]]:
+    output = tmp_path / "out.jsonl"
+    args = batch.parse_args([str(tmp_path / "docs"), "--output", str(output), "--workers", "1", *extra])
+    counts = asyncio.run(batch.run(args))
+    return counts, [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_load_done_requires_successful_ai_only_with_ai(tmp_path):
+    output = tmp_path / "out.jsonl"
+    records = [
+        {"path": "a", "size": 1, "mtime": 1, "status": "ok", "ai_status": "ok"},
+        {"path": "b", "size": 1, "mtime": 1, "status": "ok", "ai_status": "error"},
+        {"path": "c", "size": 1, "mtime": 1, "status": "ok"},
+        {"path": "d", "size": 1, "mtime": 1, "status": "needs_ocr"},
+        {"path": "e", "size": 1, "mtime": 1, "status": "error"},
+    ]
+    # the last line was cut off by an interruption
+    output.write_text("".join(json.dumps(r) + "\n" for r in records) + '{"path": "f", "sta', encoding="utf-8")
+
+    assert {path for path, _, _ in batch.load_done(output)} == {"a", "b", "c", "d"}
+    assert {path for path, _, _ in batch.load_done(output, require_ai=True)} == {"a", "d"}
+    assert output.read_text(encoding="utf-8").endswith("\n")
+
+
+def test_rerun_skips_finished_files(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.txt").write_text(TEXT, encoding="utf-8")
+    (tmp_path / "docs" / "empty.txt").write_text("", encoding="utf-8")
+
+    counts, records = run_batch(tmp_path)
+    assert counts["ok"] == 1 and counts["already_done"] == 0
+    assert {record["status"] for record in records} == {"ok", "empty"}
+    assert next(record for record in records if record["status"] == "ok")["basic_summary"]
+
+    counts, records = run_batch(tmp_path)
+    assert counts["ok"] == 0 and counts["already_done"] == 2
+    assert len(records) == 2
+
+
+def test_files_over_the_processor_limit_are_skipped(tmp_path, monkeypatch):
+    from backend.app.summarizer.file_processor import FileProcessor
+
+    monkeypatch.setattr(FileProcessor, "MAX_FILE_SIZE", 1024)
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "big.txt").write_text(TEXT * 10, encoding="utf-8")
+
+    # a larger --max-file-mb does not let the file through to a FileProcessor error
+    counts, records = run_batch(tmp_path, "--max-file-mb", "50")
+    assert counts["skipped"] == 1 and counts["error"] == 0
+    assert records[0]["status"] == "skipped"
+
+def test_failed_ai_summary_is_retried_on_the_next_run(tmp_path, monkeypatch):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.txt").write_text(TEXT, encoding="utf-8")
+    # AI engine in-process (the app module is shared with the other tests: keep its settings and executors)
+    monkeypatch.setattr(batch, "configure_ai_environment", lambda args: None)
+
+    async def no_shutdown():
+        pass
+
+    monkeypatch.setattr(main, "stop_file_processor", no_shutdown)
+
+    async def failing_ai(text, num_sentences, mode="compress", session=None):
+        return "AI Service Error: All models failed. Details: boom", {"mode": mode}
+
+    monkeypatch.setattr(main, "summarize_document_with_ai", failing_ai)
+    counts, records = run_batch(tmp_path, "--ai")
+    assert counts["ok"] == 1 and counts["ai_failed"] == 1
+    assert records[-1]["status"] == "ok" and records[-1]["ai_status"] == "error"
+
+    async def working_ai(text, num_sentences, mode="compress", session=None):
+        return "- a fine summary", {"mode": mode}
+
+    monkeypatch.setattr(main, "summarize_document_with_ai", working_ai)
+    counts, records = run_batch(tmp_path, "--ai")
+    assert counts["already_done"] == 0 and counts["ok"] == 1 and counts["ai_failed"] == 0
+    # the failed record was replaced, not followed by a second one
+    assert len(records) == 1 and records[0]["ai_status"] == "ok"
+
+    # now finished: nothing left to do
+    counts, _ = run_batch(tmp_path, "--ai")
+    assert counts["already_done"] == 1 and counts["ok"] == 0
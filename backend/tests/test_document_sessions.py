@@ -0,0 +1,43 @@
+"""
+Document sessions (/documents): one upload per owner and document, visible only to its owner.
+"""
+from conftest import auth_header
+
+from backend.app import main
+
+PDF = b"%PDF-1.4 session test document"
+
+
+def test_sessions_are_reused_per_owner_and_hidden_from_others(api):
+    owner, other = auth_header("doc-owner"), auth_header("doc-other")
+
+    async def scenario(client):
+        session = await main.document_sessions.open(PDF, "application/pdf", owner_id="doc-owner")
+        again = await main.document_sessions.open(PDF, "application/pdf", owner_id="doc-owner")
+        foreign = await main.document_sessions.open(PDF, "application/pdf", owner_id="doc-other")
+        url = f"/documents/{session.session_id}"
+        responses = {
+            "owner": await client.get(url, headers=owner),
+            "other": await client.get(url, headers=other),
+            "anonymous": await client.get(url),
+            "evaluate_other": await client.post(
+                "/evaluate", json={"summary_text": "x", "session_id": session.session_id}, headers=other,
+            ),
+            "delete_other": await client.delete(url, headers=other),
+            "delete_owner": await client.delete(url, headers=owner),
+            "after_delete": await client.get(url, headers=owner),
+        }
+        main.document_sessions.close(foreign.session_id)
+        return session, again, foreign, responses
+
+    session, again, foreign, responses = api.run(scenario)
+    assert again.session_id == session.session_id
+    # the same bytes opened by another user get a session of their own
+    assert foreign.session_id != session.session_id
+    assert responses["owner"].status_code == 200
+    assert responses["owner"].json()["session_id"] == session.session_id
+    assert responses["other"].status_code == 404 and responses["anonymous"].status_code == 404
+    assert responses["evaluate_other"].status_code == 404
+    assert responses["delete_other"].status_code == 404
+    assert responses["delete_owner"].status_code == 200
+    assert responses["after_delete"].status_code == 404
@@ -0,0 +1,62 @@
+"""
+The streaming DOCX reader returns the same paragraphs as docx2txt (headers, body, footers).
+
+Run from the repository root:  python -m pytest backend/tests
+"""
+import io
+import zipfile
+
+import pytest
+
+from backend.app.summarizer.docx_reader import iter_docx_paragraphs
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def paragraphs_xml(*texts: str) -> str:
+    return "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in texts)
+
+
+def make_docx(body: list[str], headers: dict[str, list[str]] | None = None, footers: dict[str, list[str]] | None = None) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, texts in (footers or {}).items():
+            archive.writestr(f"word/{name}", f"<w:ftr {W_NS}>{paragraphs_xml(*texts)}</w:ftr>")
+        archive.writestr(
+            "word/document.xml",
+            f"<w:document {W_NS}><w:body>{paragraphs_xml(*body)}"
+            f"<w:tbl><w:tr><w:tc>{paragraphs_xml('cell')}</w:tc></w:tr></w:tbl></w:body></w:document>",
+        )
+        for name, texts in (headers or {}).items():
+            archive.writestr(f"word/{name}", f"<w:hdr {W_NS}>{paragraphs_xml(*texts)}</w:hdr>")
+    return buffer.getvalue()
+
+
+def test_headers_body_and_footers_in_docx2txt_order():
+    content = make_docx(
+        ["First paragraph", "Second paragraph"],
+        headers={"header2.xml": ["Header two"], "header1.xml": ["Header one"]},
+        footers={"footer1.xml": ["Page footer"]},
+    )
+    assert list(iter_docx_paragraphs(content)) == [
+        "Header one", "Header two", "First paragraph", "Second paragraph", "cell", "Page footer",
+    ]
+
+
+def test_matches_docx2txt():
+    docx2txt = pytest.importorskip("docx2txt")
+    content = make_docx(
+        ["สวัสดีครับ", "Body text"],
+        headers={"header1.xml": ["Company name"]},
+        footers={"footer1.xml": ["Confidential"], "footer2.xml": ["Page 1"]},
+    )
+    expected = [line.strip() for line in docx2txt.process(io.BytesIO(content)).splitlines() if line.strip()]
+    assert list(iter_docx_paragraphs(content)) == expected
+
+
+def test_missing_document_part():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/header1.xml", f"<w:hdr {W_NS}/>")
+    with pytest.raises(KeyError):
+        list(iter_docx_paragraphs(buffer.getvalue()))
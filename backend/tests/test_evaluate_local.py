@@ -0,0 +1,42 @@
+"""
+Local evaluation (/evaluate mode=local, /evaluate/batch): deterministic ROUGE and keyword coverage.
+"""
+from backend.app import main
+
+ORIGINAL = "The river floods every spring. Farmers plant rice after the flood. The rice harvest feeds the town."
+
+
+def test_local_mode_scores_without_the_ai(api):
+    copy = api.request("POST", "/evaluate", json={"mode": "local", "original_text": ORIGINAL, "summary_text": ORIGINAL})
+    partial = api.request(
+        "POST", "/evaluate", json={"mode": "local", "original_text": ORIGINAL, "summary_text": "Farmers plant rice."},
+    )
+    assert copy.status_code == partial.status_code == 200
+    assert copy.json()["mode"] == "local"
+    assert copy.json()["rouge_l"]["f1"] == 1.0 and copy.json()["keyword_coverage"] == 1.0
+    scores = partial.json()
+    assert 0 < scores["rouge_1"]["recall"] < scores["rouge_1"]["precision"]
+    assert scores["tokens"]["summary"] < scores["tokens"]["original"]
+    # deterministic: the same pair scores the same
+    again = api.request(
+        "POST", "/evaluate", json={"mode": "local", "original_text": ORIGINAL, "summary_text": "Farmers plant rice."},
+    )
+    assert again.json() == scores
+
+
+def test_local_mode_validation(api):
+    assert api.request("POST", "/evaluate", json={"mode": "local", "summary_text": "x"}).status_code == 400
+    assert api.request("POST", "/evaluate", json={"mode": "magic", "summary_text": "x"}).status_code == 400
+
+
+def test_batch_scores_each_pair_in_order(api, monkeypatch):
+    items = [{"original_text": ORIGINAL, "summary_text": ORIGINAL}, {"original_text": ORIGINAL, "summary_text": "Snow."}]
+    response = api.request("POST", "/evaluate/batch", json={"items": items})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["mode"], body["count"]) == ("local", 2)
+    assert body["results"][0]["rouge_1"]["f1"] == 1.0 and body["results"][1]["rouge_1"]["f1"] == 0.0
+
+    assert api.request("POST", "/evaluate/batch", json={"items": []}).status_code == 400
+    monkeypatch.setattr(main, "EVAL_BATCH_MAX_ITEMS", 1)
+    assert api.request("POST", "/evaluate/batch", json={"items": items}).status_code == 400
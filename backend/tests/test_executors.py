@@ -0,0 +1,41 @@
+"""
+Workload executors: a saturated pool queues only its own work, and /health reports every pool.
+"""
+import asyncio
+import threading
+
+from backend.app import main
+from backend.app.workers.executors import WorkloadExecutor
+
+
+def test_busy_pool_does_not_delay_another_pool():
+    llm, cpu = WorkloadExecutor("llm-test", 2), WorkloadExecutor("cpu-test", 1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(llm.run(release.wait, 5)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        llm_stats = llm.stats()
+        # the llm pool is full, the cpu pool still answers at once
+        ranked = await asyncio.wait_for(cpu.run(sorted, [3, 1, 2]), 1)
+        release.set()
+        await asyncio.gather(*blocked)
+        return llm_stats, ranked
+
+    try:
+        llm_stats, ranked = asyncio.run(scenario())
+    finally:
+        release.set()
+        llm.shutdown()
+        cpu.shutdown()
+
+    assert ranked == [1, 2, 3]
+    assert (llm_stats["active"], llm_stats["queued"]) == (2, 2)
+    assert llm.stats()["completed"] == 4 and llm.stats()["queued"] == 0
+
+
+def test_health_reports_each_pool(api):
+    executors = api.request("GET", "/health").json()["executors"]
+    assert set(executors) == set(main.executors)
+    for stats in executors.values():
+        assert {"workers", "queued", "active", "wait_ms_p95", "run_ms_p95"} <= set(stats)
@@ -0,0 +1,40 @@
+"""
+Extraction cache: the same file bytes are not parsed twice, other bytes or read limits are.
+"""
+from backend.app import main
+
+TEXT = "Extraction results are cached by file hash. Parsing a large PDF is slow. The summary step still runs. " * 5
+
+
+def test_same_bytes_skip_extraction(api, monkeypatch):
+    calls = []
+    extract = main.extract_uploaded_text
+
+    async def counting(*args, **kwargs):
+        calls.append(args[0].filename)
+        return await extract(*args, **kwargs)
+
+    monkeypatch.setattr(main, "extract_uploaded_text", counting)
+    content = (TEXT + "Extraction marker.").encode()
+
+    def upload(filename: str, data: bytes, **form):
+        response = api.request(
+            "POST", "/summarize-file", files={"file": (filename, data, "text/plain")}, data={"num_sentences": "2", **form},
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    first = upload("a.txt", content)
+    # different options: the summary is recomputed, the extracted text comes from the cache
+    second = upload("b.txt", content, num_sentences="3")
+    limited = upload("c.txt", content, max_chars="100")
+    bypass = upload("d.txt", content, no_cache="true")
+    edited = upload("e.txt", content + b" One more sentence.")
+
+    assert first["extraction"]["cached"] is False
+    assert second["extraction"]["cached"] is True and second["cached"] is False
+    assert second["extracted_text_length"] == first["extracted_text_length"]
+    assert limited["extraction"]["cached"] is False
+    assert bypass["extraction"]["cached"] is False
+    assert edited["extraction"]["cached"] is False
+    assert calls == ["a.txt", "c.txt", "d.txt", "e.txt"]
@@ -0,0 +1,170 @@
+"""
+FileProcessor PDF extraction: page ranges, the max_chars early stop and OCR of scanned pages.
+PDFs are generated in the test (one line of Helvetica text per page, "" = page without text layer).
+"""
+import asyncio
+import io
+
+import pdfplumber
+import pytest
+from starlette.datastructures import Headers, UploadFile
+
+from backend.app.summarizer.file_processor import FileProcessor
+
+
+def make_pdf(page_texts: list[str]) -> bytes:
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(len(page_texts)))}] /Count {len(page_texts)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET" if text else ""
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out, offsets = b"%PDF-1.4\n", []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def page_text(number: int) -> str:
+    return f"Page {number} has digital text content for extraction testing."
+
+
+def extract(processor: FileProcessor, content: bytes, **kwargs) -> tuple[str, dict]:
+    upload = UploadFile(file=io.BytesIO(content), filename="doc.pdf", headers=Headers({"content-type": "application/pdf"}))
+    info = {}
+    text = asyncio.run(processor.extract_text_from_file(upload, info=info, content=content, **kwargs))
+    return text, info
+
+
+def count_parsed_pages(monkeypatch) -> list[int]:
+    parsed = []
+    extract_text = pdfplumber.page.Page.extract_text
+
+    def counting(page, *args, **kwargs):
+        parsed.append(page.page_number)
+        return extract_text(page, *args, **kwargs)
+
+    monkeypatch.setattr(pdfplumber.page.Page, "extract_text", counting)
+    return parsed
+
+
+def test_page_range_is_honored():
+    content = make_pdf([page_text(i + 1) for i in range(30)])
+    text, info = extract(FileProcessor(), content, page_range=(20, 25))
+    assert (info["first_page"], info["last_page"], info["pages_read"]) == (20, 25, 6)
+    assert page_text(20) in text and page_text(25) in text
+    assert page_text(19) not in text and page_text(26) not in text
+
+
+def test_sequential_max_chars_stops_on_the_page_that_reaches_it(monkeypatch):
+    parsed = count_parsed_pages(monkeypatch)
+    content = make_pdf([page_text(i + 1) for i in range(40)])
+    per_page = len(page_text(1))
+
+    text, info = extract(FileProcessor(pdf_workers=0), content, max_chars=2 * per_page + 1)
+
+    assert info["stopped_early"] is True
+    assert info["pages_read"] == 3
+    # pages after the budget are not even parsed (not the rest of a 16-page range)
+    assert parsed == [1, 2, 3]
+    assert page_text(3) in text and page_text(4) not in text
+
+
+def test_slice_pdf_keeps_only_the_requested_pages():
+    content = make_pdf([page_text(i + 1) for i in range(5)])
+    sliced = FileProcessor().slice_pdf(content, 2, 3)
+    with pdfplumber.open(io.BytesIO(sliced)) as pdf:
+        texts = [page.extract_text() for page in pdf.pages]
+    assert texts == [page_text(2), page_text(3)]
+
+
+def test_whole_file_ocr_fallback_only_sends_the_requested_pages(monkeypatch):
+    import httpx
+
+    from backend.app import main
+
+    if main.FILE_PROCESSOR_MODE != "full":
+        pytest.skip("page ranges need FILE_PROCESSOR_MODE=full")
+    sent = []
+
+    async def failing_page_ocr(image, page_number):
+        raise RuntimeError("page OCR unavailable")
+
+    async def whole_file_ocr(file_bytes, mime_type, session=None):
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            sent.append(len(pdf.pages))
+        return "Text read by OCR from the selected pages. " * 5
+
+    monkeypatch.setattr(main, "ocr_pdf_page", failing_page_ocr)
+    monkeypatch.setattr(main, "perform_ocr_with_gemini", whole_file_ocr)
+    scanned = make_pdf(["", "", "", "", ""])
+
+    async def send():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            return await client.post(
+                "/summarize-file",
+                files={"file": ("scan.pdf", scanned, "application/pdf")},
+                data={"page_from": "2", "page_to": "3", "no_cache": "true"},
+            )
+
+    response = asyncio.run(send())
+    assert response.status_code == 200, response.text
+    extraction = response.json()["extraction"]
+    assert (extraction["first_page"], extraction["last_page"], extraction["ocr"]) == (2, 3, "document")
+    assert sent == [2]
+
+
+def test_only_scanned_pages_of_a_mixed_pdf_are_ocred(api, monkeypatch):
+    from backend.app import main
+
+    if main.FILE_PROCESSOR_MODE != "full":
+        pytest.skip("page OCR needs FILE_PROCESSOR_MODE=full")
+    ocred = []
+
+    async def page_ocr(image, page_number):
+        ocred.append(page_number)
+        return f"Scanned page {page_number} read by OCR."
+
+    monkeypatch.setattr(main, "ocr_pdf_page", page_ocr)
+    mixed = make_pdf([page_text(1), "", page_text(3), "", page_text(5)])
+
+    response = api.request(
+        "POST", "/summarize-file", files={"file": ("mixed.pdf", mixed, "application/pdf")}, data={"no_cache": "true"},
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert sorted(ocred) == [2, 4]
+    assert body["ocr_pages"] == 2 and body["extraction"]["ocr"] == "pages"
+    expected = [page_text(1), "Scanned page 2 read by OCR.", page_text(3), "Scanned page 4 read by OCR.", page_text(5)]
+    assert body["extracted_text_length"] == len("\n".join(expected))
+
+
+def test_parallel_extraction_matches_sequential():
+    content = make_pdf([page_text(i + 1) if i % 7 else "" for i in range(40)])
+    parallel = FileProcessor(pdf_workers=2)
+    try:
+        parallel_text, parallel_info = extract(parallel, content)
+
+        async def collect():
+            return [index async for index, _ in parallel.iter_pdf_pages(content)]
+        streamed = asyncio.run(collect())
+    finally:
+        parallel.shutdown()
+    sequential_text, sequential_info = extract(FileProcessor(pdf_workers=0), content)
+
+    assert parallel_text == sequential_text
+    assert parallel_info["pages_read"] == sequential_info["pages_read"] == 40
+    # pages arrive in page order, whatever order the ranges finish in
+    assert streamed == list(range(40))
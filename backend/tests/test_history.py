@@ -0,0 +1,53 @@
+"""
+History listing (/api/history/): keyset pagination with X-Next-Cursor, per user, newest first.
+"""
+from datetime import datetime, timedelta, timezone
+
+from conftest import auth_header
+
+from backend.app import main
+
+USER = "history-user"
+
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats(api):
+    headers = auth_header(USER)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    # two items per timestamp, so the _id tie-break decides order across page boundaries
+    items = [
+        {"user_id": USER, "title": f"item {i}", "created_at": start + timedelta(minutes=i // 2),
+         "original_text": "long text", "summary_result": {}, "is_favorite": i == 0}
+        for i in range(7)
+    ]
+
+    async def scenario(client):
+        await main.history_collection.delete_many({"user_id": USER})
+        await main.history_collection.insert_many(items)
+        await main.history_collection.insert_one({"user_id": "someone-else", "title": "not mine", "created_at": start})
+        pages, cursor = [], None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            response = await client.get("/api/history/", params=params, headers=headers)
+            assert response.status_code == 200
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+    pages = api.run(scenario)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    listed = [item for page in pages for item in page]
+    assert len({item["id"] for item in listed}) == 7
+    assert sorted(item["title"] for item in listed) == sorted(item["title"] for item in items)
+    created = [item["created_at"] for item in listed]
+    assert created == sorted(created, reverse=True)
+    # the listing leaves out the heavy fields
+    assert "original_text" not in listed[0] and "summary_result" not in listed[0]
+
+
+def test_invalid_cursor_and_limit(api):
+    headers = auth_header(USER)
+    assert api.request("GET", "/api/history/", params={"cursor": "not-a-cursor"}, headers=headers).status_code == 400
+    assert api.request("GET", "/api/history/", params={"limit": 0}, headers=headers).status_code == 422
+    assert api.request("GET", "/api/history/", params={"limit": 201}, headers=headers).status_code == 422
+    assert api.request("GET", "/api/history/").status_code in (401, 403)
@@ -0,0 +1,43 @@
+"""
+Image uploads: photos are shrunk to grayscale JPEG before OCR, broken images are refused.
+"""
+import io
+
+from PIL import Image
+
+from backend.app import main
+
+
+def png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    # noisy content so PNG cannot compress it to almost nothing
+    Image.effect_noise((width, height), 64).convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_photo_is_preprocessed_before_ocr(api, monkeypatch):
+    opened = []
+    open_session = main.document_sessions.open
+
+    async def recording(data, mime_type, *args, **kwargs):
+        opened.append((data, mime_type))
+        return await open_session(data, mime_type, *args, **kwargs)
+
+    monkeypatch.setattr(main.document_sessions, "open", recording)
+    monkeypatch.setattr(main.file_processor, "OCR_MAX_SIDE", 1000)
+    photo = png(1800, 1200)
+    response = api.request(
+        "POST", "/summarize-file", files={"file": ("scan.png", photo, "image/png")}, data={"no_cache": "true"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["extraction"]["ocr"] == "document"
+    [(data, mime_type)] = opened
+    assert mime_type == "image/jpeg" and len(data) < len(photo)
+    with Image.open(io.BytesIO(data)) as sent:
+        assert sent.mode == "L" and sent.size == (1000, 667)
+
+
+def test_broken_image_is_rejected(api):
+    response = api.request("POST", "/summarize-file", files={"file": ("scan.jpg", b"not really a jpeg", "image/jpeg")})
+    assert response.status_code == 400
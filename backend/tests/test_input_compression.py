@@ -0,0 +1,53 @@
+"""
+Input compression: documents over AI_INPUT_TOKEN_BUDGET are reduced before the prompt is sent,
+short ones go out unchanged; the response reports what was done in ai_input.
+"""
+import pytest
+
+from backend.app import main
+from backend.app.llm.backends import SimulatedBackend
+
+
+class PromptRecordingBackend(SimulatedBackend):
+    def __init__(self):
+        super().__init__(latency_ms=5, latency_sigma=0)
+        self.prompts = []
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        self.prompts.append(contents)
+        return await super().generate_content_async(model_name, contents, task)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    recording = PromptRecordingBackend()
+    monkeypatch.setattr(main.llm_client, "breakers", {})
+    monkeypatch.setattr(main.llm_client, "backend", recording)
+    return recording
+
+
+def long_document(sentences: int) -> str:
+    topics = ["harbour", "railway", "market", "school", "river", "bridge", "library", "stadium"]
+    return " ".join(
+        f"Report {i} says the {topics[i % len(topics)]} budget grew by {i % 17} percent in district {i % 23}."
+        for i in range(sentences)
+    )
+
+
+def test_long_document_is_compressed_to_the_budget(api, backend):
+    text = long_document(450)
+    response = api.request("POST", "/summarize", json={"text": text, "no_cache": True, "ai_mode": "compress"})
+    assert response.status_code == 200
+    report = response.json()["ai_input"]
+    assert report["mode"] == "compress" and report["ratio"] < 1
+    assert report["original_tokens"] > main.AI_INPUT_TOKEN_BUDGET >= report["compressed_tokens"]
+    [prompt] = backend.prompts
+    assert len(prompt) < len(text)
+
+
+def test_short_text_is_sent_whole(api, backend):
+    text = long_document(5)
+    response = api.request("POST", "/summarize", json={"text": text, "no_cache": True})
+    assert response.json()["ai_input"]["ratio"] == 1
+    [prompt] = backend.prompts
+    assert text in prompt
@@ -0,0 +1,117 @@
+"""
+JobQueue: bounded submit, state transitions (cancel vs. running/done) and leases that keep
+a starting process from failing jobs another live process is still running.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from backend.app.database.memory import MemoryCollection
+from backend.app.jobs.job_queue import JobQueue, JobQueueFull
+
+
+def make_queue(collection=None, delay: float = 0.0, **kwargs) -> JobQueue:
+    async def handler(job_id, payload, report):
+        await report("working", step=1)
+        await asyncio.sleep(delay)
+        return {"echo": payload["value"]}
+
+    return JobQueue(collection or MemoryCollection("jobs"), handler, **kwargs)
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, *statuses: str) -> dict:
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job['status']}")
+
+
+def test_job_runs_to_done_with_result():
+    async def scenario():
+        queue = make_queue()
+        job_id = await queue.submit({"value": 7}, user_id="u1", meta={"filename": "a.txt"})
+        job = await wait_for_status(queue, job_id, "done", "error")
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "done"
+    assert job["result"] == {"echo": 7}
+    assert job["user_id"] == "u1"
+
+
+def test_concurrent_submits_do_not_overfill_the_queue():
+    async def scenario():
+        queue = make_queue(workers=0, max_queued=3)
+        results = await asyncio.gather(*(queue.submit({"value": i}) for i in range(8)), return_exceptions=True)
+        await queue.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, JobQueueFull) for r in results) == 5
+    assert sum(isinstance(r, str) for r in results) == 3
+
+
+def test_cancel_queued_job_and_not_finished_one():
+    async def scenario():
+        queue = make_queue(workers=0)
+        queued = await queue.submit({"value": 1})
+        cancelled = await queue.cancel(queued)
+        job = await queue.get(queued)
+        await queue.stop()
+
+        running_queue = make_queue()
+        done = await running_queue.submit({"value": 2})
+        await wait_for_status(running_queue, done, "done")
+        cancelled_done = await running_queue.cancel(done)
+        await running_queue.stop()
+        return cancelled, job["status"], cancelled_done
+
+    assert asyncio.run(scenario()) == (True, "cancelled", False)
+
+
+def test_starting_queue_leaves_jobs_of_live_instances_alone():
+    async def scenario():
+        collection = MemoryCollection("jobs")
+        first = make_queue(collection, delay=0.2)
+        job_id = await first.submit({"value": 1})
+        await wait_for_status(first, job_id, "running")
+
+        # a second process (another uvicorn worker) starts on the same collection
+        second = make_queue(collection)
+        await second.start()
+        while_running = (await first.get(job_id))["status"]
+        finished = await wait_for_status(first, job_id, "done", "error")
+        await first.stop()
+        await second.stop()
+        return while_running, finished["status"]
+
+    assert asyncio.run(scenario()) == ("running", "done")
+
+
+def test_jobs_with_expired_lease_are_failed():
+    async def scenario():
+        collection = MemoryCollection("jobs")
+        now = datetime.now(timezone.utc)
+        await collection.insert_one({
+            "_id": "orphan", "status": "running", "stage": "extracting", "instance_id": "gone",
+            "lease_until": now - timedelta(seconds=5), "created_at": now, "updated_at": now,
+        })
+        await collection.insert_one({
+            "_id": "alive", "status": "running", "stage": "extracting", "instance_id": "other",
+            "lease_until": now + timedelta(seconds=60), "created_at": now, "updated_at": now,
+        })
+        # the job outlives several leases: heartbeats must keep it from being failed
+        queue = make_queue(collection, delay=0.3, lease_seconds=0.06)
+        await queue.start()
+        job_id = await queue.submit({"value": 1})
+        await asyncio.sleep(0.2)
+        statuses = {doc: (await collection.find_one({"_id": doc}))["status"] for doc in ("orphan", "alive", job_id)}
+        await queue.stop()
+        return statuses, job_id
+
+    statuses, job_id = asyncio.run(scenario())
+    assert statuses["orphan"] == "error"
+    assert statuses["alive"] == "running"
+    assert statuses[job_id] == "running"
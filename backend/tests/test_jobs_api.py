@@ -0,0 +1,82 @@
+"""
+/jobs API: submit a file, follow it to the result, visibility per user, cancel and SSE progress.
+"""
+import asyncio
+
+import pytest
+from conftest import auth_header
+
+from backend.app import main
+from backend.app.database.memory import MemoryCollection
+from backend.app.jobs.job_queue import JobQueue
+
+TEXT = ("The library opens at nine. Members can borrow ten books. Late returns pay a small fee. " * 6).encode()
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    # a queue of its own: the app's queue would be bound to the event loop of an earlier test
+    queue = JobQueue(MemoryCollection("jobs"), main.run_file_job, workers=1)
+    monkeypatch.setattr(main, "job_queue", queue)
+    monkeypatch.setattr(main, "save_file_history", lambda *args, **kwargs: asyncio.sleep(0))
+    yield queue
+
+
+def submit(client, headers=None, **data):
+    return client.post(
+        "/jobs/summarize-file", files={"file": ("notes.txt", TEXT, "text/plain")}, data=data, headers=headers or {},
+    )
+
+
+async def wait_done(client, job_id: str, headers: dict) -> dict:
+    for _ in range(300):
+        status = (await client.get(f"/jobs/{job_id}", headers=headers)).json()
+        if status["status"] in ("done", "error", "cancelled"):
+            return status
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job stuck in {status}")
+
+
+def test_job_runs_and_result_is_only_visible_to_its_user(api, jobs):
+    owner = auth_header("u1")
+
+    async def scenario(client):
+        response = await submit(client, owner, num_sentences="2", no_cache="true")
+        assert response.status_code == 202 and response.json()["status"] == "queued"
+        job_id = response.json()["job_id"]
+        status = await wait_done(client, job_id, owner)
+        result = await client.get(f"/jobs/{job_id}/result", headers=owner)
+        anonymous = await client.get(f"/jobs/{job_id}")
+        other = await client.get(f"/jobs/{job_id}/result", headers=auth_header("u2"))
+        events = await client.get(f"/jobs/{job_id}/events", headers=owner)
+        await jobs.stop()
+        return status, result, anonymous.status_code, other.status_code, events.text
+
+    status, result, anonymous, other, events = api.run(scenario)
+    assert (status["status"], status["filename"]) == ("done", "notes.txt")
+    assert result.status_code == 200
+    assert result.json()["basic_summary"] and result.json()["filename"] == "notes.txt"
+    assert anonymous == 404 and other == 404
+    # a finished job sends its last state once and closes the stream
+    assert events.count("event: progress") == 1 and '"status": "done"' in events
+
+
+def test_cancelled_job_has_no_result(api, jobs):
+    async def scenario(client):
+        jobs.workers = 0  # nothing picks the job up: it stays queued
+        job_id = (await submit(client)).json()["job_id"]
+        cancelled = await client.delete(f"/jobs/{job_id}")
+        status = (await client.get(f"/jobs/{job_id}")).json()["status"]
+        result = await client.get(f"/jobs/{job_id}/result")
+        again = await client.delete(f"/jobs/{job_id}")
+        await jobs.stop()
+        return cancelled.status_code, status, result.status_code, again.status_code
+
+    cancelled, status, result, again = api.run(scenario)
+    assert (cancelled, status, result) == (200, "cancelled", 409)
+    assert again == 409
+
+
+def test_job_rejects_invalid_options(api, jobs):
+    assert api.run(lambda client: submit(client, ai_mode="bogus")).status_code == 400
+    assert api.run(lambda client: submit(client, page_from="3", page_to="1")).status_code == 400
@@ -0,0 +1,70 @@
+"""
+Per-model circuit breakers: a missing or quota-exhausted model is skipped for its cool-down
+instead of being called again on every request.
+"""
+import asyncio
+
+import pytest
+
+from backend.app import main
+from backend.app.llm.backends import SimulatedBackend
+from backend.app.llm.client import LLMClient, ModelUnavailable
+
+
+class QuotaBackend(SimulatedBackend):
+    """Answers every call with a 429 that asks to retry in 12s"""
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        self.calls += 1
+        raise Exception(f"429 You exceeded your current quota. model: {model_name} Please retry in 12.0s.")
+
+
+def test_dead_model_is_skipped_on_later_requests(api, monkeypatch):
+    texts = [f"Circuit test {marker}. " * 20 for marker in ("one", "two")]
+    first = main.model_router.order("summary", len(texts[0]))[0]
+    backend = SimulatedBackend(latency_ms=5, latency_sigma=0, dead_models=[first])
+    monkeypatch.setattr(main.llm_client, "breakers", {})
+    monkeypatch.setattr(main.llm_client, "backend", backend)
+
+    for text in texts:
+        response = api.request("POST", "/summarize", json={"text": text, "no_cache": True})
+        assert response.json()["ai_status"] == "ok"
+
+    # the dead model was called once; the second request went straight to the next model
+    assert backend.calls == 3
+    circuit = api.request("GET", "/health").json()["llm_circuits"][first]
+    assert circuit["state"] == "open" and circuit["last_failure"] == "dead"
+
+
+def test_quota_error_opens_the_circuit_for_the_retry_delay():
+    client = LLMClient(QuotaBackend(latency_ms=0))
+
+    async def scenario():
+        with pytest.raises(Exception, match="429"):
+            await client.generate("model-a", "prompt")
+        with pytest.raises(ModelUnavailable):
+            await client.generate("model-a", "prompt")
+
+    asyncio.run(scenario())
+    assert client.backend.calls == 1
+    snapshot = client.breaker("model-a").snapshot()
+    assert snapshot["state"] == "open" and snapshot["last_failure"] == "quota"
+    assert 11 < snapshot["retry_in"] <= 12
+
+
+def test_half_open_circuit_lets_one_trial_through():
+    client = LLMClient(SimulatedBackend(latency_ms=0, latency_sigma=0))
+    breaker = client.breaker("model-a")
+    breaker.open_for(-1)
+    assert breaker.state == "half-open"
+
+    async def scenario():
+        trial = asyncio.ensure_future(client.generate("model-a", "prompt"))
+        await asyncio.sleep(0)
+        # while the trial is in flight, other calls are still rejected
+        with pytest.raises(ModelUnavailable):
+            await client.generate("model-a", "prompt")
+        await trial
+
+    asyncio.run(scenario())
+    assert breaker.state == "closed"
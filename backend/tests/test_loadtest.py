@@ -0,0 +1,35 @@
+"""
+Offline load driver: every route runs against the in-process app and the simulated backend
+without network access, and the report counts statuses and latency percentiles.
+"""
+import asyncio
+
+import httpx
+
+from backend import loadtest
+from backend.app import main
+
+
+def test_every_route_runs_offline():
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            return [
+                await loadtest.run_route(
+                    client, route, loadtest.build_request(route, loadtest.SAMPLE_TEXT, 3), total=4, concurrency=2, headers={},
+                )
+                for route in loadtest.ROUTES
+            ]
+
+    results = asyncio.run(scenario())
+    assert [r["route"] for r in results] == list(loadtest.ROUTES)
+    for result in results:
+        assert result["ok"] == result["requests"] == 4, result["statuses"]
+        assert 0 < result["p50"] <= result["p95"] <= result["p99"]
+
+
+def test_percentile_uses_nearest_rank():
+    values = [0.1 * i for i in range(1, 11)]
+    assert loadtest.percentile(values, 50) == values[4]
+    assert loadtest.percentile(values, 99) == values[-1]
+    assert loadtest.percentile([], 95) == 0.0
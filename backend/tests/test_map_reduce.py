@@ -0,0 +1,135 @@
+"""
+Map-reduce summarization: section size limits, content-anchored boundaries so that editing one
+paragraph leaves the other sections (and their cached partial summaries) unchanged, and the
+ai_mode=map_reduce report of /summarize.
+"""
+import asyncio
+import random
+
+from backend.app import main
+from backend.app.llm.backends import SimulatedBackend
+from backend.app.llm.map_reduce import MapReduceSummarizer, split_sections
+
+SECTION_CHARS = 4000
+OVERLAP_CHARS = 400
+
+
+def make_paragraphs(count: int = 200, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyzกขคงจฉ") for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+    return [f"Paragraph {i} " + " ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) for i in range(count)]
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.data[key] = value
+
+
+def make_summarizer(cache) -> tuple[MapReduceSummarizer, list[str]]:
+    prompts = []
+
+    async def generate(prompt: str, budget: float, text_length: int) -> str:
+        prompts.append(prompt)
+        return f"- summary of {len(prompt)} chars"
+
+    summarizer = MapReduceSummarizer(
+        generate,
+        map_prompt=lambda section, index, total: f"MAP {section}",
+        reduce_prompt=lambda joined, num_sentences: f"REDUCE {joined}",
+        cache=cache,
+        section_chars=SECTION_CHARS,
+        overlap_chars=OVERLAP_CHARS,
+    )
+    return summarizer, prompts
+
+
+def test_sections_fit_and_cover_the_text():
+    paragraphs = make_paragraphs()
+    sections = split_sections("\n\n".join(paragraphs), SECTION_CHARS, OVERLAP_CHARS)
+    assert len(sections) > 10
+    assert max(len(s) for s in sections) <= SECTION_CHARS
+    joined = "\n".join(sections)
+    assert all(paragraph in joined for paragraph in paragraphs)
+
+
+def test_short_text_is_one_section():
+    assert split_sections("  one short text  ", SECTION_CHARS, OVERLAP_CHARS) == ["one short text"]
+    assert split_sections("   ", SECTION_CHARS, OVERLAP_CHARS) == []
+
+
+def test_inserted_paragraph_only_changes_nearby_sections():
+    paragraphs = make_paragraphs()
+    before = split_sections("\n\n".join(paragraphs), SECTION_CHARS, OVERLAP_CHARS)
+    edited = paragraphs[:3] + ["A new paragraph inserted near the start of the document."] + paragraphs[3:]
+    after = split_sections("\n\n".join(edited), SECTION_CHARS, OVERLAP_CHARS)
+
+    summarizer, _ = make_summarizer(None)
+    keys_before = {summarizer.section_key(s) for s in before}
+    keys_after = {summarizer.section_key(s) for s in after}
+    assert len(keys_before - keys_after) <= 3
+    assert len(keys_after - keys_before) <= 3
+
+
+def test_edit_without_paragraph_breaks_stays_local():
+    text = " ".join(make_paragraphs(seed=2))
+    before = split_sections(text, SECTION_CHARS, OVERLAP_CHARS)
+    after = split_sections(text.replace("Paragraph 5 ", "Paragraph 5 with a few more words ", 1), SECTION_CHARS, OVERLAP_CHARS)
+    assert len(set(before) - set(after)) <= 2
+
+
+def test_rerun_of_the_same_document_reuses_every_section():
+    text = "\n\n".join(make_paragraphs())
+    summarizer, prompts = make_summarizer(DictCache())
+
+    asyncio.run(summarizer.summarize(text, 5, budget=10))
+    prompts.clear()
+    _, report = asyncio.run(summarizer.summarize(text, 5, budget=10))
+
+    assert report["failed_sections"] == 0
+    assert report["cached_sections"] == report["sections"]
+    # only the reduce step went to the model
+    assert len(prompts) == 1
+
+
+def test_rerun_of_edited_document_reuses_cached_sections():
+    paragraphs = make_paragraphs()
+    cache = DictCache()
+    summarizer, prompts = make_summarizer(cache)
+
+    asyncio.run(summarizer.summarize("\n\n".join(paragraphs), 5, budget=10))
+    edited = list(paragraphs)
+    edited[100] = edited[100] + " One more sentence at the end."
+    prompts.clear()
+    _, report = asyncio.run(summarizer.summarize("\n\n".join(edited), 5, budget=10))
+
+    assert report["failed_sections"] == 0
+    assert report["sections"] - report["cached_sections"] <= 2
+    # only the changed sections and the reduce step went to the model
+    assert len(prompts) == report["sections"] - report["cached_sections"] + 1
+
+
+def test_summarize_endpoint_reports_map_reduce(api, monkeypatch):
+    monkeypatch.setattr(main.llm_client, "breakers", {})
+    monkeypatch.setattr(main.llm_client, "backend", SimulatedBackend(latency_ms=5, latency_sigma=0))
+    # a small budget keeps the document (and the basic engine's work on it) small
+    monkeypatch.setattr(main, "AI_INPUT_TOKEN_BUDGET", 500)
+    monkeypatch.setattr(main.map_reduce_summarizer, "section_chars", 2000)
+    monkeypatch.setattr(main.map_reduce_summarizer, "overlap_chars", 200)
+    text = "\n\n".join(make_paragraphs(count=20, seed=7))
+
+    response = api.request("POST", "/summarize", json={"text": text, "ai_mode": "map_reduce", "no_cache": True})
+    assert response.status_code == 200
+    body = response.json()
+    report = body["ai_input"]
+    assert body["ai_status"] == "ok"
+    assert report["mode"] == "map_reduce" and report["sections"] > 1
+    assert report["failed_sections"] == 0
+
+    unknown = api.request("POST", "/summarize", json={"text": text, "ai_mode": "fastest"})
+    assert unknown.status_code == 400
@@ -0,0 +1,40 @@
+"""
+GET /admin/model-routing: admin only, and the order follows the recorded latency/success statistics.
+"""
+from conftest import auth_header
+
+from backend.app import main
+from backend.app.llm.router import ModelRouter
+
+
+def test_model_routing_is_admin_only_and_demotes_failing_models(api, monkeypatch):
+    router = ModelRouter(main.llm_client, main.model_router.candidates)
+    monkeypatch.setattr(main.app.state, "model_router", router)
+    task = next(iter(router.candidates))
+    first = router.order(task)[0]
+    for _ in range(10):
+        router.record(task, first, 0.5, success=False)
+
+    async def scenario(client):
+        admin = await main.user_collection.insert_one({"username": "root", "email": "routing-admin@test", "role": "admin"})
+        user = await main.user_collection.insert_one({"username": "plain", "email": "routing-user@test"})
+        responses = (
+            await client.get("/admin/model-routing"),
+            await client.get("/admin/model-routing", headers=auth_header(str(user.inserted_id))),
+            await client.get("/admin/model-routing", params={"text_length": 100},
+                             headers=auth_header(str(admin.inserted_id))),
+        )
+        await main.user_collection.delete_many({"email": {"$in": ["routing-admin@test", "routing-user@test"]}})
+        return responses
+
+    anonymous, plain_user, admin = api.run(scenario)
+    assert anonymous.status_code in (401, 403)
+    assert plain_user.status_code == 403
+    assert admin.status_code == 200
+    body = admin.json()
+    assert body["text_length"] == 100
+    rows = body["tasks"][task]
+    assert [row["rank"] for row in rows] == list(range(1, len(rows) + 1))
+    demoted = next(row for row in rows if row["model"] == first)
+    assert demoted["samples"] == 10 and demoted["ewma_success"] < 0.2
+    assert rows[-1]["model"] == first
@@ -0,0 +1,205 @@
+"""
+LLMScheduler: per-model token buckets, a 429's retry delay blocking the model, and single-flight
+calls: identical in-flight calls are coalesced, and an upstream call must stop once nobody waits
+for it (hedge losers, expired deadlines) but keep running while another caller still needs it.
+
+Run from the repository root:  python -m pytest backend/tests
+"""
+import asyncio
+import os
+
+os.environ.setdefault("MONGO_DETAILS", "memory://")
+
+import pytest
+
+from backend.app.llm.backends import LLMBackend
+from backend.app.llm.client import LLMClient
+from backend.app.llm.hedging import DeadlineExceeded, first_success
+from backend.app.llm.scheduler import LLMScheduler, RateLimited
+
+
+class RecordingBackend(LLMBackend):
+    """Fixed latency per model; records which upstream calls completed and which were cancelled"""
+
+    name = "recording"
+
+    def __init__(self, latencies: dict[str, float]):
+        self.latencies = latencies
+        self.completed: list[str] = []
+        self.cancelled: list[str] = []
+
+    def snapshot(self) -> tuple[list[str], list[str]]:
+        # taken inside the event loop: asyncio.run() cancels leftover tasks on exit, which would hide a leak
+        return list(self.completed), list(self.cancelled)
+
+    def is_available(self) -> bool:
+        return True
+
+    def generate_content(self, model_name: str, contents, task: str = "summary") -> str:
+        raise RuntimeError("RecordingBackend is async only")
+
+    def upload_document(self, data: bytes, mime_type: str, display_name: str | None = None) -> tuple[str, dict]:
+        raise RuntimeError("RecordingBackend has no document store")
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        try:
+            await asyncio.sleep(self.latencies[model_name])
+        except asyncio.CancelledError:
+            self.cancelled.append(model_name)
+            raise
+        self.completed.append(model_name)
+        return f"answer from {model_name}"
+
+
+def make_scheduler(latencies: dict[str, float]) -> tuple[LLMScheduler, RecordingBackend]:
+    backend = RecordingBackend(latencies)
+    scheduler = LLMScheduler(LLMClient(backend))
+    scheduler.default_model_rpm = 0  # no rate limit
+    return scheduler, backend
+
+
+def test_identical_inflight_calls_are_coalesced():
+    async def scenario():
+        scheduler, backend = make_scheduler({"a": 0.1})
+        answers = await asyncio.gather(
+            scheduler.generate("a", "prompt"), scheduler.generate("a", "prompt"), scheduler.generate("a", "other prompt"),
+        )
+        return answers, scheduler.counters, backend.snapshot()
+
+    answers, counters, (completed, cancelled) = asyncio.run(scenario())
+    assert answers == ["answer from a"] * 3
+    assert (counters["calls"], counters["coalesced"]) == (2, 1)
+    assert completed == ["a", "a"] and cancelled == []
+
+
+def test_model_over_its_rate_is_rate_limited_instead_of_queued():
+    async def scenario():
+        scheduler, backend = make_scheduler({"a": 0.0})
+        scheduler.model_rpm = {"a": 1}
+        await scheduler.generate("a", "first")
+        with pytest.raises(RateLimited):
+            await scheduler.generate("a", "second", max_wait=0.1)
+        return scheduler.counters["rate_limited"]
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_hedge_loser_is_cancelled_upstream():
+    async def scenario():
+        scheduler, backend = make_scheduler({"a": 2.0, "b": 0.1})
+        model_name, text, _ = await first_success(
+            ["a", "b"], lambda m, remaining: scheduler.generate(m, "prompt"), budget=5, hedge_delay=lambda m: 0.05,
+        )
+        await asyncio.sleep(0.05)  # let the cancellation reach the backend
+        return model_name, text, backend.snapshot()
+
+    model_name, text, (completed, cancelled) = asyncio.run(scenario())
+    assert (model_name, text) == ("b", "answer from b")
+    assert cancelled == ["a"]
+    assert completed == ["b"]
+
+
+def test_deadline_cancels_upstream_call():
+    async def scenario():
+        scheduler, backend = make_scheduler({"a": 2.0})
+        try:
+            await first_success(["a"], lambda m, remaining: scheduler.generate(m, "prompt"), budget=0.1)
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("expected DeadlineExceeded")
+        await asyncio.sleep(0.05)
+        return scheduler.stats()["inflight"], backend.snapshot()
+
+    inflight, (completed, cancelled) = asyncio.run(scenario())
+    assert cancelled == ["a"]
+    assert completed == []
+    assert inflight == 0
+
+
+def test_coalesced_call_survives_until_last_waiter_leaves():
+    async def scenario():
+        scheduler, backend = make_scheduler({"a": 0.2})
+        first = asyncio.ensure_future(scheduler.generate("a", "prompt"))
+        second = asyncio.ensure_future(scheduler.generate("a", "prompt"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        # the other waiter still gets the answer of the shared call
+        answer = await second
+        third = asyncio.ensure_future(scheduler.generate("a", "prompt again"))
+        await asyncio.sleep(0.05)
+        third.cancel()
+        await asyncio.sleep(0.05)
+        return answer, scheduler.counters["coalesced"], backend.snapshot()
+
+    answer, coalesced, (completed, cancelled) = asyncio.run(scenario())
+    assert answer == "answer from a"
+    assert coalesced == 1
+    assert completed == ["a"]
+    assert cancelled == ["a"]
+
+
+class QuotaOnceBackend(RecordingBackend):
+    """First call answers 429 with a retry delay, later calls succeed"""
+
+    def __init__(self, retry_in: float):
+        super().__init__({"a": 0.05})
+        self.retry_in = retry_in
+        self.calls = 0
+
+    async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+        self.calls += 1
+        if self.calls == 1:
+            raise Exception(f"429 Resource has been exhausted. Please retry in {self.retry_in}s")
+        return await super().generate_content_async(model_name, contents, task)
+
+
+def test_quota_error_blocks_the_model_for_the_retry_delay():
+    async def scenario():
+        scheduler = LLMScheduler(LLMClient(QuotaOnceBackend(retry_in=12)))
+        scheduler.default_model_rpm = 0
+        with pytest.raises(Exception, match="429"):
+            await scheduler.generate("a", "prompt")
+        return scheduler.bucket("a").wait_time()
+
+    assert 11 < asyncio.run(scenario()) <= 12
+
+
+def test_open_circuit_rejection_does_not_block_the_bucket_again():
+    async def scenario():
+        backend = QuotaOnceBackend(retry_in=0.2)
+        scheduler = LLMScheduler(LLMClient(backend))
+        scheduler.default_model_rpm = 0
+        try:
+            await scheduler.generate("a", "first")
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)  # quota window over: the circuit is half-open
+        trial = asyncio.ensure_future(scheduler.generate("a", "trial"))
+        await asyncio.sleep(0)
+        rejected = None
+        try:
+            await scheduler.generate("a", "during the trial", max_wait=0)
+        except Exception as e:
+            rejected = type(e).__name__
+        await trial
+        # the rejection quoted the old 429 text; it must not have re-blocked the model for another 0.2s
+        answer = await scheduler.generate("a", "after the trial", max_wait=0)
+        return rejected, answer
+
+    rejected, answer = asyncio.run(scenario())
+    assert rejected == "ModelUnavailable"
+    assert answer == "answer from a"
+
+
+def test_backend_missing_a_method_fails_when_created():
+    class Incomplete(LLMBackend):
+        async def generate_content_async(self, model_name: str, contents, task: str = "summary") -> str:
+            return ""
+
+    try:
+        Incomplete()
+    except TypeError as e:
+        assert "generate_content" in str(e) and "upload_document" in str(e)
+    else:
+        raise AssertionError("expected TypeError")
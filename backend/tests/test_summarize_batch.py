@@ -0,0 +1,39 @@
+"""
+/summarize/batch: one NDJSON line per text in completion order, then a summary line.
+"""
+import json
+
+TEXTS = [
+    "The library opens at nine. Members can borrow ten books. Late returns pay a small fee. " * 4,
+    "Rain is expected on Monday. Temperatures drop at night. The weekend will be sunny and warm. " * 4,
+    "   ",
+]
+
+
+def read_lines(response) -> list[dict]:
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_streams_one_line_per_text_then_done(api):
+    lines = read_lines(api.request("POST", "/summarize/batch", json={"texts": TEXTS, "num_sentences": 2}))
+    items, done = lines[:-1], lines[-1]
+
+    assert sorted(item["index"] for item in items) == [0, 1, 2]
+    by_index = {item["index"]: item for item in items}
+    assert by_index[2]["error"] == "Input text cannot be empty."
+    for index in (0, 1):
+        assert by_index[index]["basic_summary"]
+        # AI is opt-in per batch
+        assert by_index[index]["ai_summary"] is None and by_index[index]["ai_status"] == "skipped"
+    assert done == {"done": True, "count": 3, "errors": 1, "history_saved": 0}
+
+
+def test_batch_with_ai(api):
+    lines = read_lines(api.request("POST", "/summarize/batch", json={"texts": TEXTS[:2], "use_ai": True}))
+    assert all(item["ai_status"] == "ok" for item in lines[:-1])
+
+
+def test_batch_rejects_empty_list(api):
+    assert api.request("POST", "/summarize/batch", json={"texts": []}).status_code == 400
@@ -0,0 +1,103 @@
+"""
+/summarize/stream: Server-Sent Events, shared summary cache with /summarize, and how an
+incomplete AI answer (deadline / stream broken mid-way) is reported.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.app import main
+from backend.app.llm.backends import SimulatedBackend
+
+TEXT = "The library opens at nine. Members can borrow ten books. Late returns pay a small fee. " * 8
+
+
+class BrokenStreamBackend(SimulatedBackend):
+    """Sends the first half of an answer, then fails like a dropped connection"""
+
+    async def stream_content(self, model_name: str, contents, task: str = "summary"):
+        yield "- first half of the summa"
+        raise ConnectionError("500 stream reset by peer")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # clean circuit breakers / cache for every test
+    monkeypatch.setattr(main.llm_client, "breakers", {})
+    monkeypatch.setattr(main.llm_client, "backend", SimulatedBackend(latency_ms=5, latency_sigma=0))
+    return main.app
+
+
+def request(app, method: str, url: str, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(send())
+
+
+def stream_events(app, body: dict) -> list[tuple[str, dict]]:
+    response = request(app, "POST", "/summarize/stream", json=body)
+    assert response.status_code == 200, response.text
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_basic_tokens_and_done(app):
+    events = stream_events(app, {"text": TEXT + " unique one", "no_cache": True})
+    names = [name for name, _ in events]
+    assert names[0] == "basic" and names[-1] == "done"
+    assert "token" in names
+    done = events[-1][1]
+    assert done["ai_status"] == "ok" and done["error"] is None and done["cached"] is False
+    assert done["ai_input"]["mode"] == "compress"
+
+
+def test_stream_result_is_shared_with_summarize_cache(app):
+    text = TEXT + " unique two"
+    first = stream_events(app, {"text": text})
+    second = stream_events(app, {"text": text})
+    assert first[-1][1]["cached"] is False
+    assert second[-1][1]["cached"] is True
+    assert second[-1][1]["ai_summary"] == first[-1][1]["ai_summary"]
+    response = request(app, "POST", "/summarize", json={"text": text})
+    assert response.json()["cached"] is True
+
+
+def test_stream_rejects_unknown_ai_mode(app):
+    response = request(app, "POST", "/summarize/stream", json={"text": TEXT, "ai_mode": "bogus"})
+    assert response.status_code == 400
+
+
+def test_stream_falls_back_before_the_first_token(app, monkeypatch):
+    first = main.model_router.order("summary", len(TEXT))[0]
+    monkeypatch.setattr(main.llm_client, "backend", SimulatedBackend(latency_ms=5, latency_sigma=0, dead_models=[first]))
+    events = stream_events(app, {"text": TEXT + " unique four", "no_cache": True})
+    done = events[-1][1]
+    assert events[-1][0] == "done" and done["ai_status"] == "ok" and done["error"] is None
+
+
+def test_stream_rejects_empty_text(app):
+    assert request(app, "POST", "/summarize/stream", json={"text": ""}).status_code == 400
+
+def test_stream_broken_midway_is_an_error_and_not_cached(app, monkeypatch):
+    monkeypatch.setattr(main.llm_client, "backend", BrokenStreamBackend(latency_ms=5, latency_sigma=0))
+    text = TEXT + " unique three"
+    events = stream_events(app, {"text": text})
+    names = [name for name, _ in events]
+    assert names[-3:] == ["token", "error", "done"]
+    assert events[-2][1]["ai_status"] == "error"
+    done = events[-1][1]
+    assert done["ai_status"] == "error"
+    assert "stream reset" in done["error"]
+
+    # the partial answer must not be served later as a good summary
+    monkeypatch.setattr(main.llm_client, "backend", SimulatedBackend(latency_ms=5, latency_sigma=0))
+    response = request(app, "POST", "/summarize", json={"text": text})
+    assert response.json()["cached"] is False
+    assert response.json()["ai_status"] == "ok"
@@ -0,0 +1,43 @@
+"""
+Result cache of /summarize and /summarize-file: a repeated request is answered from the cache,
+no_cache recomputes.
+"""
+from backend.app import main
+
+TEXT = "Cache entries are keyed by content. The same text gives the same key. Options change the key. " * 4
+
+
+def test_repeated_text_is_served_from_cache(api, monkeypatch):
+    calls = []
+    summarize = main.summarize_document_with_ai
+
+    async def counting(*args, **kwargs):
+        calls.append(kwargs.get("num_sentences"))
+        return await summarize(*args, **kwargs)
+
+    monkeypatch.setattr(main, "summarize_document_with_ai", counting)
+    text = TEXT + "Run marker for this test."
+
+    first = api.request("POST", "/summarize", json={"text": text, "num_sentences": 2}).json()
+    repeat = api.request("POST", "/summarize", json={"text": text, "num_sentences": 2}).json()
+    other_option = api.request("POST", "/summarize", json={"text": text, "num_sentences": 3}).json()
+    bypass = api.request("POST", "/summarize", json={"text": text, "num_sentences": 2, "no_cache": True}).json()
+
+    assert (first["cached"], repeat["cached"], other_option["cached"], bypass["cached"]) == (False, True, False, False)
+    assert repeat["basic_summary"] == first["basic_summary"] and repeat["ai_summary"] == first["ai_summary"]
+    # the cached answer did not call the AI engine again
+    assert calls == [2, 3, 2]
+
+
+def test_repeated_file_is_served_from_cache(api):
+    content = (TEXT + "File marker for this test.").encode()
+
+    def upload():
+        return api.request(
+            "POST", "/summarize-file", files={"file": ("cache.txt", content, "text/plain")}, data={"num_sentences": "2"},
+        )
+
+    first, repeat = upload(), upload()
+    assert first.status_code == repeat.status_code == 200
+    assert (first.json()["cached"], repeat.json()["cached"]) == (False, True)
+    assert repeat.json()["basic_summary"] == first.json()["basic_summary"]
@@ -0,0 +1,41 @@
+"""
+Body decoding of /summarize: raw text/plain, gzip-compressed bodies, charsets and size limits.
+"""
+import gzip
+
+from backend.app import main
+
+TEXT = "ห้องสมุดเปิดเวลาเก้าโมง สมาชิกยืมหนังสือได้สิบเล่ม. Late returns pay a small fee. " * 4
+
+
+def summarize(api, content: bytes, headers: dict, **params):
+    return api.request("POST", "/summarize", content=content, headers=headers, params={"no_cache": "true", **params})
+
+
+def test_plain_and_gzip_bodies_give_the_same_text(api):
+    plain = summarize(api, TEXT.encode(), {"Content-Type": "text/plain"}, num_sentences=2)
+    json_gzip = summarize(
+        api, gzip.compress(f'{{"text": "{TEXT}", "num_sentences": 2}}'.encode()),
+        {"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    thai_charset = summarize(api, TEXT.encode("tis-620"), {"Content-Type": "text/plain; charset=tis-620"})
+    assert plain.status_code == 200 and plain.json()["original_text"] == TEXT
+    assert json_gzip.status_code == 200 and json_gzip.json()["original_text"] == TEXT
+    assert thai_charset.status_code == 200 and thai_charset.json()["original_text"] == TEXT
+
+
+def test_invalid_bodies_are_rejected(api, monkeypatch):
+    text_plain = {"Content-Type": "text/plain"}
+    gzip_plain = {**text_plain, "Content-Encoding": "gzip"}
+    assert summarize(api, gzip.compress(TEXT.encode())[:-8], gzip_plain).status_code == 400
+    assert summarize(api, b"not gzip at all", gzip_plain).status_code == 400
+    assert summarize(api, b"\xff\xfe broken", text_plain).status_code == 400
+    assert summarize(api, b"text", {"Content-Type": "text/plain; charset=klingon"}).status_code == 415
+    assert summarize(api, b"text", {**text_plain, "Content-Encoding": "br"}).status_code == 415
+    assert summarize(api, b"<text/>", {"Content-Type": "application/xml"}).status_code == 415
+
+    # the limit applies after decompression: a small gzip body that inflates past it is refused
+    monkeypatch.setattr(main, "TEXT_BODY_MAX_BYTES", 64 * 1024)
+    bomb = gzip.compress(b"a" * (1024 * 1024))
+    assert len(bomb) < 64 * 1024
+    assert summarize(api, bomb, gzip_plain).status_code == 413
@@ -0,0 +1,58 @@
+"""
+Upload size limits: oversize bodies are refused while they arrive (middleware) or while the
+upload is read (read_upload), always with 413.
+"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from backend.app import main
+from backend.app.uploads.limits import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+
+LIMIT = 1024
+
+
+def limited_app(seen: list) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_file_size=LIMIT, paths={"/upload"})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        seen.append(file.filename)
+        return {"size": len(await file.read())}
+
+    return app
+
+
+def post(app: FastAPI, **kwargs) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/upload", **kwargs)
+    return asyncio.run(run())
+
+
+def test_middleware_rejects_by_content_length_and_by_streamed_size():
+    seen = []
+    app = limited_app(seen)
+    assert post(app, files={"file": ("ok.txt", b"x" * LIMIT)}).status_code == 200
+
+    assert post(app, files={"file": ("big.txt", b"x" * (LIMIT + MULTIPART_OVERHEAD + 1))}).status_code == 413
+
+    # chunked body without Content-Length: stopped once the counted bytes cross the limit
+    async def chunks():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="big.txt"\r\n\r\n'
+        for _ in range(LIMIT + MULTIPART_OVERHEAD):
+            yield b"x" * 64
+        yield b"\r\n--b--\r\n"
+    streamed = post(app, content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert streamed.status_code == 413
+    assert seen == ["ok.txt"]
+
+
+def test_summarize_file_rejects_a_file_over_the_limit(api, monkeypatch):
+    # under the middleware's body limit (multipart overhead) but over the file limit itself
+    monkeypatch.setattr(main.file_processor, "MAX_FILE_SIZE", LIMIT)
+    response = api.request("POST", "/summarize-file", files={"file": ("big.txt", b"word " * LIMIT, "text/plain")})
+    assert response.status_code == 413
@@ -0,0 +1,77 @@
+"""
+Resumable uploads (/uploads): create, append chunks at Upload-Offset, resume after a conflict,
+then summarize the finished file.
+"""
+import asyncio
+
+import pytest
+from conftest import auth_header
+
+from backend.app import main
+
+TEXT = ("Trains leave every hour. Tickets are cheaper online. Bikes ride in the last car. " * 8).encode()
+
+
+@pytest.fixture
+def uploads(monkeypatch, tmp_path):
+    monkeypatch.setattr(main.resumable_uploads, "directory", str(tmp_path))
+    monkeypatch.setattr(main, "save_file_history", lambda *args, **kwargs: asyncio.sleep(0))
+    return tmp_path
+
+
+def test_chunked_upload_resumes_and_summarizes(api, uploads):
+    owner = auth_header("u1")
+    half = len(TEXT) // 2
+
+    async def scenario(client):
+        created = await client.post(
+            "/uploads", json={"filename": "notes.txt", "length": len(TEXT), "content_type": "text/plain"}, headers=owner,
+        )
+        upload_id = created.json()["upload_id"]
+        url = f"/uploads/{upload_id}"
+        first = await client.patch(url, content=TEXT[:half], headers={**owner, "Upload-Offset": "0"})
+        # a client that lost the response resends from the old offset and is told where to resume
+        stale = await client.patch(url, content=TEXT[:half], headers={**owner, "Upload-Offset": "0"})
+        early = await client.post(f"{url}/summarize", json={}, headers=owner)
+        offset = await client.head(url, headers=owner)
+        other = await client.head(url, headers=auth_header("u2"))
+        rest = await client.patch(url, content=TEXT[half:], headers={**owner, "Upload-Offset": offset.headers["Upload-Offset"]})
+        status = await client.get(url, headers=owner)
+        summary = await client.post(f"{url}/summarize", json={"num_sentences": 2, "no_cache": True}, headers=owner)
+        gone = await client.get(url, headers=owner)
+        return created, first, stale, early, offset, other, rest, status.json(), summary, gone
+
+    created, first, stale, early, offset, other, rest, status, summary, gone = api.run(scenario)
+    assert created.status_code == 201 and created.headers["Upload-Offset"] == "0"
+    assert created.headers["Location"] == f"/uploads/{created.json()['upload_id']}"
+    assert first.status_code == 204 and first.headers["Upload-Offset"] == str(half)
+    assert stale.status_code == 409
+    assert early.status_code == 409
+    assert offset.status_code == 200 and offset.headers["Upload-Offset"] == str(half)
+    assert other.status_code == 404
+    assert rest.status_code == 204 and rest.headers["Upload-Offset"] == str(len(TEXT))
+    assert status["complete"] is True
+    assert summary.status_code == 200
+    assert summary.json()["filename"] == "notes.txt" and summary.json()["basic_summary"]
+    # a summarized upload is deleted
+    assert gone.status_code == 404
+    assert list(uploads.iterdir()) == []
+
+
+def test_upload_rejects_bad_type_and_oversize(api, uploads, monkeypatch):
+    monkeypatch.setattr(main.resumable_uploads, "max_size", 1000)
+
+    async def scenario(client):
+        bad_type = await client.post("/uploads", json={"filename": "run.exe", "length": 10})
+        too_big = await client.post("/uploads", json={"filename": "notes.txt", "length": 1001, "content_type": "text/plain"})
+        created = await client.post("/uploads", json={"filename": "notes.txt", "length": 10, "content_type": "text/plain"})
+        overflow = await client.patch(
+            f"/uploads/{created.json()['upload_id']}", content=b"x" * 11, headers={"Upload-Offset": "0"},
+        )
+        return bad_type.status_code, too_big.status_code, overflow.status_code
+
+    bad_type, too_big, overflow = api.run(scenario)
+    assert bad_type == 400
+    assert too_big == 413
+    # more bytes than the declared length
+    assert overflow == 413